@@ -0,0 +1,130 @@
+import logging
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# ----------------------------------
+# BROWSERLESS ABSTRACT FETCH
+# ----------------------------------
+# PrintableBidNoticeAbstractUI.aspx and printableAwardNoticeAbstractUI.aspx
+# are plain server-rendered pages. Their HTML is fetched concurrently over a
+# pooled HTTP session that carries the logged-in Playwright cookies; the
+# browser then only has to set_content() + pdf(). Anything that looks
+# incomplete falls back to full navigation.
+
+ABSTRACT_TYPES = ("bid_notice", "award_notice")
+
+# Below this size the response is an error page or a stub, not an abstract
+MIN_ABSTRACT_BYTES = 2048
+
+LOGIN_MARKERS = ('id="btnLogin"', "log-in.aspx")
+
+USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/129.0.0.0 Safari/537.36"
+)
+
+_head = re.compile(r"<head[^>]*>", re.IGNORECASE)
+
+
+def session_from_storage_state(storage_state, pool_size=8):
+    """Builds a pooled requests.Session carrying the cookies of a Playwright storage_state."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers["User-Agent"] = USER_AGENT
+    load_cookies(session, storage_state)
+    return session
+
+
+def load_cookies(session, storage_state):
+    session.cookies.clear()
+    for cookie in (storage_state or {}).get("cookies", []):
+        session.cookies.set(
+            cookie["name"], cookie["value"],
+            domain=cookie.get("domain", "").lstrip("."), path=cookie.get("path", "/")
+        )
+
+
+def is_complete(html):
+    """Heuristic check that the fetched page is a whole abstract, not a login or error page."""
+    if not html or len(html) < MIN_ABSTRACT_BYTES:
+        return False
+    lowered = html.lower()
+    if "</html>" not in lowered:
+        return False
+    return not any(marker.lower() in lowered for marker in LOGIN_MARKERS)
+
+
+def with_base_href(html, url):
+    """Adds <base href> so relative stylesheets and images still resolve under set_content()."""
+    base = f'<base href="{url}">'
+    match = _head.search(html)
+    if match:
+        return html[:match.end()] + base + html[match.end():]
+    return base + html
+
+
+class AbstractFetcher:
+    def __init__(self, storage_state, workers=8, timeout=30):
+        self.timeout = timeout
+        self.session = session_from_storage_state(storage_state, pool_size=workers)
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="abstract-fetch")
+        self._lock = threading.Lock()
+        self._prefetched = {}
+
+        self.fetched = 0
+        self.incomplete = 0
+
+    def update_cookies(self, storage_state):
+        """Refreshes the session after a re-login."""
+        with self._lock:
+            load_cookies(self.session, storage_state)
+
+    def _fetch(self, url):
+        try:
+            response = self.session.get(url, timeout=self.timeout)
+            if response.status_code != 200 or "log-in" in response.url.lower():
+                raise RuntimeError(f"HTTP {response.status_code} at {response.url}")
+            html = response.text
+        except Exception as e:
+            logging.info(f"Abstract fetch failed for {url}: {e}. Falling back to navigation.")
+            with self._lock:
+                self.incomplete += 1
+            return None
+
+        with self._lock:
+            if is_complete(html):
+                self.fetched += 1
+                return with_base_href(html, response.url)
+            self.incomplete += 1
+        logging.info(f"Incomplete abstract HTML for {url}. Falling back to navigation.")
+        return None
+
+    # ----------------------------------
+    # PREFETCH / TAKE
+    # ----------------------------------
+    def prefetch(self, url):
+        """Starts fetching url in the background; the render worker collects it with take()."""
+        with self._lock:
+            if url not in self._prefetched:
+                self._prefetched[url] = self._executor.submit(self._fetch, url)
+
+    def take(self, url):
+        """Returns a future resolving to ready-to-render HTML, or None for fallback navigation."""
+        with self._lock:
+            future = self._prefetched.pop(url, None)
+        return future or self._executor.submit(self._fetch, url)
+
+    def report(self):
+        with self._lock:
+            total = max(self.fetched + self.incomplete, 1)
+            return f"Abstract fetch: {self.fetched} via HTTP, {self.incomplete} fell back to navigation ({self.fetched / total:.0%} HTTP)"
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+        self.session.close()
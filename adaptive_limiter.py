@@ -0,0 +1,166 @@
+import asyncio
+import collections
+import logging
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+
+# ----------------------------------
+# ADAPTIVE PORTAL CONCURRENCY (AIMD)
+# ----------------------------------
+# Gates every navigation to PhilGEPS. The allowed number of concurrent
+# navigations grows by about one per round of healthy (fast, successful)
+# loads and is halved when loads fail or get slower than target_latency.
+# max_limit is a hard ceiling and max_rps spaces navigation starts so the
+# portal never sees more than that many new requests per second.
+
+
+class LimiterStopped(Exception):
+    """The wait for a navigation slot was cut short by stop_event; the navigation must not run."""
+
+
+class AdaptiveLimiter:
+    def __init__(self, initial=2, min_limit=1, max_limit=8, max_rps=4.0, target_latency=10.0,
+                 decrease=0.5, notify=None):
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.max_rps = max_rps
+        self.target_latency = target_latency
+        self.decrease = decrease
+        self.notify = notify or logging.info
+
+        self.limit = float(max(min_limit, min(initial, max_limit)))
+        self.in_flight = 0
+
+        self._cond = threading.Condition()
+        self._waiters = collections.deque()  # (loop, future) of slot_async callers
+        self._next_start = 0.0
+        self._last_decrease = 0.0
+
+        self.requests = 0
+        self.slow_or_failed = 0
+        self.latency_total = 0.0
+        self.peak_limit = self.limit
+        self.rps_wait = 0.0
+
+    # ----------------------------------
+    # GATE
+    # ----------------------------------
+    def acquire(self, stop_event=None):
+        """Waits for a free slot under the current limit and for the RPS spacing; returns the start time.
+
+        Returns None without taking a slot if stop_event was set while waiting.
+        """
+        with self._cond:
+            while self.in_flight >= int(self.limit):
+                if stop_event is not None and stop_event.is_set():
+                    return None
+                self._cond.wait(timeout=1.0)
+            delay = self._take_slot()
+
+        if delay > 0:
+            time.sleep(delay)
+        return time.monotonic()
+
+    async def acquire_async(self):
+        """acquire() for the event loop: waits on a future woken by release() instead of a thread."""
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._cond:
+                if self.in_flight < int(self.limit):
+                    delay = self._take_slot()
+                    break
+                waiter = loop.create_future()
+                self._waiters.append((loop, waiter))
+            try:
+                # The timeout only guards against a missed wake-up
+                await asyncio.wait_for(waiter, timeout=1.0)
+            except asyncio.TimeoutError:
+                pass
+
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return time.monotonic()
+
+    def _take_slot(self):
+        # Called with the lock held; returns how long to wait for the RPS spacing
+        self.in_flight += 1
+        now = time.monotonic()
+        start_at = max(now, self._next_start)
+        self._next_start = start_at + 1.0 / self.max_rps if self.max_rps else 0.0
+        delay = start_at - now
+        self.rps_wait += delay
+        return delay
+
+    def _wake_async(self):
+        # Called with the lock held; the woken callers re-check the limit themselves
+        while self._waiters:
+            loop, waiter = self._waiters.popleft()
+            if not loop.is_closed():
+                loop.call_soon_threadsafe(_set_done, waiter)
+
+    def release(self, started, ok=True):
+        """Frees the slot and adapts the limit from this navigation's outcome and latency."""
+        latency = time.monotonic() - started
+        with self._cond:
+            self.in_flight -= 1
+            self.requests += 1
+            self.latency_total += latency
+
+            if ok and latency <= self.target_latency:
+                # Additive increase: +1 after roughly `limit` healthy loads
+                self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+                self.peak_limit = max(self.peak_limit, self.limit)
+            else:
+                self.slow_or_failed += 1
+                now = time.monotonic()
+                # Loads already in flight when we backed off report the same
+                # congestion; back off at most once per target_latency.
+                if now - self._last_decrease >= self.target_latency:
+                    before = int(self.limit)
+                    self.limit = max(self.min_limit, self.limit * self.decrease)
+                    self._last_decrease = now
+                    if int(self.limit) < before:
+                        self.notify(
+                            f"PhilGEPS is {'failing' if not ok else 'slow'} ({latency:.1f}s). "
+                            f"Portal concurrency {before} -> {int(self.limit)}."
+                        )
+            self._cond.notify_all()
+            self._wake_async()
+
+    @contextmanager
+    def slot(self, stop_event=None, is_ok=None):
+        """with limiter.slot(): ... — an exception counts as a failure unless is_ok(error) says otherwise."""
+        started = self.acquire(stop_event)
+        if started is None:
+            raise LimiterStopped("navigation cancelled: the job is stopping")
+        try:
+            yield
+        except Exception as e:
+            self.release(started, ok=bool(is_ok and is_ok(e)))
+            raise
+        self.release(started, ok=True)
+
+    @asynccontextmanager
+    async def slot_async(self, is_ok=None):
+        started = await self.acquire_async()
+        try:
+            yield
+        except Exception as e:
+            self.release(started, ok=bool(is_ok and is_ok(e)))
+            raise
+        self.release(started, ok=True)
+
+    def report(self):
+        with self._cond:
+            avg = self.latency_total / max(self.requests, 1)
+            return (
+                f"Portal concurrency: {self.requests} navigation(s), avg {avg:.1f}s, "
+                f"{self.slow_or_failed} slow/failed, limit {int(self.limit)} (peak {int(self.peak_limit)}, "
+                f"ceiling {self.max_limit}), {self.rps_wait:.0f}s spent on the RPS cap"
+            )
+
+
+def _set_done(waiter):
+    if not waiter.done():
+        waiter.set_result(None)
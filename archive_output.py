@@ -0,0 +1,196 @@
+import hashlib
+import os
+import re
+import shutil
+import threading
+import time
+import zipfile
+
+from content_store import materialize
+from job_journal import part_path
+
+# ----------------------------------
+# ZIP ARCHIVE OUTPUT
+# ----------------------------------
+# Instead of thousands of small files and folders on the destination share,
+# a job can be written as ZIP archives. Renders and copies still land in a
+# local staging folder (<staging>/<RefID>/...), but only while their RefID
+# is in flight: as soon as refid_finalizer reports a RefID complete,
+# add_refid() streams its folder into the archive and deletes it, so the
+# staging area never holds more than the RefIDs the bounded queues allow.
+#
+#   ZIP_REFID  one <dest>/<RefID>.zip per RefID; a rerun skips RefIDs whose
+#              archive already exists
+#   ZIP_JOB    one archive for the whole job (job_path), written
+#              sequentially and renamed from *.part once the job finishes.
+#              It does not resume: the RefIDs already streamed into an
+#              interrupted *.part are gone from staging, so a rerun removes
+#              that *.part and its staging folder (clear_interrupted_job)
+#              and extracts the whole job again into a new archive
+#
+# Entries keep the folder layout (<RefID>/Bid Supplements/..., and
+# <OrgID>/<RefID>/... for batch jobs) and are compressed per file type.
+
+FOLDERS = "folders"
+ZIP_REFID = "zip-refid"
+ZIP_JOB = "zip-job"
+OUTPUT_FORMATS = (FOLDERS, ZIP_REFID, ZIP_JOB)
+
+# Compression level (0 = stored, 1-9 = deflate) by file extension; "*" is
+# the default. Rendered PDFs and images barely shrink, so they are stored or
+# compressed lightly; text notes compress well.
+DEFAULT_LEVELS = {
+    ".pdf": 1,
+    ".jpg": 0, ".jpeg": 0, ".png": 0, ".zip": 0, ".rar": 0, ".7z": 0,
+    ".txt": 9,
+    "*": 6,
+}
+
+
+class ArchiveWriter:
+    def __init__(self, mode, staging_root, dest_root, job_path=None, levels=None):
+        if mode not in (ZIP_REFID, ZIP_JOB):
+            raise ValueError(f"Unknown archive mode: {mode}")
+        self.mode = mode
+        self.staging_root = os.path.abspath(staging_root)
+        self.dest_root = os.path.abspath(dest_root)
+        self.levels = {**DEFAULT_LEVELS, **(levels or {})}
+        self.refids = 0
+        self.skipped = 0
+        self.entries = 0
+        self.bytes_in = 0
+        self._already = set()  # RefIDs archived() found from an earlier run
+
+        self._lock = threading.Lock()
+        self._job_zip = None
+        os.makedirs(self.staging_root, exist_ok=True)
+        os.makedirs(self.dest_root, exist_ok=True)
+
+        if mode == ZIP_JOB:
+            self.path = os.path.abspath(job_path or os.path.join(self.dest_root, "extraction.zip"))
+            self._job_zip = zipfile.ZipFile(part_path(self.path), "w", allowZip64=True)
+        else:
+            self.path = self.dest_root
+
+    def refid_path(self, refid):
+        return os.path.join(self.dest_root, f"{refid}.zip")
+
+    def archived(self, refid):
+        """True if refid already has its own archive from an earlier run (ZIP_REFID only)."""
+        if self.mode != ZIP_REFID or not os.path.exists(self.refid_path(refid)):
+            return False
+        with self._lock:
+            self._already.add(str(refid))
+        return True
+
+    def discard(self, refid):
+        """Drops whatever an interrupted run left in the staging folder of refid."""
+        shutil.rmtree(os.path.join(self.staging_root, str(refid)), ignore_errors=True)
+
+    # ----------------------------------
+    # WRITE
+    # ----------------------------------
+    def _level(self, name):
+        return self.levels.get(os.path.splitext(name)[1].lower(), self.levels["*"])
+
+    def _write_tree(self, zf, src, prefix):
+        for dirpath, _, files in os.walk(src):
+            for name in sorted(files):
+                if name.endswith(part_path("")):
+                    continue
+                path = os.path.join(dirpath, name)
+                arcname = "/".join(filter(None, [prefix, os.path.relpath(path, src).replace(os.sep, "/")]))
+                level = self._level(name)
+                if level:
+                    zf.write(path, arcname, zipfile.ZIP_DEFLATED, level)
+                else:
+                    zf.write(path, arcname, zipfile.ZIP_STORED)
+                self.entries += 1
+                self.bytes_in += os.path.getsize(path)
+
+    def add_refid(self, refid, roots=None):
+        """Streams the staged folder of a finished RefID into the archive and removes it.
+
+        roots are the merchant folders of a batch RefID: ZIP_JOB writes the RefID under each
+        <OrgID>/ prefix, ZIP_REFID links its archive into every <root>/<RefID>.zip (also for a
+        RefID archived() found from an earlier run, which is only linked and counted as skipped).
+        """
+        refid = str(refid)
+        src = os.path.join(self.staging_root, refid)
+        with self._lock:
+            if self.mode == ZIP_JOB:
+                if not os.path.isdir(src):
+                    return
+                prefixes = [os.path.basename(root) for root in roots] if roots else [""]
+                for prefix in prefixes:
+                    self._write_tree(self._job_zip, src, "/".join(filter(None, [prefix, refid])))
+            else:
+                dest = self.refid_path(refid)
+                skipped = refid in self._already
+                self._already.discard(refid)
+                if os.path.isdir(src) and not skipped:
+                    tmp = part_path(dest)
+                    with zipfile.ZipFile(tmp, "w", allowZip64=True) as zf:
+                        self._write_tree(zf, src, refid)
+                    os.replace(tmp, dest)
+                elif skipped:
+                    self.skipped += 1
+                if os.path.exists(dest):
+                    for root in roots or ():
+                        os.makedirs(root, exist_ok=True)
+                        materialize(dest, os.path.join(root, f"{refid}.zip"))
+                if skipped or not os.path.exists(dest):
+                    return
+            self.refids += 1
+        shutil.rmtree(src, ignore_errors=True)
+
+    def close(self, complete=True):
+        """Finishes the job archive (ZIP_JOB); an incomplete job keeps its *.part name. Returns the archive path."""
+        with self._lock:
+            if self._job_zip is None:
+                return self.path
+            self._job_zip.close()
+            self._job_zip = None
+            if complete:
+                os.replace(part_path(self.path), self.path)
+        return self.path
+
+    def report(self):
+        where = self.path if self.mode == ZIP_JOB else f"{self.dest_root}{os.sep}<RefID>.zip"
+        skipped = f", skipped {self.skipped} already archived" if self.skipped else ""
+        return (
+            f"Archived {self.refids} RefID(s), {self.entries} file(s), "
+            f"{self.bytes_in / (1024 * 1024):.1f} MB into {where}{skipped}"
+        )
+
+
+def staging_dir(staging_root, dest_root, label=None):
+    """Local staging folder for dest_root, unique per destination (and per worker with label)."""
+    dest_root = os.path.abspath(dest_root)
+    digest = hashlib.sha1(os.path.normcase(dest_root).encode("utf-8")).hexdigest()[:8]
+    name = f"{os.path.basename(dest_root) or 'output'}-{digest}{f'-{label}' if label else ''}"
+    return os.path.join(staging_root, name)
+
+
+def job_archive_name(label=None):
+    """extraction-<date>-<time>[-<label>].zip"""
+    return f"extraction-{time.strftime('%Y%m%d-%H%M%S')}{f'-{label}' if label else ''}.zip"
+
+
+def clear_interrupted_job(staging, archive_dir, label=None):
+    """Removes what an interrupted ZIP_JOB run of this worker left behind: its *.zip.part archives
+    in archive_dir and its staging folder. Returns the removed archive paths."""
+    suffix = re.escape(f"-{label}") if label else ""
+    pattern = re.compile(rf"extraction-\d{{8}}-\d{{6}}{suffix}\.zip{re.escape(part_path(''))}")
+    removed = []
+    if os.path.isdir(archive_dir):
+        for name in os.listdir(archive_dir):
+            if pattern.fullmatch(name):
+                path = os.path.join(archive_dir, name)
+                try:
+                    os.remove(path)
+                    removed.append(path)
+                except OSError:
+                    pass
+    shutil.rmtree(staging, ignore_errors=True)
+    return removed
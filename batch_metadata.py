@@ -0,0 +1,250 @@
+import datetime
+import logging
+import os
+
+from metrics import metrics
+
+# ----------------------------------
+# BATCH METADATA LOADER
+# ----------------------------------
+# Resolves every artifact of a merchant job in a few set-based queries
+# (chunked IN lists) instead of 4+ round-trips per RefID. Each RefID gets
+# a precomputed artifact list that process_refid only has to execute:
+#
+#   ("save_pdf", subfolder, (url_id, docid, bidsupid, docname, type, freshness))
+#   ("copy",     subfolder, source_path)
+#   ("note",     None,      message)
+#
+# subfolder is relative to the RefID folder ("" is the RefID folder itself).
+# freshness is the DB marker the render cache keys on: the TenderStatus,
+# plus the AwardStatusID for award notices.
+
+SHARE_ROOTS = {
+    "tender": r"Z:\GEPS_Files\Tender",
+    "bidsupp": r"Z:\GEPS_Files\BidSupp",
+    "r3": r"Z:\Fileserver\R3FileServer"
+}
+
+# SQL Server allows at most 2100 parameters per statement
+CHUNK_SIZE = 500
+
+AWARDED_STATUSES = ("Closed", "Awarded")
+DRIVE_LINK = "https://drive.google.com/"
+
+
+def chunked(items, size=CHUNK_SIZE):
+    items = list(items)
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def fetch_in(cursor, sql, keys):
+    """Runs sql once per chunk of keys; sql holds a single {in_list} placeholder."""
+    rows = []
+    for chunk in chunked(keys):
+        placeholders = ", ".join("?" for _ in chunk)
+        cursor.execute(sql.format(in_list=placeholders), chunk)
+        rows.extend(cursor.fetchall())
+    return rows
+
+
+def group_by(rows, key):
+    grouped = {}
+    for row in rows:
+        grouped.setdefault(key(row), []).append(row)
+    return grouped
+
+
+# ----------------------------------
+# REFID DISCOVERY
+# ----------------------------------
+# RefIDs awarded to a merchant within a year range. The award date is
+# compared against a half-open [start, end) range so SQL Server can seek
+# an index on (AwardeeID, AwardDate), and results come back in keyset
+# pages (RefID > last seen) so the first page can be queued while the
+# rest of the merchant is still being read.
+
+DISCOVERY_PAGE_SIZE = CHUNK_SIZE
+
+DISCOVERY_SQL = """
+    SELECT DISTINCT TOP (?) t.RefID, t.TenderStatus
+    FROM D_AwardAwardee aa
+    JOIN M_Award a ON a.AwardID = aa.AwardID
+    JOIN M_Tender t ON t.RefID = a.RefID
+    WHERE aa.AwardeeID = ?
+    AND aa.AwardDate >= ? AND aa.AwardDate < ?
+    AND a.AwardStatusID IN ('2','3','6')
+    AND (t.TenderStatus LIKE '%awarded%' OR t.TenderStatus LIKE '%closed%')
+    AND t.RefID > ?
+    ORDER BY t.RefID
+"""
+
+
+def year_range(year):
+    """Returns [start, end) datetimes for "2024" or an inclusive range like "2022-2024"."""
+    first, _, last = str(year).strip().partition("-")
+    first, last = int(first), int(last or first)
+    if first > last:
+        raise ValueError(f"Year range {year} ends before it starts.")
+    return datetime.datetime(first, 1, 1), datetime.datetime(last + 1, 1, 1)
+
+
+def discover_pages(conn, merchant_org_id, year, page_size=DISCOVERY_PAGE_SIZE):
+    """Yields lists of (refid, tender_status) pairs awarded to the merchant, page by page in RefID order."""
+    start, end = year_range(year)
+    last = 0
+    while True:
+        # The caller runs its metadata queries on conn between pages; without
+        # MARS the page's result set must be fully read and closed first
+        cursor = conn.cursor()
+        try:
+            with metrics.time("db_discovery"):
+                cursor.execute(DISCOVERY_SQL, (page_size, merchant_org_id, start, end, last))
+                rows = cursor.fetchall()
+        finally:
+            cursor.close()
+        if not rows:
+            return
+        yield [(row.RefID, row.TenderStatus) for row in rows]
+        if len(rows) < page_size:
+            return
+        last = rows[-1].RefID
+
+
+# ----------------------------------
+# QUERIES
+# ----------------------------------
+def fetch_assoc_docs(cursor, refids):
+    return group_by(fetch_in(cursor, """
+        SELECT DocID, DocName, RefID, IsElectronic, DocPhyName
+        FROM M_Document
+        WHERE RefID IN ({in_list})
+        AND bidsuppid IS NULL
+    """, refids), lambda row: row.RefID)
+
+
+def fetch_bid_supplements(cursor, refids):
+    return group_by(fetch_in(cursor, """
+        SELECT bs.RefID, d.DocID, bs.BidSuppID, bs.BidSuppTitle, bs.Description, bs.Remarks, bs.CollectionContactID,
+                bs.CollectionContact, bs.CollectionPoint, bs.SpecialInstruction,
+                d.DocName, d.DocPhyName, d.IsElectronic
+        FROM M_BidSupplement bs
+        LEFT JOIN M_Document d
+            ON bs.BidSuppID = d.BidSuppID
+        WHERE bs.RefID IN ({in_list})
+    """, refids), lambda row: row.RefID)
+
+
+def fetch_awards(cursor, refids):
+    return group_by(fetch_in(cursor, """
+        SELECT RefID, AwardID, AwardStatusID FROM M_Award WHERE RefID IN ({in_list})
+    """, refids), lambda row: row.RefID)
+
+
+def fetch_award_files(cursor, award_ids):
+    return group_by(fetch_in(cursor, """
+        SELECT ad.AwardID, rf.ServerFileName, rf.ServerPath
+        FROM R4_AwardNotice_AwardDoc ad
+        JOIN R3_File rf ON ad.FileID = rf.FileID
+        WHERE ad.AwardID IN ({in_list})
+    """, award_ids), lambda row: row.AwardID)
+
+
+# ----------------------------------
+# ARTIFACT PLANNING
+# ----------------------------------
+def assoc_artifacts(refid, docs, freshness):
+    folder = "Associated Components"
+
+    # Electronic TenderDocs are copied; only when none were uploaded do we
+    # fall back to rendering the non-electronic components.
+    tender_docs = [row for row in docs if "tenderdoc" in str(row.DocPhyName or "").lower()]
+    if tender_docs:
+        return [
+            ("copy", folder, os.path.join(SHARE_ROOTS["tender"], row.DocPhyName))
+            for row in tender_docs if row.IsElectronic == 1
+        ]
+
+    return [
+        ("save_pdf", folder, (refid, row.DocID, '0', row.DocName, 'assoc_comp', freshness))
+        for row in docs if row.IsElectronic == 0
+    ]
+
+
+def supplement_artifacts(refid, supplements, freshness):
+    folder = "Bid Supplements"
+    artifacts = []
+
+    for row in supplements:
+        if row.DocPhyName:  # checks if not NULL/empty
+            artifacts.append(("copy", folder, os.path.join(SHARE_ROOTS["bidsupp"], row.DocPhyName)))
+            continue
+
+        artifacts.append(("save_pdf", folder, (refid, row.DocID, row.BidSuppID, row.DocName, 'bid_sup', freshness)))
+
+        if all([row.CollectionContact, row.CollectionContactID, row.CollectionPoint, row.SpecialInstruction]):
+            artifacts.append(("save_pdf", folder, (refid, row.DocID, row.BidSuppID, row.DocName, 'bid_sup_item', freshness)))
+
+            # Check if any field contains a Google Drive link
+            if (DRIVE_LINK in str(row.Description)) or (DRIVE_LINK in str(row.Remarks)):
+                link = row.Description if DRIVE_LINK in str(row.Description) else row.Remarks
+                msg = (
+                    f"Bid Supplement No. {row.BidSuppID} contains files stored in Google Drive.\n"
+                    f"Please manually follow this link to download all available files:\n{link}\n"
+                )
+                artifacts.append(("note", None, msg))
+
+    return artifacts
+
+
+def award_artifacts(awards, award_files, include_award, include_award_notice, freshness):
+    artifacts = []
+
+    for award in awards:
+        award_id = award.AwardID
+        folder = os.path.join("Award", str(award_id))
+
+        if include_award:
+            for file_row in award_files.get(award_id, []):
+                artifacts.append(("copy", folder, os.path.join(SHARE_ROOTS["r3"], file_row.ServerPath, file_row.ServerFileName)))
+
+        if include_award_notice:
+            award_freshness = f"{freshness}|{award.AwardStatusID}"
+            artifacts.append(("save_pdf", folder, (award_id, '0', '0', '0', 'award_notice', award_freshness)))
+
+    return artifacts
+
+
+def load_artifacts(conn, tenders, include_bid_notice, include_assoc, include_supp, include_award_notice, include_award):
+    """Returns {refid: [artifact, ...]} for (refid, tender_status) pairs using set-based queries."""
+    cursor = conn.cursor()
+    refids = [refid for refid, _ in tenders]
+    statuses = dict(tenders)
+    awarded = [refid for refid, status in tenders if status in AWARDED_STATUSES]
+
+    assoc_docs = fetch_assoc_docs(cursor, refids) if include_assoc else {}
+    supplements = fetch_bid_supplements(cursor, refids) if include_supp else {}
+
+    awards = {}
+    award_files = {}
+    if (include_award or include_award_notice) and awarded:
+        awards = fetch_awards(cursor, awarded)
+        if include_award:
+            award_ids = [row.AwardID for rows in awards.values() for row in rows]
+            award_files = fetch_award_files(cursor, award_ids)
+
+    plan = {}
+    for refid in refids:
+        freshness = statuses[refid]
+        artifacts = []
+        if include_bid_notice:
+            artifacts.append(("save_pdf", "", (refid, '0', '0', '0', 'bid_notice', freshness)))
+        if include_assoc:
+            artifacts.extend(assoc_artifacts(refid, assoc_docs.get(refid, []), freshness))
+        if include_supp:
+            artifacts.extend(supplement_artifacts(refid, supplements.get(refid, []), freshness))
+        artifacts.extend(award_artifacts(awards.get(refid, []), award_files, include_award, include_award_notice, freshness))
+        plan[refid] = artifacts
+
+    logging.info(f"Planned {sum(len(a) for a in plan.values())} artifact(s) for {len(refids)} RefID(s).")
+    return plan
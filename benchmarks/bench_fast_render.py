@@ -0,0 +1,108 @@
+"""Per-page render latency: normal waits vs FAST_RENDER.
+
+Renders the same targets through render_engine.AsyncRenderEngine one page at
+a time, once per mode, and prints mean/p50/p95 latency per document type.
+
+Targets file: one "<type> <url>" per line, e.g.
+    bid_notice https://notices.philgeps.gov.ph/GEPSNONPILOT/Tender/PrintableBidNoticeAbstractUI.aspx?refid=7793173
+
+    python benchmarks/bench_fast_render.py targets.txt --storage-state state.json --rounds 3
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from render_engine import AsyncRenderEngine
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def load_targets(path):
+    targets = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith("#"):
+                type, url = line.split(None, 1)
+                targets.append((type, url))
+    return targets
+
+
+def run_mode(targets, fast, args, storage_state, out_dir):
+    engine = AsyncRenderEngine(args.browser_path, concurrency=1, timeout=args.timeout, fast=fast, retry=False).start(storage_state)
+    timings = {}
+    failures = 0
+    try:
+        for round_no in range(args.rounds):
+            for n, (type, url) in enumerate(targets):
+                pdf_path = os.path.join(out_dir, f"{'fast' if fast else 'normal'}-{round_no}-{n}.pdf")
+                started = time.perf_counter()
+                try:
+                    engine.submit(url, pdf_path, type, n).result()
+                    timings.setdefault(type, []).append(time.perf_counter() - started)
+                except Exception as e:
+                    failures += 1
+                    print(f"  ! {type} {url}: {e}", file=sys.stderr)
+    finally:
+        engine.close()
+    return timings, failures
+
+
+def summarize(label, timings):
+    rows = {}
+    for type, values in sorted(timings.items()):
+        rows[type] = {
+            "n": len(values),
+            "mean": statistics.mean(values),
+            "p50": percentile(values, 50),
+            "p95": percentile(values, 95),
+        }
+        r = rows[type]
+        print(f"{label:<7} {type:<13} n={r['n']:<4} mean={r['mean']:.2f}s p50={r['p50']:.2f}s p95={r['p95']:.2f}s")
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("targets", help="file with '<type> <url>' lines")
+    parser.add_argument("--storage-state", help="Playwright storage_state JSON of a logged-in session")
+    parser.add_argument("--browser-path", default=None, help="Chromium executable (default: Playwright's)")
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--timeout", type=int, default=32000)
+    parser.add_argument("--json", help="write the summary here as JSON")
+    args = parser.parse_args()
+
+    targets = load_targets(args.targets)
+    storage_state = None
+    if args.storage_state:
+        with open(args.storage_state, encoding="utf-8") as f:
+            storage_state = json.load(f)
+
+    with tempfile.TemporaryDirectory() as out_dir:
+        normal, normal_failed = run_mode(targets, False, args, storage_state, out_dir)
+        fast, fast_failed = run_mode(targets, True, args, storage_state, out_dir)
+
+    summary = {"normal": summarize("normal", normal), "fast": summarize("fast", fast)}
+    print()
+    for type in sorted(set(summary["normal"]) & set(summary["fast"])):
+        before, after = summary["normal"][type]["p50"], summary["fast"][type]["p50"]
+        print(f"{type:<13} p50 {before:.2f}s -> {after:.2f}s ({(after - before) / before:+.0%})")
+    print(f"failures: normal={normal_failed} fast={fast_failed}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
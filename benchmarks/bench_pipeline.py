@@ -0,0 +1,268 @@
+"""End-to-end throughput of both front ends against local fakes.
+
+Builds a seeded fixture (benchmarks/fixtures.py: SQLite tables + synthetic
+file shares), starts the fake PhilGEPS server (benchmarks/fake_philgeps.py)
+and runs a full extraction through merchant-bulk-extraction.py (queue_job +
+RefID workers + render workers) and through extract_bid_docs.py
+(process_refid per RefID). Reports RefIDs/min, PDFs/min and MB/s of copied
+source documents per front end.
+
+    python benchmarks/bench_pipeline.py --refids 40 --latency 0.3 --json run.json
+    python benchmarks/bench_pipeline.py --refids 40 --baseline run.json --tolerance 0.2
+
+With --baseline, exits with status 1 if any rate dropped by more than
+--tolerance compared to the saved run.
+"""
+import argparse
+import importlib
+import importlib.util
+import json
+import logging
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, REPO_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+from fake_philgeps import FakePhilGEPS
+from fixtures import build_fixture, connect
+
+import batch_metadata
+from adaptive_limiter import AdaptiveLimiter
+from copy_engine import CopyEngine
+from db_pool import ConnectionPool
+from job_journal import JobJournal, JOURNAL_NAME, DONE
+from render_engine import AsyncRenderEngine
+from render_profiles import install_fast_routes
+from session_guard import login_on_page
+
+RATES = ("refids_per_min", "pdfs_per_min", "mb_per_s")
+
+
+class _NoTk:
+    """Stands in for the Tk root the bulk tool schedules UI updates on."""
+
+    def after(self, *args, **kwargs):
+        pass
+
+
+def load_bulk_tool():
+    spec = importlib.util.spec_from_file_location(
+        "merchant_bulk_extraction", os.path.join(REPO_DIR, "merchant-bulk-extraction.py")
+    )
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def collect(out_dir, refids, elapsed):
+    """Counts finished renders and copies from the job journal of out_dir."""
+    db = sqlite3.connect(os.path.join(out_dir, JOURNAL_NAME))
+    rows = db.execute("SELECT dest, kind FROM artifacts WHERE status = ?", (DONE,)).fetchall()
+    failed = db.execute("SELECT COUNT(*) FROM artifacts WHERE status != ?", (DONE,)).fetchone()[0]
+    db.close()
+
+    pdfs = sum(1 for _, kind in rows if kind not in ("copy", "note"))
+    copied = [os.path.join(out_dir, dest) for dest, kind in rows if kind == "copy"]
+    copied_bytes = sum(os.path.getsize(path) for path in copied if os.path.exists(path))
+    minutes = elapsed / 60
+    return {
+        "refids": refids,
+        "pdfs": pdfs,
+        "copies": len(copied),
+        "failed": failed,
+        "seconds": round(elapsed, 2),
+        "refids_per_min": round(refids / minutes, 2),
+        "pdfs_per_min": round(pdfs / minutes, 2),
+        "mb_per_s": round(copied_bytes / (1024 * 1024) / elapsed, 2),
+    }
+
+
+# ----------------------------------
+# FRONT ENDS
+# ----------------------------------
+def run_bulk(fixture, fake, args, work_dir):
+    bulk = load_bulk_tool()
+    out_dir = os.path.join(work_dir, "bulk-output")
+    os.makedirs(out_dir)
+
+    bulk.root = _NoTk()
+    bulk.log_message = logging.debug
+    bulk.GEPS_URL.update(fake.urls())
+    bulk.BROWSER_PATH = args.browser_path
+    bulk.OUTPUT_DIR = out_dir
+    bulk.RENDER_MODE = args.bulk_mode
+    bulk.FAST_RENDER = args.fast
+    bulk.HTTP_ABSTRACTS = args.http_abstracts
+    bulk.user_credentials = {"username": fake.username, "password": fake.password}
+    bulk.db_pool = ConnectionPool(lambda: connect(fixture.db_path), max_size=bulk.DB_POOL_SIZE)
+    bulk.copy_engine = CopyEngine(
+        workers=bulk.COPY_WORKERS, buffer_size=bulk.COPY_BUFFER_SIZE,
+        share_limits={root: 4 for root in fixture.share_roots.values()}
+    )
+    bulk.stop_worker = threading.Event()
+    bulk.prepare_output_root()
+
+    started = time.perf_counter()
+    login = threading.Thread(
+        target=bulk.login_philgeps, args=(os.path.join(work_dir, "bulk-session"), bulk.stop_worker), daemon=True
+    )
+    login.start()
+    scheduler = bulk.start_scheduler(bulk.stop_worker)
+
+    with bulk.db_pool.connection() as conn:
+        bulk.queue_job(conn, fixture.merchant_org_id, fixture.year, True, True, True, True, True)
+    while (bulk.task_queue.unfinished_tasks or bulk.pdf_task_queue.unfinished_tasks
+           or bulk.copy_engine.pending or bulk.refid_finalizer.pending):
+        if not login.is_alive():
+            raise SystemExit("The bulk tool's render workers stopped (login failed?).")
+        time.sleep(0.2)
+    elapsed = time.perf_counter() - started
+
+    bulk.stop_worker.set()
+    bulk.stop_scheduler(scheduler)
+    login.join(timeout=30)
+    bulk.journal.close()
+    stages = bulk.metrics.finish_run()
+    return collect(out_dir, len(fixture.refids), elapsed), stages
+
+
+def run_cli(fixture, fake, args, work_dir):
+    from playwright.sync_api import sync_playwright
+
+    cli = importlib.import_module("extract_bid_docs")
+    out_dir = os.path.join(work_dir, "cli-output")
+    os.makedirs(out_dir)
+
+    cli.LOGIN_CONFIG.update(fake.urls())
+    cli.OUTPUT_DIR = out_dir
+    cli.FAST_RENDER = args.fast
+    cli.user_credentials.update(username=fake.username, password=fake.password)
+    cli.journal = JobJournal(out_dir)
+    cli.metrics.start_run(out_dir)
+    conn = connect(fixture.db_path)
+
+    with sync_playwright() as p:
+        started = time.perf_counter()
+        browser = p.chromium.launch_persistent_context(
+            user_data_dir=os.path.join(work_dir, "cli-session"), headless=True, executable_path=args.browser_path
+        )
+        page = browser.new_page()
+        if not login_on_page(page, cli.LOGIN_CONFIG["login_url"], cli.user_credentials):
+            raise SystemExit("Login to the fake server failed.")
+        if cli.FAST_RENDER:
+            install_fast_routes(browser)
+
+        engine = None
+        if args.cli_mode == "async":
+            engine = AsyncRenderEngine(
+                args.browser_path, concurrency=cli.RENDER_CONCURRENCY, fast=cli.FAST_RENDER,
+                breaker=cli.render_breaker,
+                limiter=AdaptiveLimiter(max_limit=cli.RENDER_CONCURRENCY, max_rps=cli.PORTAL_MAX_RPS)
+            ).start(browser.storage_state())
+
+        for refid in fixture.refids:
+            with cli.metrics.tags(refid=refid, worker="main"):
+                cli.process_refid(str(refid), conn, page, engine)
+        elapsed = time.perf_counter() - started
+
+        if engine:
+            engine.close()
+        browser.close()
+
+    conn.close()
+    cli.journal.close()
+    stages = cli.metrics.finish_run()
+    return collect(out_dir, len(fixture.refids), elapsed), stages
+
+
+# ----------------------------------
+# REPORTING
+# ----------------------------------
+def print_results(results):
+    print(f"{'front end':<10} {'RefIDs':>6} {'PDFs':>6} {'copies':>6} {'failed':>6} {'wall':>8} "
+          f"{'RefIDs/min':>10} {'PDFs/min':>9} {'MB/s':>7}")
+    for name, r in results.items():
+        print(f"{name:<10} {r['refids']:>6} {r['pdfs']:>6} {r['copies']:>6} {r['failed']:>6} {r['seconds']:>7.1f}s "
+              f"{r['refids_per_min']:>10.1f} {r['pdfs_per_min']:>9.1f} {r['mb_per_s']:>7.1f}")
+
+
+def compare(results, baseline, tolerance):
+    """Returns one message per rate that fell more than tolerance below the baseline."""
+    regressions = []
+    for name, r in results.items():
+        for rate in RATES:
+            before = baseline.get(name, {}).get(rate)
+            if before and r[rate] < before * (1 - tolerance):
+                regressions.append(f"{name} {rate}: {before} -> {r[rate]} ({(r[rate] - before) / before:+.0%})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--front-end", choices=("both", "bulk", "cli"), default="both")
+    parser.add_argument("--refids", type=int, default=40)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--file-kb", type=int, default=256, help="mean size of synthetic source files")
+    parser.add_argument("--latency", type=float, default=0.3, help="fake portal latency per page (s)")
+    parser.add_argument("--jitter", type=float, default=0.1)
+    parser.add_argument("--session-ttl", type=float, default=0, help="expire logins after this many seconds (0 = never)")
+    parser.add_argument("--bulk-mode", choices=("pages", "async"), default="pages")
+    parser.add_argument("--cli-mode", choices=("sync", "async"), default="sync")
+    parser.add_argument("--fast", action="store_true", help="enable FAST_RENDER in both front ends")
+    parser.add_argument("--http-abstracts", action="store_true", help="enable HTTP_ABSTRACTS in the bulk tool")
+    parser.add_argument("--browser-path", default=None, help="Chromium executable (default: Playwright's)")
+    parser.add_argument("--json", help="write the results here")
+    parser.add_argument("--baseline", help="results JSON of an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.15)
+    parser.add_argument("--stages", action="store_true", help="print per-stage p50/p95/p99 for each front end")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        fixture = build_fixture(os.path.join(work_dir, "fixture"), refids=args.refids, seed=args.seed, file_kb=args.file_kb)
+        batch_metadata.SHARE_ROOTS.update(fixture.share_roots)
+        fake = FakePhilGEPS(
+            latency=args.latency, jitter=args.jitter, session_ttl=args.session_ttl, seed=args.seed
+        ).start()
+
+        results = {}
+        stages = {}
+        try:
+            runners = {"bulk": run_bulk, "cli": run_cli}
+            for name in (("bulk", "cli") if args.front_end == "both" else (args.front_end,)):
+                # The front ends configure logging at import; keep the benchmark output readable
+                logging.getLogger().setLevel(logging.DEBUG if args.verbose else logging.WARNING)
+                results[name], stages[name] = runners[name](fixture, fake, args, work_dir)
+                logging.getLogger().setLevel(logging.DEBUG if args.verbose else logging.WARNING)
+        finally:
+            fake.stop()
+
+    print_results(results)
+    print(f"fake portal: {fake.stats}")
+    if args.stages:
+        for name, lines in stages.items():
+            print(f"\n{name} stages:")
+            for line in lines:
+                print(f"  {line}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"args": vars(args), **results}, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for message in regressions:
+            print(f"REGRESSION {message}")
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""Local check of the shared work queue (work_queue.py) used by --queue.
+
+Seeds one job into a temporary queue file and runs it two ways:
+
+1. Two WorkQueue instances in this process with a short lease: the first
+   claims a batch and "dies" (never completes or renews), the second finds
+   nothing to claim until those leases expire, then reclaims them.
+2. --workers separate processes claiming, "extracting" (a sleep) and
+   completing RefIDs, with --kill of them exiting mid-batch while holding
+   leases. The survivors must finish every RefID exactly once.
+
+    python benchmarks/bench_work_queue.py --refids 200 --workers 4 --kill 1 --lease 2
+
+Exits with status 1 if a RefID is lost, done twice, or left open.
+"""
+import argparse
+import multiprocessing
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from work_queue import WorkQueue, DONE, LEASED, PENDING
+
+JOB_ID = "bench"
+
+
+def check_reclaim(path, lease):
+    """Returns a list of problems with the claim / lease expiry / reclaim path."""
+    problems = []
+    seed = WorkQueue(path, "reclaim", "seed")
+    seed.add([(refid, "Awarded") for refid in range(1, 11)])
+    seed.close()
+
+    dead = WorkQueue(path, "reclaim", "dead", lease_seconds=lease)
+    live = WorkQueue(path, "reclaim", "live", lease_seconds=lease)
+    held = dead.claim(4)
+    if len(held) != 4:
+        problems.append(f"first worker claimed {len(held)} of 4")
+
+    # Unexpired leases are never handed out twice
+    first = live.claim(100)
+    overlap = {refid for refid, _ in held} & {refid for refid, _ in first}
+    if overlap:
+        problems.append(f"live leases claimed twice: {sorted(overlap)}")
+    for refid, _ in first:
+        live.complete(refid)
+    if live.claim(100):
+        problems.append("claimed RefIDs that are still leased")
+
+    time.sleep(lease + 0.2)
+    reclaimed = live.claim(100)
+    if sorted(reclaimed) != sorted(held) or live.reclaimed != 4:
+        problems.append(f"expected to reclaim {sorted(held)}, got {sorted(reclaimed)}")
+    for refid, _ in reclaimed:
+        live.complete(refid)
+
+    # A late complete() from the dead worker must not touch RefIDs it lost
+    dead.complete(held[0][0], ok=False, error="late")
+    counts = live.counts()
+    if counts != {DONE: 10}:
+        problems.append(f"expected 10 done, got {counts}")
+
+    dead.close(release=False)
+    live.close()
+    return problems
+
+
+def worker(path, name, lease, work_seconds, die_after):
+    queue = WorkQueue(path, JOB_ID, name, lease_seconds=lease).start_heartbeat(lease / 3)
+    done = 0
+    while True:
+        claimed = queue.claim(4)
+        if not claimed:
+            if not queue.open_count():
+                break
+            time.sleep(lease / 4)
+            continue
+        for refid, _ in claimed:
+            if die_after is not None and done >= die_after:
+                # Crash with leases held: no release, no more heartbeats
+                os._exit(3)
+            time.sleep(work_seconds)
+            queue.complete(refid)
+            done += 1
+    print(f"  {queue.report()}")
+    queue.close()
+
+
+def run_workers(path, args):
+    WorkQueue(path, JOB_ID, "seed").add([(refid, "Awarded") for refid in range(1, args.refids + 1)])
+
+    started = time.perf_counter()
+    processes = []
+    for n in range(args.workers):
+        die_after = args.refids // (args.workers * 4) if n < args.kill else None
+        process = multiprocessing.Process(target=worker, args=(path, f"worker-{n}", args.lease, args.work, die_after))
+        process.start()
+        processes.append(process)
+    for process in processes:
+        process.join()
+    elapsed = time.perf_counter() - started
+
+    db = sqlite3.connect(path)
+    rows = dict(db.execute("SELECT status, COUNT(*) FROM work WHERE job_id = ? GROUP BY status", (JOB_ID,)).fetchall())
+    reclaimed = db.execute("SELECT COUNT(*) FROM work WHERE job_id = ? AND attempts > 1", (JOB_ID,)).fetchone()[0]
+    db.close()
+
+    print(f"{args.workers} worker(s), {args.kill} killed: {rows.get(DONE, 0)}/{args.refids} done in {elapsed:.1f}s, "
+          f"{reclaimed} RefID(s) reclaimed after a lease expired")
+    problems = []
+    if rows.get(DONE, 0) != args.refids or rows.get(PENDING) or rows.get(LEASED):
+        problems.append(f"queue not drained: {rows}")
+    if args.kill and not reclaimed:
+        problems.append("killed workers' leases were never reclaimed")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--refids", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--kill", type=int, default=1, help="workers that exit mid-job holding leases")
+    parser.add_argument("--lease", type=float, default=2.0, help="lease seconds (short, to see reclaims quickly)")
+    parser.add_argument("--work", type=float, default=0.01, help="seconds of fake work per RefID")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="bench-work-queue-") as work_dir:
+        problems = check_reclaim(os.path.join(work_dir, "reclaim.sqlite"), args.lease)
+        print("claim / lease expiry / reclaim:", "ok" if not problems else "FAILED")
+        problems += run_workers(os.path.join(work_dir, "queue.sqlite"), args)
+
+    for problem in problems:
+        print(f"! {problem}", file=sys.stderr)
+    sys.exit(1 if problems else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,288 @@
+"""Local stand-in for the PhilGEPS pages the extractors visit.
+
+Serves the six GEPS_URL/LOGIN_CONFIG endpoints (log-in.aspx plus the five
+Tender/*.aspx views) and LogoutRedirect.aspx under /GEPSNONPILOT/, with the
+same behaviour the extractors depend on:
+
+  * log-in.aspx has the userName/password/btnLogin form; a successful POST
+    sets a session cookie and redirects away from the login page
+  * every other page redirects to log-in.aspx without a live session, and
+    sessions expire after --session-ttl seconds (0 = never)
+  * non-electronic views carry the span#ctl01_nameLBL admin label
+  * pages pull a stylesheet, an image and an analytics script, so
+    FAST_RENDER has something to block
+  * every page answers after --latency seconds plus up to --jitter
+
+    python benchmarks/fake_philgeps.py --port 8765 --latency 0.3 --session-ttl 120
+"""
+import argparse
+import html
+import random
+import secrets
+import threading
+import time
+from http.cookies import SimpleCookie
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+PREFIX = "/GEPSNONPILOT"
+SESSION_COOKIE = "ASP.NET_SessionId"
+
+ENDPOINTS = {
+    "login_url": f"{PREFIX}/log-in.aspx",
+    "bid_notice_url": f"{PREFIX}/Tender/PrintableBidNoticeAbstractUI.aspx",
+    "award_notice_url": f"{PREFIX}/Tender/printableAwardNoticeAbstractUI.aspx",
+    "assoc_comp_url": f"{PREFIX}/Tender/ViewNonElectronicAssocCompUI.aspx",
+    "bid_sup_url": f"{PREFIX}/Tender/BidSupplementViewUI.aspx",
+    "bid_sup_item_url": f"{PREFIX}/Tender/ViewNonElectronicAssocCompUI.aspx",
+}
+LOGOUT_PATH = f"{PREFIX}/LogoutRedirect.aspx"
+HOME_PATH = f"{PREFIX}/Default.aspx"
+
+# 1x1 transparent PNG
+PIXEL = bytes.fromhex(
+    "89504e470d0a1a0a0000000d49484452000000010000000108060000001f15c489"
+    "0000000d49444154789c6360000002000154a24f5d0000000049454e44ae426082"
+)
+
+PAGE = """<!DOCTYPE html>
+<html><head><title>{title}</title>
+<link rel="stylesheet" href="{prefix}/static/site.css">
+<script src="{prefix}/static/analytics.js"></script>
+</head><body>
+<img src="{prefix}/static/logo.png" alt="PhilGEPS">
+{admin}
+<h1>{title}</h1>
+<table>{rows}</table>
+</body></html>
+"""
+
+LOGIN_PAGE = """<!DOCTYPE html>
+<html><head><title>PhilGEPS Log In</title></head><body>
+<form method="post" action="{prefix}/log-in.aspx">
+<input type="text" name="userName">
+<input type="password" id="password" name="password">
+<input type="submit" id="btnLogin" value="Log In">
+</form>
+{message}
+</body></html>
+"""
+
+
+class FakePhilGEPS:
+    def __init__(self, host="127.0.0.1", port=0, latency=0.2, jitter=0.1, asset_latency=0.05,
+                 session_ttl=0, username="bench", password="bench", seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.asset_latency = asset_latency
+        self.session_ttl = session_ttl
+        self.username = username
+        self.password = password
+
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._sessions = {}  # session id -> created (monotonic)
+        self.stats = {"pages": 0, "assets": 0, "logins": 0, "expired": 0, "redirects": 0}
+
+        handler = type("Handler", (_Handler,), {"fake": self})
+        self._server = ThreadingHTTPServer((host, port), handler)
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def urls(self):
+        """GEPS_URL/LOGIN_CONFIG entries pointing at this server."""
+        return {key: self.base_url + path for key, path in ENDPOINTS.items()}
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    # ----------------------------------
+    # SESSIONS
+    # ----------------------------------
+    def new_session(self):
+        sid = secrets.token_hex(12)
+        with self._lock:
+            self._sessions[sid] = time.monotonic()
+            self.stats["logins"] += 1
+        return sid
+
+    def session_alive(self, sid):
+        with self._lock:
+            created = self._sessions.get(sid)
+            if created is None:
+                return False
+            if self.session_ttl and time.monotonic() - created > self.session_ttl:
+                del self._sessions[sid]
+                self.stats["expired"] += 1
+                return False
+            return True
+
+    def end_session(self, sid):
+        with self._lock:
+            self._sessions.pop(sid, None)
+
+    def count(self, key):
+        with self._lock:
+            self.stats[key] += 1
+
+    def delay(self, asset=False):
+        if asset:
+            time.sleep(self.asset_latency)
+            return
+        with self._lock:
+            extra = self._random.uniform(0, self.jitter)
+        time.sleep(self.latency + extra)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    fake = None
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    # ----------------------------------
+    # HELPERS
+    # ----------------------------------
+    def _session_id(self):
+        cookie = SimpleCookie(self.headers.get("Cookie", ""))
+        morsel = cookie.get(SESSION_COOKIE)
+        return morsel.value if morsel else None
+
+    def _send(self, status, body=b"", content_type="text/html; charset=utf-8", headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def _redirect(self, location, headers=None):
+        self._send(302, b"", headers={"Location": location, **(headers or {})})
+
+    def _login_page(self, message=""):
+        self._send(200, LOGIN_PAGE.format(prefix=PREFIX, message=message).encode("utf-8"))
+
+    # ----------------------------------
+    # ROUTES
+    # ----------------------------------
+    def do_GET(self):
+        url = urlsplit(self.path)
+        path = url.path
+        query = {k.lower(): v[0] for k, v in parse_qs(url.query).items()}
+
+        if path.startswith(f"{PREFIX}/static/"):
+            self.fake.count("assets")
+            self.fake.delay(asset=True)
+            if path.endswith(".png"):
+                return self._send(200, PIXEL, "image/png")
+            if path.endswith(".css"):
+                return self._send(200, b"body{font-family:sans-serif}table{border-collapse:collapse}", "text/css")
+            return self._send(200, b"", "application/javascript")
+
+        if path.lower() == ENDPOINTS["login_url"].lower():
+            self.fake.delay()
+            if self.fake.session_alive(self._session_id()):
+                return self._redirect(HOME_PATH)
+            return self._login_page()
+
+        if path == LOGOUT_PATH:
+            self.fake.end_session(self._session_id())
+            return self._redirect(ENDPOINTS["login_url"])
+
+        if not self.fake.session_alive(self._session_id()):
+            self.fake.count("redirects")
+            return self._redirect(f"{ENDPOINTS['login_url']}?ReturnUrl={path}")
+
+        self.fake.count("pages")
+        self.fake.delay()
+        page = self._render(path, query)
+        if page is None:
+            return self._send(404, b"Not found", "text/plain")
+        self._send(200, page.encode("utf-8"))
+
+    def do_HEAD(self):
+        self.do_GET()
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        form = {k: v[0] for k, v in parse_qs(self.rfile.read(length).decode("utf-8")).items()}
+
+        if urlsplit(self.path).path.lower() != ENDPOINTS["login_url"].lower():
+            return self._send(404, b"Not found", "text/plain")
+
+        self.fake.delay()
+        if form.get("userName") != self.fake.username or form.get("password") != self.fake.password:
+            return self._login_page("<p>Invalid user name or password.</p>")
+
+        sid = self.fake.new_session()
+        self._redirect(HOME_PATH, headers={"Set-Cookie": f"{SESSION_COOKIE}={sid}; Path=/; HttpOnly"})
+
+    def _render(self, path, query):
+        if path == HOME_PATH:
+            return _page("PhilGEPS Home", {"Welcome": "Benchmark user"}, admin=True)
+        if path == ENDPOINTS["bid_notice_url"]:
+            return _page(f"Bid Notice Abstract {query.get('refid')}", _abstract_rows("Reference Number", query.get("refid")))
+        if path == ENDPOINTS["award_notice_url"]:
+            return _page(f"Award Notice Abstract {query.get('awardid')}", _abstract_rows("Award ID", query.get("awardid")))
+        if path == ENDPOINTS["assoc_comp_url"]:
+            return _page(f"Document {query.get('docid')}", {"RefID": query.get("refid"), "Doc ID": query.get("docid")}, admin=True)
+        if path == ENDPOINTS["bid_sup_url"]:
+            return _page(f"Bid Supplement {query.get('bidsuppid')}", {"RefID": query.get("refid")}, admin=True)
+        return None
+
+
+def _abstract_rows(label, value):
+    # Real abstracts are long tables; keep them above abstract_fetcher.MIN_ABSTRACT_BYTES
+    rows = {label: value}
+    for n in range(40):
+        rows[f"Field {n + 1}"] = f"Value {n + 1} for {value}"
+    return rows
+
+
+def _page(title, rows, admin=False):
+    cells = "".join(
+        f"<tr><th>{html.escape(str(k))}</th><td>{html.escape(str(v))}</td></tr>" for k, v in rows.items()
+    )
+    label = '<span id="ctl01_nameLBL">Admin User</span>' if admin else ""
+    return PAGE.format(title=html.escape(title), prefix=PREFIX, admin=label, rows=cells)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds before each page answers")
+    parser.add_argument("--jitter", type=float, default=0.1, help="extra random latency, up to this many seconds")
+    parser.add_argument("--session-ttl", type=float, default=0, help="seconds before a login expires (0 = never)")
+    parser.add_argument("--username", default="bench")
+    parser.add_argument("--password", default="bench")
+    args = parser.parse_args()
+
+    fake = FakePhilGEPS(
+        args.host, args.port, latency=args.latency, jitter=args.jitter,
+        session_ttl=args.session_ttl, username=args.username, password=args.password
+    ).start()
+    print(f"Fake PhilGEPS on {fake.base_url}{ENDPOINTS['login_url']} (user {args.username!r}). Ctrl+C to stop.")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        fake.stop()
+
+
+if __name__ == "__main__":
+    main()
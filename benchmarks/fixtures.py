@@ -0,0 +1,226 @@
+"""Seeded SQLite stand-in for the PhilGEPS tables plus synthetic file shares.
+
+build_fixture() creates, under one root folder:
+    philgeps.sqlite   M_Tender, M_Document, M_BidSupplement, M_Award,
+                      D_AwardAwardee, M_Organization, R4_AwardNotice_AwardDoc, R3_File
+    shares/tender     electronic TenderDocs      (batch_metadata.SHARE_ROOTS["tender"])
+    shares/bidsupp    bid supplement files       (SHARE_ROOTS["bidsupp"])
+    shares/r3         award documents            (SHARE_ROOTS["r3"])
+
+connect() returns a connection that behaves like pyodbc where the extractors
+rely on it: rows allow row.Column and row[0], execute() takes the
+parameters either as one sequence or as separate arguments, datetime
+parameters compare against the AwardDate text, and the T-SQL
+"SELECT DISTINCT TOP (?)" of the discovery query becomes a LIMIT.
+
+    python benchmarks/fixtures.py /tmp/philgeps-fixture --refids 200
+"""
+import argparse
+import collections
+import datetime
+import os
+import random
+import sqlite3
+
+SCHEMA = """
+CREATE TABLE M_Organization (OrgID INTEGER PRIMARY KEY, OrgName TEXT);
+CREATE TABLE M_Tender (RefID INTEGER PRIMARY KEY, TenderStatus TEXT);
+CREATE TABLE M_Document (
+    DocID INTEGER PRIMARY KEY, RefID INTEGER, BidSuppID INTEGER,
+    DocName TEXT, DocPhyName TEXT, IsElectronic INTEGER
+);
+CREATE TABLE M_BidSupplement (
+    BidSuppID INTEGER PRIMARY KEY, RefID INTEGER, BidSuppTitle TEXT, Description TEXT, Remarks TEXT,
+    CollectionContactID INTEGER, CollectionContact TEXT, CollectionPoint TEXT, SpecialInstruction TEXT
+);
+CREATE TABLE M_Award (AwardID INTEGER PRIMARY KEY, RefID INTEGER, AwardStatusID INTEGER);
+CREATE TABLE D_AwardAwardee (AwardID INTEGER, AwardeeID INTEGER, AwardDate TEXT);
+CREATE TABLE R3_File (FileID INTEGER PRIMARY KEY, ServerFileName TEXT, ServerPath TEXT);
+CREATE TABLE R4_AwardNotice_AwardDoc (AwardID INTEGER, FileID INTEGER);
+CREATE INDEX ix_document_refid ON M_Document (RefID);
+CREATE INDEX ix_document_bidsupp ON M_Document (BidSuppID);
+CREATE INDEX ix_bidsupp_refid ON M_BidSupplement (RefID);
+CREATE INDEX ix_award_refid ON M_Award (RefID);
+CREATE INDEX ix_awardee ON D_AwardAwardee (AwardeeID, AwardDate);
+"""
+
+DB_NAME = "philgeps.sqlite"
+TOP_PARAM = "TOP (?)"
+
+Fixture = collections.namedtuple("Fixture", "root db_path share_roots merchant_org_id year refids source_bytes")
+
+
+# ----------------------------------
+# PYODBC-LIKE CONNECTION
+# ----------------------------------
+_row_types = {}
+
+
+def _row_factory(cursor, values):
+    fields = tuple(column[0] for column in cursor.description)
+    row_type = _row_types.get(fields)
+    if row_type is None:
+        row_type = _row_types[fields] = collections.namedtuple("Row", fields, rename=True)
+    return row_type(*values)
+
+
+class Cursor:
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def execute(self, sql, *params):
+        if len(params) == 1 and isinstance(params[0], (list, tuple)):
+            params = params[0]
+        params = tuple(p.isoformat(" ") if isinstance(p, datetime.datetime) else p for p in params)
+        if TOP_PARAM in sql:
+            # Only valid where TOP (?) is the first parameter, as in batch_metadata.DISCOVERY_SQL
+            sql = sql.replace(TOP_PARAM, "", 1).rstrip() + " LIMIT ?"
+            params = params[1:] + params[:1]
+        self._cursor.execute(sql, params)
+        return self
+
+    def fetchone(self):
+        return self._cursor.fetchone()
+
+    def fetchall(self):
+        return self._cursor.fetchall()
+
+    def fetchmany(self, size=1):
+        return self._cursor.fetchmany(size)
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    def close(self):
+        self._cursor.close()
+
+
+class Connection:
+    def __init__(self, db_path):
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = _row_factory
+
+    def cursor(self):
+        return Cursor(self._conn.cursor())
+
+    def execute(self, sql, *params):
+        return self.cursor().execute(sql, *params)
+
+    def commit(self):
+        self._conn.commit()
+
+    def close(self):
+        self._conn.close()
+
+
+def connect(db_path):
+    return Connection(db_path)
+
+
+# ----------------------------------
+# GENERATION
+# ----------------------------------
+def _write_file(path, size, rng):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(rng.randbytes(size))
+    return size
+
+
+def build_fixture(root, refids=50, seed=7, merchant_org_id=1001, year=2024, file_kb=256):
+    """Creates the database and shares under root; the same seed always gives the same fixture."""
+    rng = random.Random(seed)
+    shares = {name: os.path.join(root, "shares", name) for name in ("tender", "bidsupp", "r3")}
+    for path in shares.values():
+        os.makedirs(path, exist_ok=True)
+
+    db_path = os.path.join(root, DB_NAME)
+    if os.path.exists(db_path):
+        os.remove(db_path)
+    db = sqlite3.connect(db_path)
+    db.executescript(SCHEMA)
+    db.execute("INSERT INTO M_Organization VALUES (?, ?)", (merchant_org_id, "Benchmark Trading Corp."))
+
+    def file_size():
+        return max(1024, int(rng.gauss(file_kb, file_kb / 4)) * 1024)
+
+    doc_id = bidsupp_id = award_id = file_id = 0
+    source_bytes = 0
+    tender_refids = []
+
+    for n in range(refids):
+        refid = 7_000_000 + n
+        tender_refids.append(refid)
+        db.execute("INSERT INTO M_Tender VALUES (?, ?)", (refid, rng.choice(["Awarded", "Closed"])))
+
+        # Associated components: electronic TenderDocs, or non-electronic ones to render
+        if rng.random() < 0.6:
+            for i in range(rng.randint(1, 3)):
+                doc_id += 1
+                name = f"TenderDoc_{refid}_{i}.pdf"
+                source_bytes += _write_file(os.path.join(shares["tender"], name), file_size(), rng)
+                db.execute("INSERT INTO M_Document VALUES (?, ?, NULL, ?, ?, 1)", (doc_id, refid, name, name))
+        else:
+            for i in range(rng.randint(1, 2)):
+                doc_id += 1
+                db.execute(
+                    "INSERT INTO M_Document VALUES (?, ?, NULL, ?, NULL, 0)",
+                    (doc_id, refid, f"Component {i + 1}")
+                )
+
+        # Bid supplements: uploaded files, or non-electronic ones with collection details
+        for i in range(rng.randint(0, 2)):
+            bidsupp_id += 1
+            doc_id += 1
+            if rng.random() < 0.5:
+                name = f"BidSupp_{bidsupp_id}.pdf"
+                source_bytes += _write_file(os.path.join(shares["bidsupp"], name), file_size(), rng)
+                db.execute(
+                    "INSERT INTO M_BidSupplement VALUES (?, ?, ?, ?, ?, NULL, NULL, NULL, NULL)",
+                    (bidsupp_id, refid, f"Supplement {i + 1}", "Revised specs", "")
+                )
+                db.execute("INSERT INTO M_Document VALUES (?, ?, ?, ?, ?, 1)", (doc_id, refid, bidsupp_id, name, name))
+            else:
+                db.execute(
+                    "INSERT INTO M_BidSupplement VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (bidsupp_id, refid, f"Supplement {i + 1}", "Samples required", "",
+                     42, "BAC Secretariat", "Procurement Office", "Bring two copies")
+                )
+                db.execute(
+                    "INSERT INTO M_Document VALUES (?, ?, ?, ?, NULL, 0)",
+                    (doc_id, refid, bidsupp_id, f"Supplement {i + 1}")
+                )
+
+        # Award to the merchant, with award documents on the R3 share
+        award_id += 1
+        db.execute("INSERT INTO M_Award VALUES (?, ?, ?)", (award_id, refid, rng.choice([2, 3, 6])))
+        award_date = f"{year}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d} 00:00:00"
+        db.execute("INSERT INTO D_AwardAwardee VALUES (?, ?, ?)", (award_id, merchant_org_id, award_date))
+        for i in range(rng.randint(1, 2)):
+            file_id += 1
+            server_path = os.path.join(str(year), f"{award_id % 100:02d}")
+            name = f"award_{award_id}_{i}.pdf"
+            source_bytes += _write_file(os.path.join(shares["r3"], server_path, name), file_size(), rng)
+            db.execute("INSERT INTO R3_File VALUES (?, ?, ?)", (file_id, name, server_path))
+            db.execute("INSERT INTO R4_AwardNotice_AwardDoc VALUES (?, ?)", (award_id, file_id))
+
+    db.commit()
+    db.close()
+    return Fixture(root, db_path, shares, merchant_org_id, year, tender_refids, source_bytes)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("root")
+    parser.add_argument("--refids", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--file-kb", type=int, default=256)
+    args = parser.parse_args()
+
+    fixture = build_fixture(args.root, refids=args.refids, seed=args.seed, file_kb=args.file_kb)
+    print(f"{len(fixture.refids)} RefID(s), {fixture.source_bytes / (1024 * 1024):.1f} MB of source files in {fixture.root}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+import hashlib
+import logging
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+
+from copy_engine import copy_file, copy_dest, long_path, BUFFER_SIZE
+from job_journal import part_path
+
+# ----------------------------------
+# CONTENT-ADDRESSED DEDUPE STORE
+# ----------------------------------
+# The same DocPhyName / R3_File shows up under many RefIDs and merchant
+# jobs. The store keeps one object per SHA-256 under <root>/objects and an
+# index of (source path, size, mtime) -> hash, so a repeat source is never
+# read from the share again: its destination becomes a reflink (where the
+# filesystem supports it) or a hardlink of the stored object.
+
+FICLONE = 0x40049409  # linux/fs.h, btrfs/xfs copy-on-write clone
+
+HASH_CHUNK = 1024 * 1024
+
+
+def sha256_file(path):
+    digest = hashlib.sha256()
+    with open(long_path(path), "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def reflink(src, dest):
+    """Copy-on-write clone of src at dest. Returns False when the filesystem cannot do it."""
+    if not sys.platform.startswith("linux"):
+        return False
+    import fcntl
+
+    try:
+        with open(src, "rb") as fsrc, open(dest, "wb") as fdst:
+            fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+        return True
+    except OSError:
+        try:
+            os.remove(dest)
+        except OSError:
+            pass
+        return False
+
+
+def materialize(obj, dest, use_reflink=True):
+    """Puts obj at dest as a reflink, hardlink or (last resort) a local copy."""
+    tmp = part_path(dest)
+    if os.path.exists(tmp):
+        os.remove(tmp)
+
+    if not (use_reflink and reflink(obj, tmp)):
+        try:
+            os.link(obj, tmp)
+        except OSError:
+            shutil.copyfile(obj, tmp)
+    os.replace(tmp, dest)
+
+
+class ContentStore:
+    def __init__(self, root, use_reflink=True):
+        self.root = root
+        self.use_reflink = use_reflink
+        os.makedirs(os.path.join(root, "objects"), exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(os.path.join(root, "index.sqlite"), check_same_thread=False)
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS sources (
+                path TEXT, size INTEGER, mtime_ns INTEGER, sha256 TEXT,
+                PRIMARY KEY (path, size, mtime_ns)
+            )
+        """)
+        self._db.commit()
+
+        self.hits = 0
+        self.bytes_saved = 0
+
+    def object_path(self, sha):
+        return os.path.join(self.root, "objects", sha[:2], sha)
+
+    # ----------------------------------
+    # INDEX
+    # ----------------------------------
+    def _lookup(self, key):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT sha256 FROM sources WHERE path = ? AND size = ? AND mtime_ns = ?", key
+            ).fetchone()
+        return row[0] if row else None
+
+    def _remember(self, key, sha):
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO sources VALUES (?, ?, ?, ?)", (*key, sha))
+            self._db.commit()
+
+    # ----------------------------------
+    # PLACEMENT
+    # ----------------------------------
+    def place(self, src, dest_folder, buffer_size=BUFFER_SIZE):
+        """Copies src into dest_folder through the store. Returns (bytes_read_from_share, bytes_saved)."""
+        st = os.stat(long_path(src))
+        key = (os.path.normcase(os.path.abspath(src)), st.st_size, st.st_mtime_ns)
+        dest = long_path(copy_dest(src, dest_folder))
+
+        sha = self._lookup(key)
+        if sha and os.path.exists(self.object_path(sha)):
+            materialize(self.object_path(sha), dest, self.use_reflink)
+            self._saved(st.st_size)
+            return 0, st.st_size
+
+        # First sighting of this source: one real copy, then hash it locally
+        copied = copy_file(src, dest_folder, buffer_size)
+        sha = sha256_file(dest)
+        obj = self.object_path(sha)
+        os.makedirs(os.path.dirname(obj), exist_ok=True)
+
+        saved = 0
+        stored = os.path.exists(obj)
+        if not stored:
+            try:
+                os.link(dest, obj)
+            except FileExistsError:
+                # Another copy thread stored the same bytes first
+                stored = True
+            except OSError:
+                # No hardlinks here: store a private copy, renamed into place
+                # so obj never shares an inode with a half-written file
+                fd, tmp = tempfile.mkstemp(dir=os.path.dirname(obj), suffix=".part")
+                os.close(fd)
+                shutil.copyfile(dest, tmp)
+                os.replace(tmp, obj)
+        if stored:
+            # Same bytes already stored under another source path
+            materialize(obj, dest, self.use_reflink)
+            saved = st.st_size
+            self._saved(saved)
+
+        self._remember(key, sha)
+        return copied, saved
+
+    def _saved(self, size):
+        with self._lock:
+            self.hits += 1
+            self.bytes_saved += size
+
+    def report(self):
+        with self._lock:
+            return f"Dedupe store: {self.hits} repeat file(s), {self.bytes_saved / (1024 * 1024):.1f} MB saved"
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+        logging.info(self.report())
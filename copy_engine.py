@@ -0,0 +1,214 @@
+import errno
+import logging
+import os
+import shutil
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from job_journal import part_path
+from metrics import metrics
+
+# ----------------------------------
+# FILE COPY ENGINE
+# ----------------------------------
+# Copies source documents from the file shares in a thread pool so they
+# overlap with PDF rendering. Each source share gets its own concurrency
+# limit, and file data moves through copy_file_range/sendfile where the OS
+# has them, otherwise through one large reusable buffer per copy.
+
+BUFFER_SIZE = 8 * 1024 * 1024
+
+# errnos meaning "this fast path is not available here", not a real failure
+FAST_PATH_UNSUPPORTED = {errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EBADF, errno.ENOTSUP, errno.EOPNOTSUPP}
+
+
+def long_path(path):
+    """Adds the \\\\?\\ prefix for long path support (Windows only)."""
+    path = os.path.abspath(path)
+    if os.name == "nt" and not path.startswith("\\\\?\\"):
+        return f"\\\\?\\{path}"
+    return path
+
+
+# ----------------------------------
+# SINGLE FILE COPY
+# ----------------------------------
+def _copy_kernel(fsrc, fdst, buffer_size):
+    """Tries copy_file_range, then sendfile. Returns bytes copied, or None if neither applies."""
+    for name in ("copy_file_range", "sendfile"):
+        if not hasattr(os, name) or (name == "sendfile" and not sys.platform.startswith("linux")):
+            continue
+
+        copied = 0
+        try:
+            while True:
+                if name == "copy_file_range":
+                    sent = os.copy_file_range(fsrc.fileno(), fdst.fileno(), buffer_size)
+                else:
+                    sent = os.sendfile(fdst.fileno(), fsrc.fileno(), copied, buffer_size)
+                if sent == 0:
+                    return copied
+                copied += sent
+        except OSError as e:
+            if copied == 0 and e.errno in FAST_PATH_UNSUPPORTED:
+                continue
+            raise
+    return None
+
+
+def _copy_buffered(fsrc, fdst, buffer_size):
+    copied = 0
+    buffer = bytearray(buffer_size)
+    view = memoryview(buffer)
+    while True:
+        n = fsrc.readinto(buffer)
+        if not n:
+            return copied
+        fdst.write(view[:n])
+        copied += n
+
+
+def copy_dest(src, dest_folder):
+    return os.path.join(dest_folder, os.path.basename(src.replace("\\", os.sep)))
+
+
+def copy_file(src, dest_folder, buffer_size=BUFFER_SIZE):
+    """Copies src into dest_folder (like shutil.copy) and returns the number of bytes written.
+
+    Data goes to a .part file that is renamed into place only once complete.
+    """
+    src, dest = long_path(src), long_path(copy_dest(src, dest_folder))
+    tmp = part_path(dest)
+
+    try:
+        with open(src, "rb") as fsrc, open(tmp, "wb") as fdst:
+            copied = _copy_kernel(fsrc, fdst, buffer_size)
+            if copied is None:
+                copied = _copy_buffered(fsrc, fdst, buffer_size)
+        shutil.copymode(src, tmp)
+        os.replace(tmp, dest)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    return copied
+
+
+# ----------------------------------
+# ENGINE
+# ----------------------------------
+class CopyEngine:
+    def __init__(self, workers=8, buffer_size=BUFFER_SIZE, share_limits=None, default_limit=4, store=None,
+                 max_pending=None):
+        self.buffer_size = buffer_size
+        self.store = store  # optional content_store.ContentStore
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="copy")
+        self._share_limits = {
+            os.path.normcase(root): threading.BoundedSemaphore(limit)
+            for root, limit in (share_limits or {}).items()
+        }
+        self._default_limit = threading.BoundedSemaphore(default_limit)
+        # submit() blocks once max_pending copies are queued or running
+        self._slots = threading.BoundedSemaphore(max_pending) if max_pending else None
+
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._pending = 0
+        self.files = 0
+        self.failed = 0
+        self.bytes = 0
+        self.bytes_saved = 0
+        self.busy = 0.0
+        self.first_started = None
+        self.last_finished = None
+
+    def _limit_for(self, src):
+        normalized = os.path.normcase(src)
+        for root, limit in self._share_limits.items():
+            if normalized.startswith(root):
+                return limit
+        return self._default_limit
+
+    def submit(self, src, dest_folder, on_error=None, on_done=None, tags=None):
+        """Queues one copy; on_done(src, dest) or on_error(src, exc) runs on the copy thread.
+
+        tags (e.g. {"refid": ...}) label the copy's stage timing in metrics.
+        """
+        if self._slots:
+            self._slots.acquire()
+        with self._lock:
+            self._pending += 1
+            if self.first_started is None:
+                self.first_started = time.perf_counter()
+        return self._executor.submit(self._run, src, dest_folder, on_error, on_done, tags or {})
+
+    def _run(self, src, dest_folder, on_error, on_done, tags):
+        try:
+            with self._limit_for(src):
+                started = time.perf_counter()
+                os.makedirs(long_path(dest_folder), exist_ok=True)
+                try:
+                    if self.store:
+                        copied, saved = self.store.place(src, dest_folder, self.buffer_size)
+                    else:
+                        copied, saved = copy_file(src, dest_folder, self.buffer_size), 0
+                except Exception:
+                    metrics.record("copy", time.perf_counter() - started, ok=False, **tags)
+                    raise
+                elapsed = time.perf_counter() - started
+            metrics.record("copy", elapsed, bytes=copied, **tags)
+            with self._lock:
+                self.files += 1
+                self.bytes += copied
+                self.bytes_saved += saved
+                self.busy += elapsed
+            if on_done:
+                on_done(src, copy_dest(src, dest_folder))
+            return copied
+        except Exception as e:
+            with self._lock:
+                self.failed += 1
+            if on_error:
+                try:
+                    on_error(src, e)
+                except Exception:
+                    logging.exception(f"Copy error handler failed for {src}")
+            else:
+                logging.error(f"Failed to copy {src} → {dest_folder}: {e}")
+        finally:
+            with self._lock:
+                self._pending -= 1
+                self.last_finished = time.perf_counter()
+                if self._pending == 0:
+                    self._idle.notify_all()
+            if self._slots:
+                self._slots.release()
+
+    @property
+    def pending(self):
+        with self._lock:
+            return self._pending
+
+    def wait(self, timeout=None):
+        """Blocks until every submitted copy has finished."""
+        with self._lock:
+            return self._idle.wait_for(lambda: self._pending == 0, timeout)
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
+
+    def report(self, reset=False):
+        with self._lock:
+            mb = self.bytes / (1024 * 1024)
+            wall = (self.last_finished or 0) - (self.first_started or 0)
+            rate = mb / wall if wall > 0 else 0.0
+            summary = f"Copied {self.files} file(s), {mb:.1f} MB, {self.failed} failed ({rate:.1f} MB/s)"
+            if self.store:
+                summary += f", {self.bytes_saved / (1024 * 1024):.1f} MB saved by dedupe"
+            if reset:
+                self.files = self.failed = self.bytes = self.bytes_saved = 0
+                self.busy = 0.0
+                self.first_started = self.last_finished = None
+            return summary
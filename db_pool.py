@@ -0,0 +1,189 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+# ----------------------------------
+# DATABASE CONNECTION POOL
+# ----------------------------------
+# Keeps ODBC connections open between queries so workers stop paying the
+# login/TLS handshake for every RefID. connect is the script's own
+# connect_db(), which returns a connection or None on failure.
+
+
+class ConnectionPool:
+    def __init__(self, connect, max_size=8, max_idle=300, check_after=30, health_check_sql="SELECT 1"):
+        self.connect = connect
+        self.max_size = max_size
+        self.max_idle = max_idle            # seconds before an idle connection is closed
+        self.check_after = check_after      # idle seconds before checkout runs the health check
+        self.health_check_sql = health_check_sql
+
+        self._cond = threading.Condition()
+        self._idle = []                     # [(conn, last_used)] most recently used last
+        self._size = 0                      # open connections, idle or checked out
+        self._closed = False
+
+        self.acquired = 0
+        self.hits = 0
+        self.misses = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.evicted = 0
+        self.failed_checks = 0
+
+    # ----------------------------------
+    # CHECKOUT / CHECKIN
+    # ----------------------------------
+    def acquire(self, timeout=None):
+        """Returns a healthy connection, or None if a new one could not be opened."""
+        started = time.perf_counter()
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        while True:
+            with self._cond:
+                self._evict_idle_locked()
+                while not self._idle and self._size >= self.max_size:
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        raise TimeoutError(f"No database connection available after {timeout}s")
+                    self._cond.wait(remaining)
+                    self._evict_idle_locked()
+
+                if self._idle:
+                    conn, last_used = self._idle.pop()
+                    reused = True
+                else:
+                    self._size += 1
+                    conn, last_used = None, None
+                    reused = False
+
+            if reused:
+                if time.monotonic() - last_used < self.check_after or self._is_healthy(conn):
+                    self._record_checkout(started, hit=True)
+                    return conn
+                self._discard(conn)
+                with self._cond:
+                    self.failed_checks += 1
+                continue
+
+            conn = self.connect()
+            if conn is None:
+                self._forget()
+                return None
+            self._record_checkout(started, hit=False)
+            return conn
+
+    def release(self, conn, discard=False):
+        if conn is None:
+            return
+        if discard or self._closed:
+            self._discard(conn)
+            return
+        with self._cond:
+            self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self, timeout=None):
+        conn = self.acquire(timeout)
+        broken = False
+        try:
+            yield conn
+        except Exception:
+            try:
+                if conn is not None:
+                    conn.rollback()
+            except Exception:
+                broken = True
+            raise
+        finally:
+            self.release(conn, discard=broken)
+
+    # ----------------------------------
+    # MAINTENANCE
+    # ----------------------------------
+    def evict_idle(self):
+        with self._cond:
+            self._evict_idle_locked()
+
+    def close_all(self):
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for conn, _ in idle:
+            self._discard(conn)
+
+    def _evict_idle_locked(self):
+        now = time.monotonic()
+        keep = []
+        for conn, last_used in self._idle:
+            if now - last_used > self.max_idle:
+                self.evicted += 1
+                self._size -= 1
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+            else:
+                keep.append((conn, last_used))
+        self._idle = keep
+
+    def _is_healthy(self, conn):
+        try:
+            cursor = conn.cursor()
+            cursor.execute(self.health_check_sql)
+            cursor.fetchone()
+            cursor.close()
+            return True
+        except Exception as e:
+            logging.warning(f"Pooled DB connection failed health check: {e}")
+            return False
+
+    def _discard(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+        self._forget()
+
+    def _forget(self):
+        with self._cond:
+            self._size -= 1
+            self._cond.notify()
+
+    def _record_checkout(self, started, hit):
+        waited = time.perf_counter() - started
+        with self._cond:
+            self.acquired += 1
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+            self.wait_total += waited
+            self.wait_max = max(self.wait_max, waited)
+
+    # ----------------------------------
+    # REPORTING
+    # ----------------------------------
+    def stats(self):
+        with self._cond:
+            acquired = max(self.acquired, 1)
+            return {
+                "size": self._size,
+                "idle": len(self._idle),
+                "acquired": self.acquired,
+                "hit_rate": self.hits / acquired,
+                "avg_wait_ms": self.wait_total / acquired * 1000,
+                "max_wait_ms": self.wait_max * 1000,
+                "evicted": self.evicted,
+                "failed_checks": self.failed_checks
+            }
+
+    def report(self):
+        s = self.stats()
+        return (
+            f"DB pool: {s['acquired']} checkout(s), hit rate {s['hit_rate']:.0%}, "
+            f"avg wait {s['avg_wait_ms']:.1f} ms (max {s['max_wait_ms']:.1f} ms), "
+            f"{s['size']} open / {s['idle']} idle, {s['evicted']} evicted, {s['failed_checks']} failed check(s)"
+        )
@@ -1,6 +1,16 @@
 from playwright.sync_api import sync_playwright
+from render_engine import AsyncRenderEngine
+from db_pool import ConnectionPool
+from copy_engine import copy_file, copy_dest
+from job_journal import JobJournal, part_path
+from render_profiles import wait_profile, install_fast_routes
+from session_guard import SessionGuard, SessionExpiredError, login_on_page
+from resilience import CircuitBreaker, call_with_retry
+from adaptive_limiter import AdaptiveLimiter
+from metrics import metrics, TimedCursor
+from batch_metadata import SHARE_ROOTS
 import os
-import shutil
+import hashlib
 import pyodbc
 import logging
 import sys
@@ -25,6 +35,25 @@ LOGIN_CONFIG = {
     "bid_sup_item_url": "https://notices.philgeps.gov.ph/GEPSNONPILOT/Tender/ViewNonElectronicAssocCompUI.aspx"
 }
 
+# "sync" renders each PDF on the logged-in page one at a time; "async" renders
+# all PDFs of a RefID concurrently through render_engine.AsyncRenderEngine.
+RENDER_MODE = "sync"
+RENDER_CONCURRENCY = 8
+
+# Opt-in: block images/fonts/analytics and wait per document type
+# (render_profiles.WAIT_PROFILES) instead of on networkidle
+FAST_RENDER = False
+
+# Retry transient render failures per document type (resilience.RETRY_POLICIES)
+# and pause rendering while PhilGEPS is failing most requests
+RENDER_RETRIES = True
+render_breaker = CircuitBreaker(window=10, min_calls=5)
+
+# In async mode, navigations are gated by an AIMD limiter that adapts between
+# 1 and RENDER_CONCURRENCY to PhilGEPS latency, at most PORTAL_MAX_RPS starts/s
+PORTAL_MAX_RPS = 4
+PORTAL_TARGET_LATENCY = 10
+
 # ----------------------------------
 # LOGGING
 # ----------------------------------
@@ -41,6 +70,13 @@ else:
 OUTPUT_DIR = os.path.join(BASE_DIR, "ExtractedBidDocs")
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
+# Records finished artifacts so re-entering a RefID only redoes what failed or is missing
+journal = None
+
+# Kept so an expired session can be renewed without prompting again
+user_credentials = {}
+session_guard = SessionGuard()
+
 # Handle path resolution for bundled resources (PyInstaller)
 def resource_path(relative_path):
     """Get absolute path to resource, works for .py and bundled .exe."""
@@ -77,6 +113,12 @@ def connect_db():
         logging.error(f"Failed to connect: {e}")
         return None
 
+# Keeps the SQL Server session alive between RefIDs; idle connections are
+# health-checked on checkout and closed after DB_POOL_MAX_IDLE seconds.
+DB_POOL_SIZE = 2
+DB_POOL_MAX_IDLE = 600
+db_pool = ConnectionPool(connect_db, max_size=DB_POOL_SIZE, max_idle=DB_POOL_MAX_IDLE)
+
 # ----------------------------------
 # FILE HELPERS
 # ----------------------------------
@@ -89,13 +131,32 @@ def create_folder(path):
 def copy_files(src_files, dest_folder, refid_folder):
     create_folder(dest_folder)
     for f in src_files:
+        dest = copy_dest(f, dest_folder)
+        if journal and not journal.plan(dest, "copy", f, os.path.basename(refid_folder)):
+            logging.info(f"Already copied, skipping: {dest}")
+            continue
+
         if os.path.exists(f):
-            shutil.copy(f, dest_folder)
+            with metrics.time("copy"):
+                copy_file(f, dest_folder)
             logging.info(f"Copied {f} → {dest_folder}")
+            if journal:
+                journal.mark_done(dest)
         else:
             logging.warning(f"File not found: {f}")
-            with open(os.path.join(refid_folder, "IMPORTANT-NOTES.txt"), "a", encoding="utf-8") as file:
-                file.write(f"File not found: {f}. Unable to copy to destination folder: {dest_folder}\n")
+            write_note(refid_folder, f"File not found: {f}. Unable to copy to destination folder: {dest_folder}")
+            if journal:
+                journal.mark_failed(dest, "File not found")
+
+def write_note(refid_folder, msg):
+    """Appends msg to IMPORTANT-NOTES.txt once, even across reruns."""
+    note_key = f"{os.path.join(refid_folder, 'IMPORTANT-NOTES.txt')}#{hashlib.sha1(msg.encode('utf-8')).hexdigest()[:12]}"
+    if journal and not journal.plan(note_key, "note", "", os.path.basename(refid_folder), check_file=False):
+        return
+    with open(os.path.join(refid_folder, "IMPORTANT-NOTES.txt"), "a", encoding="utf-8") as file:
+        file.write(f"{msg}\n")
+    if journal:
+        journal.mark_done(note_key)
             
 # ----------------------------------
 # PLAYWRIGHT: LOGIN
@@ -118,6 +179,8 @@ def login(p):
     username = input("Enter PhilGEPS username: ").strip()
     password = getpass.getpass("Enter PhilGEPS password: ")
 
+    user_credentials.update(username=username, password=password)
+
     logging.info(f"Logging in...")
 
     # Fill in login credentials (using name locators for reliability)
@@ -139,73 +202,188 @@ def login(p):
 # ----------------------------------
 # SAVE PAGE AS PDF (Reuses Same Page)
 # ----------------------------------
+def build_pdf_target(refid, docid, bidsupid, docname, output_dir, type):
+    """Returns (pdf_path, target_url) for one render."""
+    if type == 'bid_notice':
+        pdf_path = os.path.join(output_dir, f"{type}_abstract.pdf")
+        target_url = f"{LOGIN_CONFIG['bid_notice_url']}?refid={refid}"
+    elif type == 'award_notice':
+        pdf_path = os.path.join(output_dir, f"{type}_abstract.pdf")
+        target_url = f"{LOGIN_CONFIG['award_notice_url']}?awardID={refid}"
+    elif type == 'assoc_comp':
+        pdf_path = os.path.join(output_dir, f"{docid}.pdf")
+        target_url = (
+            f"{LOGIN_CONFIG['assoc_comp_url']}"
+            f"?directFrom=&refId={refid}&DocId={docid}"
+            f"&PageFrom=&OrgName=&OrgID=0"
+            f"&linkFrom=&PreviousPageFrom=ViewBidNoticeAssocCompUI"
+        )
+    elif type == 'bid_sup':
+        pdf_path = os.path.join(output_dir, f"{bidsupid}.pdf")
+        target_url = (
+            f"{LOGIN_CONFIG['bid_sup_url']}"
+            f"?refId={refid}&bidSuppID={bidsupid}"
+            f"&directFrom=BidAbstract"
+        )
+    else:
+        pdf_path = os.path.join(output_dir, f"{bidsupid}_{docid}_{docname}.pdf")
+
+        target_url = (
+            f"{LOGIN_CONFIG['bid_sup_item_url']}"
+            f"?refId={refid}&DocId={docid}&directFrom=BidAbstract&BidSupplID={bidsupid}"
+        )
+
+    return pdf_path, target_url
+
 def save_page_as_pdf(page, refid, docid, bidsupid, docname, output_dir, type):
     pdf_path = ""
 
     try:
-        if type == 'bid_notice':
-            pdf_path = os.path.join(output_dir, f"{type}_abstract.pdf")
-            target_url = f"{LOGIN_CONFIG['bid_notice_url']}?refid={refid}"
-        elif type == 'award_notice':
-            pdf_path = os.path.join(output_dir, f"{type}_abstract.pdf")
-            target_url = f"{LOGIN_CONFIG['award_notice_url']}?awardID={refid}"
-        elif type == 'assoc_comp':
-            pdf_path = os.path.join(output_dir, f"{docid}.pdf")
-            target_url = (
-                f"{LOGIN_CONFIG['assoc_comp_url']}"
-                f"?directFrom=&refId={refid}&DocId={docid}"
-                f"&PageFrom=&OrgName=&OrgID=0"
-                f"&linkFrom=&PreviousPageFrom=ViewBidNoticeAssocCompUI"
-            )
-        elif type == 'bid_sup':
-            pdf_path = os.path.join(output_dir, f"{bidsupid}.pdf")
-            target_url = (
-                f"{LOGIN_CONFIG['bid_sup_url']}"
-                f"?refId={refid}&bidSuppID={bidsupid}"
-                f"&directFrom=BidAbstract"
-            )
-        else:
-            pdf_path = os.path.join(output_dir, f"{bidsupid}_{docid}_{docname}.pdf")
-
-            target_url = (
-                f"{LOGIN_CONFIG['bid_sup_item_url']}"
-                f"?refId={refid}&DocId={docid}&directFrom=BidAbstract&BidSupplID={bidsupid}"
-            )
-
-        logging.info(f"Navigating to {target_url}")
-        page.goto(target_url, timeout=60000)
-        page.wait_for_load_state("networkidle")
+        pdf_path, target_url = build_pdf_target(refid, docid, bidsupid, docname, output_dir, type)
+
+        def render():
+            profile = wait_profile(type) if FAST_RENDER else None
+
+            logging.info(f"Navigating to {target_url}")
+            if profile:
+                with metrics.time("goto"):
+                    page.goto(target_url, timeout=60000, wait_until=profile["goto_wait"])
+                if profile["ready"]:
+                    with metrics.time("load_state"):
+                        page.wait_for_load_state(profile["ready"])
+            else:
+                with metrics.time("goto"):
+                    page.goto(target_url, timeout=60000)
+                with metrics.time("load_state"):
+                    page.wait_for_load_state("networkidle")
 
-        # If still redirected to login, report error
-        if "log-in" in page.url.lower():
-            logging.error(f"Session expired or invalid for RefID {refid}. Still on login page.")
-            return
+            # If still redirected to login, let the caller log in again and replay
+            if "log-in" in page.url.lower():
+                raise SessionExpiredError(f"Session expired or invalid for RefID {refid}. Still on login page.")
 
-        try:
-            page.wait_for_selector('span[id="ctl01_nameLBL"]', timeout=5000)
-            # Then safely remove it
-            page.evaluate("""
-                () => {
-                    const element = document.querySelector('span[id="ctl01_nameLBL"]');
-                    if (element) element.remove();
-                }
-            """)
-            logging.info("Removed admin name from page before saving PDF.")
-        except:
-            logging.info("Admin name element not found, skipping removal.")
-
-        # Save the PDF
-        page.pdf(path=pdf_path, format="A4", print_background=True)
+            if not profile or profile["selector"]:
+                try:
+                    with metrics.time("selector"):
+                        page.wait_for_selector('span[id="ctl01_nameLBL"]', timeout=profile["selector_timeout"] if profile else 5000)
+                    # Then safely remove it
+                    page.evaluate("""
+                        () => {
+                            const element = document.querySelector('span[id="ctl01_nameLBL"]');
+                            if (element) element.remove();
+                        }
+                    """)
+                    logging.info("Removed admin name from page before saving PDF.")
+                except:
+                    logging.info("Admin name element not found, skipping removal.")
+
+            if profile and profile["settle"]:
+                with metrics.time("load_state"):
+                    page.wait_for_load_state(profile["settle"])
+
+            # Save the PDF (via a .part file so a crash never leaves a half PDF behind)
+            with metrics.time("pdf"):
+                page.pdf(path=part_path(pdf_path), format="A4", print_background=True)
+            os.replace(part_path(pdf_path), pdf_path)
+
+        if RENDER_RETRIES:
+            call_with_retry(render, type, render_breaker)
+        else:
+            render()
         logging.info(f"Saved PDF: {pdf_path}")
+        return True
 
+    except SessionExpiredError:
+        raise
     except Exception as e:
         logging.error(f"Failed to save PDF for RefID {refid}: {e}")
+        return False
+
+# ----------------------------------
+# SESSION RECOVERY
+# ----------------------------------
+def relogin(page):
+    logging.warning("Session expired. Logging in again...")
+    state = login_on_page(page, LOGIN_CONFIG["login_url"], user_credentials, timeout=60000)
+    if state:
+        logging.info("Logged in again.")
+    else:
+        logging.error("Re-login failed. Check credentials or login field selectors.")
+    return state
+
+def save_with_relogin(page, refid, docid, bidsupid, docname, output_dir, type):
+    """save_page_as_pdf that logs in again once and replays the render if the session expired."""
+    generation = session_guard.generation
+    for attempt in range(2):
+        try:
+            return save_page_as_pdf(page, refid, docid, bidsupid, docname, output_dir, type)
+        except SessionExpiredError as e:
+            logging.error(str(e))
+            if attempt or not session_guard.renew(generation, lambda: relogin(page)):
+                return False
+
+# ----------------------------------
+# RENDER DISPATCH
+# ----------------------------------
+def render_pdf(page, engine, pending, refid, docid, bidsupid, docname, output_dir, type):
+    """Renders now on the shared page, or queues on the async engine and records the future in pending."""
+    pdf_path, target_url = build_pdf_target(refid, docid, bidsupid, docname, output_dir, type)
+    if journal and not journal.plan(pdf_path, type, target_url, refid):
+        logging.info(f"Already rendered, skipping: {pdf_path}")
+        return
+
+    if engine is None:
+        with metrics.tags(type=type):
+            ok = save_with_relogin(page, refid, docid, bidsupid, docname, output_dir, type)
+        if journal:
+            journal.mark(pdf_path, ok)
+        return
+
+    logging.info(f"Queued {target_url}")
+    job = (target_url, pdf_path, type, refid)
+    pending.append((job, engine.submit(*job)))
+
+def wait_for_renders(pending, page=None, engine=None):
+    """Collects queued renders; ones that hit an expired session are replayed once after a re-login."""
+    generation = session_guard.generation
+    expired = []
+    for job, future in pending:
+        target_url, pdf_path, type, refid = job
+        try:
+            future.result()
+            logging.info(f"Saved PDF: {pdf_path}")
+            if journal:
+                journal.mark_done(pdf_path)
+        except SessionExpiredError as e:
+            if page is None:
+                logging.error(str(e))
+                if journal:
+                    journal.mark_failed(pdf_path, e)
+            else:
+                expired.append((job, e))
+        except Exception as e:
+            logging.error(f"Failed to save PDF for RefID {refid}: {e}")
+            if journal:
+                journal.mark_failed(pdf_path, e)
+    pending.clear()
+
+    if not expired:
+        return
+    if session_guard.renew(generation, lambda: relogin(page)):
+        engine.update_cookies(session_guard.storage_state)
+        pending.extend((job, engine.submit(*job)) for job, _ in expired)
+        wait_for_renders(pending)
+    else:
+        for (target_url, pdf_path, type, refid), e in expired:
+            logging.error(str(e))
+            if journal:
+                journal.mark_failed(pdf_path, e)
 
 # ----------------------------------
 # PROCESS REFID
 # ----------------------------------
-def process_refid(refid, conn, page):
-    cursor = conn.cursor()
+def process_refid(refid, conn, page, engine=None):
+    pending = []
+    cursor = TimedCursor(conn.cursor(), metrics)
     cursor.execute("SELECT COUNT(1) FROM M_Tender WHERE refid = ?", refid)
     exists = cursor.fetchone()[0]
 
@@ -218,7 +396,7 @@ def process_refid(refid, conn, page):
     refid_folder = create_folder(os.path.join(OUTPUT_DIR, str(refid)))
 
     # Bid Notice
-    save_page_as_pdf(page, refid, '0', '0', '0', refid_folder, 'bid_notice')
+    render_pdf(page, engine, pending, refid, '0', '0', '0', refid_folder, 'bid_notice')
 
     # Associated Components
     cursor.execute("""
@@ -236,11 +414,12 @@ def process_refid(refid, conn, page):
         assoc_folder = os.path.join(refid_folder, "Associated Components")
         for row in bid_docs:
             if row.IsElectronic == 1:
-                file_path = rf"Z:\GEPS_Files\Tender\{row.DocPhyName}"
+                file_path = os.path.join(SHARE_ROOTS["tender"], row.DocPhyName)
                 copy_files([file_path], assoc_folder, refid_folder)
             else:
                 logging.info(f"Non-electronic doc {row.DocID}: saving as PDF...")
-                save_page_as_pdf(page, refid, row.DocID, '0', row.DocName, assoc_folder, 'assoc_comp')
+                create_folder(assoc_folder)
+                render_pdf(page, engine, pending, refid, row.DocID, '0', row.DocName, assoc_folder, 'assoc_comp')
     else:
         logging.info("No bid docs uploaded, skipping...")
 
@@ -263,15 +442,16 @@ def process_refid(refid, conn, page):
         sup_folder = os.path.join(refid_folder, "Bid Supplements")
         for row in bid_supplements:
             if row.DocPhyName:  # checks if not NULL/empty
-                file_path = os.path.join(r"Z:\GEPS_Files\BidSupp", row.DocPhyName)
+                file_path = os.path.join(SHARE_ROOTS["bidsupp"], row.DocPhyName)
                 copy_files([file_path], sup_folder, refid_folder)
             else:
                 logging.info(f"Non-electronic doc {row.BidSuppID}: saving as PDF...")
-                save_page_as_pdf(page, refid, row.DocID, row.BidSuppID, row.DocName, sup_folder, 'bid_sup')
+                create_folder(sup_folder)
+                render_pdf(page, engine, pending, refid, row.DocID, row.BidSuppID, row.DocName, sup_folder, 'bid_sup')
 
                 if  all([row.CollectionContact, row.CollectionContactID, row.CollectionPoint, row.SpecialInstruction]):
                     logging.info(f"Non-electronic. Saving attachment of doc {row.BidSuppID} as PDF...")
-                    save_page_as_pdf(page, refid, row.DocID, row.BidSuppID, row.DocName, sup_folder, 'bid_sup_item')
+                    render_pdf(page, engine, pending, refid, row.DocID, row.BidSuppID, row.DocName, sup_folder, 'bid_sup_item')
                     
                     # Check if any field contains a Google Drive link
                     if ("https://drive.google.com/" in str(row.Description)) or ("https://drive.google.com/" in str(row.Remarks)):
@@ -280,9 +460,8 @@ def process_refid(refid, conn, page):
                             f"Bid Supplement No. {row.BidSuppID} contains files stored in Google Drive.\n"
                             f"Please manually follow this link to download all available files:\n{link}\n"
                         )
-                        with open(os.path.join(refid_folder, "IMPORTANT-NOTES.txt"), "a", encoding="utf-8") as file:
-                            file.write(f"{msg}\n")
-                            logging.info(f"Google Drive link found for Bid Supplement {row.BidSuppID}. Added to IMPORTANT-NOTES.txt.")
+                        write_note(refid_folder, msg)
+                        logging.info(f"Google Drive link found for Bid Supplement {row.BidSuppID}. Added to IMPORTANT-NOTES.txt.")
 
         logging.info("Finished processing bid supplements.")
     else:
@@ -301,7 +480,7 @@ def process_refid(refid, conn, page):
                 award_id = award[0]
                 sub_folder = os.path.join(award_folder, str(award_id))
                 create_folder(sub_folder)
-                save_page_as_pdf(page, award_id, '0', '0', '0', sub_folder, 'award_notice')
+                render_pdf(page, engine, pending, award_id, '0', '0', '0', sub_folder, 'award_notice')
 
                 cursor.execute("""
                     SELECT rf.ServerFileName, rf.ServerPath
@@ -316,13 +495,14 @@ def process_refid(refid, conn, page):
 
                 for file_row in award_item_files:
                     server_file, server_path = file_row
-                    file_path = os.path.join(r"Z:\Fileserver\R3FileServer", server_path, server_file)
+                    file_path = os.path.join(SHARE_ROOTS["r3"], server_path, server_file)
                     copy_files([file_path], sub_folder, refid_folder)  # copy into award subfolder
                 
                 logging.info("Finished processing award documents.")
     else:
         logging.info(f'Bid status is "{row[0]}". Skipping award processing...')
 
+    wait_for_renders(pending, page, engine)
     logging.info(f"Completed processing RefID {refid}.")
     return True
 
@@ -331,12 +511,28 @@ def process_refid(refid, conn, page):
 # ----------------------------------
 if __name__ == "__main__":
 
-    conn = connect_db()
+    conn = db_pool.acquire()
     if not conn:
         sys.exit(1)
+    db_pool.release(conn)
+
+    journal = JobJournal(OUTPUT_DIR)
+    metrics.start_run(OUTPUT_DIR)
 
     with sync_playwright() as p:
         browser, page = login(p)
+        if FAST_RENDER:
+            install_fast_routes(browser)
+
+        engine = None
+        if RENDER_MODE == "async":
+            portal_limiter = AdaptiveLimiter(
+                max_limit=RENDER_CONCURRENCY, max_rps=PORTAL_MAX_RPS, target_latency=PORTAL_TARGET_LATENCY
+            )
+            engine = AsyncRenderEngine(
+                BROWSER_PATH, concurrency=RENDER_CONCURRENCY, fast=FAST_RENDER,
+                retry=RENDER_RETRIES, breaker=render_breaker if RENDER_RETRIES else None, limiter=portal_limiter
+            ).start(browser.storage_state())
 
         while True:
             refid_input = input("Enter RefID (or press Enter to exit): ").strip()
@@ -351,7 +547,23 @@ if __name__ == "__main__":
                 logging.info("Exiting program.")
                 break
 
-            process_refid(refid_input, conn, page)
+            with db_pool.connection() as conn:
+                if not conn:
+                    logging.error(f"No database connection. Skipping RefID {refid_input}.")
+                    continue
+                with metrics.tags(refid=refid_input, worker="main"):
+                    process_refid(refid_input, conn, page, engine)
 
+        if engine:
+            engine.close()
+            logging.info(portal_limiter.report())
         browser.close()
-        conn.close()
+        logging.info(db_pool.report())
+        logging.info(render_breaker.report())
+        logging.info(journal.report())
+        logging.info(session_guard.report())
+        logging.info("Stage timings (also in extraction-metrics.jsonl/.prom):")
+        for line in metrics.finish_run():
+            logging.info(line)
+        journal.close()
+        db_pool.close_all()
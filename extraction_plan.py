@@ -0,0 +1,171 @@
+import json
+import logging
+import os
+import shutil
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from copy_engine import copy_dest, long_path
+
+# ----------------------------------
+# EXTRACTION PLAN
+# ----------------------------------
+# Typed form of what batch_metadata.load_artifacts resolves for a RefID:
+# one Artifact per render, copy or note, with its source (target URL or
+# share path), destination and, once stat_sources() has run, the expected
+# size. The plan is built once per RefID while the job is queued, and
+# process_refid only executes it.
+#
+# --dry-run uses the same records to report counts, source bytes, an
+# estimated duration (from the throughput of earlier runs, see
+# record_throughput) and whether the destination has room for it.
+
+SAVE_PDF = "save_pdf"
+COPY = "copy"
+NOTE = "note"
+
+NOTES_NAME = "IMPORTANT-NOTES.txt"
+
+# Rough size of one rendered PDF, for the free space check
+ESTIMATED_PDF_BYTES = 200 * 1024
+# Used until a run has recorded its throughput
+DEFAULT_PDFS_PER_MIN = 20.0
+DEFAULT_MB_PER_S = 10.0
+HISTORY_RUNS = 10
+STAT_WORKERS = 16
+
+
+class Artifact:
+    __slots__ = ("kind", "dest", "source", "type", "args", "freshness", "size")
+
+    def __init__(self, kind, dest, source, type, args=None, freshness=None, size=None):
+        self.kind = kind            # SAVE_PDF, COPY or NOTE
+        self.dest = dest            # output path (the RefID's notes file for NOTE)
+        self.source = source        # target URL, share path, or the note text
+        self.type = type            # document type of a render, else the kind
+        self.args = args            # pdf_task_queue args of a render
+        self.freshness = freshness  # render cache marker
+        self.size = size            # expected bytes, None until known
+
+    def __repr__(self):
+        return f"Artifact({self.kind}, {self.type}, {self.dest!r})"
+
+
+class RefIDPlan:
+    __slots__ = ("refid", "folder", "artifacts")
+
+    def __init__(self, refid, folder, artifacts):
+        self.refid = refid
+        self.folder = folder
+        self.artifacts = artifacts
+
+
+def plan_refid(refid, artifacts, output_dir, pdf_target):
+    """Turns the load_artifacts tuples of one RefID into a RefIDPlan; pdf_target(*args) gives (pdf_path, url)."""
+    folder = os.path.join(output_dir, str(refid))
+    records = []
+    for kind, subfolder, payload in artifacts:
+        dest_folder = os.path.join(folder, subfolder) if subfolder else folder
+        if kind == SAVE_PDF:
+            url_id, docid, bidsupid, docname, type, freshness = payload
+            args = (url_id, docid, bidsupid, docname, dest_folder, type)
+            pdf_path, target_url = pdf_target(*args)
+            records.append(Artifact(SAVE_PDF, pdf_path, target_url, type, args, freshness))
+        elif kind == COPY:
+            records.append(Artifact(COPY, copy_dest(payload, dest_folder), payload, COPY))
+        else:
+            records.append(Artifact(NOTE, os.path.join(folder, NOTES_NAME), payload, NOTE, size=len(payload)))
+    return RefIDPlan(refid, folder, records)
+
+
+# ----------------------------------
+# DRY RUN
+# ----------------------------------
+def stat_sources(plans, workers=STAT_WORKERS):
+    """Fills in the size of every copy from its share; returns the copies whose source is missing."""
+    copies = [a for plan in plans for a in plan.artifacts if a.kind == COPY]
+
+    def stat(artifact):
+        try:
+            artifact.size = os.stat(long_path(artifact.source)).st_size
+        except OSError:
+            artifact.size = None
+        return artifact
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return [a for a in pool.map(stat, copies) if a.size is None]
+
+
+def summarize(plans, output_root, history_path):
+    """Counts, bytes, estimated duration and free space for a dry run (call stat_sources first)."""
+    by_type = {}
+    renders = source_bytes = 0
+    for plan in plans:
+        for a in plan.artifacts:
+            by_type[a.type] = by_type.get(a.type, 0) + 1
+            if a.kind == SAVE_PDF:
+                renders += 1
+            elif a.kind == COPY:
+                source_bytes += a.size or 0
+
+    pdfs_per_min, mb_per_s, runs = load_throughput(history_path)
+    # Renders and copies overlap, so the slower of the two sets the pace
+    seconds = max(renders / pdfs_per_min * 60, source_bytes / (mb_per_s * 1024 * 1024))
+
+    needed = source_bytes + renders * ESTIMATED_PDF_BYTES
+    existing = output_root
+    while not os.path.exists(existing) and os.path.dirname(existing) != existing:
+        existing = os.path.dirname(existing)
+    free = shutil.disk_usage(existing).free
+
+    return {
+        "refids": len(plans),
+        "artifacts": by_type,
+        "renders": renders,
+        "source_bytes": source_bytes,
+        "estimated_seconds": round(seconds),
+        "throughput_runs": runs,
+        "pdfs_per_min": round(pdfs_per_min, 1),
+        "mb_per_s": round(mb_per_s, 1),
+        "needed_bytes": needed,
+        "free_bytes": free,
+        "enough_space": free >= needed,
+    }
+
+
+# ----------------------------------
+# THROUGHPUT HISTORY
+# ----------------------------------
+def record_throughput(path, pdfs, copied_bytes, seconds):
+    """Appends the throughput of a finished job to the history file the dry run estimates from."""
+    if seconds <= 0 or not (pdfs or copied_bytes):
+        return
+    entry = {
+        "ts": round(time.time()),
+        "pdfs_per_min": round(pdfs / seconds * 60, 2),
+        "mb_per_s": round(copied_bytes / (1024 * 1024) / seconds, 2),
+    }
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry) + "\n")
+    except OSError as e:
+        logging.warning(f"Failed to record throughput in {path}: {e}")
+
+
+def load_throughput(path, runs=HISTORY_RUNS):
+    """Returns (pdfs_per_min, mb_per_s, runs used): medians of the last runs, or the defaults."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            entries = [json.loads(line) for line in f if line.strip()][-runs:]
+    except (OSError, ValueError):
+        entries = []
+
+    pdf_rates = [e["pdfs_per_min"] for e in entries if e.get("pdfs_per_min")]
+    copy_rates = [e["mb_per_s"] for e in entries if e.get("mb_per_s")]
+    return (
+        statistics.median(pdf_rates) if pdf_rates else DEFAULT_PDFS_PER_MIN,
+        statistics.median(copy_rates) if copy_rates else DEFAULT_MB_PER_S,
+        len(entries),
+    )
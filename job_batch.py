@@ -0,0 +1,104 @@
+import json
+import os
+from collections import namedtuple
+
+from content_store import materialize
+from job_journal import part_path
+
+# ----------------------------------
+# MULTI-MERCHANT BATCHES
+# ----------------------------------
+# A batch lists many merchant/year pairs. Their RefIDs are resolved into one
+# deduplicated set (joint awards show up under several merchants), extracted
+# once into <output>/_refids/<RefID>, and each finished RefID is linked into
+# its merchants' usual <output>/<OrgID>/<RefID> layout with reflinks/hardlinks
+# instead of second copies.
+#
+# Job spec (JSON):
+#     {
+#         "jobs": [
+#             {"org_id": 1001, "years": [2023, 2024]},
+#             {"org_id": 1002, "year": 2024}
+#         ],
+#         "types": ["bid_notice", "award"],    (optional)
+#         "output": "D:/Extractions"           (optional)
+#     }
+
+SHARED_DIR = "_refids"
+
+BatchPlan = namedtuple("BatchPlan", "tenders members pairs duplicates")
+
+
+def expand_jobs(jobs):
+    """Turns the spec's job entries into unique (org_id, year) pairs, in order."""
+    pairs = []
+    for job in jobs:
+        years = job.get("years") or [job.get("year")]
+        for year in years:
+            if year in (None, ""):
+                raise ValueError(f"Job for merchant {job.get('org_id')} has no year.")
+            pair = (str(job["org_id"]).strip(), str(year).strip())
+            if pair not in pairs:
+                pairs.append(pair)
+    return pairs
+
+
+def load_job_spec(path):
+    """Returns (pairs, spec) for the JSON job spec at path."""
+    with open(path, encoding="utf-8") as f:
+        spec = json.load(f)
+    pairs = expand_jobs(spec.get("jobs", []))
+    if not pairs:
+        raise ValueError(f"{path} lists no jobs.")
+    return pairs, spec
+
+
+def resolve_batch(conn, pairs, discover):
+    """Runs discover(conn, org_id, year) for every pair and merges the RefIDs into one set."""
+    tenders = {}  # RefID -> TenderStatus, in discovery order
+    members = {}  # OrgID -> {RefID: None}, ordered
+    found = 0
+    for org_id, year in pairs:
+        refids = members.setdefault(org_id, {})
+        for refid, status in discover(conn, org_id, year):
+            found += 1
+            tenders.setdefault(refid, status)
+            refids[refid] = None
+    return BatchPlan(tenders, {org_id: list(refids) for org_id, refids in members.items()}, pairs, found - len(tenders))
+
+
+# ----------------------------------
+# PER-MERCHANT LAYOUT
+# ----------------------------------
+def link_tree(src_root, dest_root):
+    """Mirrors the finished files of src_root under dest_root as links. Returns the number of files linked."""
+    linked = 0
+    for dirpath, _, files in os.walk(src_root):
+        target = os.path.normpath(os.path.join(dest_root, os.path.relpath(dirpath, src_root)))
+        os.makedirs(target, exist_ok=True)
+        for name in files:
+            if name.endswith(part_path("")):
+                continue
+            src, dest = os.path.join(dirpath, name), os.path.join(target, name)
+            if os.path.exists(dest) and os.path.samefile(src, dest):
+                continue
+            materialize(src, dest)
+            linked += 1
+    return linked
+
+
+def merchant_roots(output_root, members):
+    """Returns {refid: [<output_root>/<OrgID>, ...]} for the merchants each RefID belongs to."""
+    roots = {}
+    for org_id, refids in members.items():
+        for refid in refids:
+            roots.setdefault(refid, []).append(os.path.join(output_root, org_id))
+    return roots
+
+
+def link_refid(shared_root, refid, roots):
+    """Links the finished <shared_root>/<refid> folder into every merchant root. Returns the number of files linked."""
+    src = os.path.join(shared_root, str(refid))
+    if not os.path.isdir(src):
+        return 0
+    return sum(link_tree(src, os.path.join(root, str(refid))) for root in roots)
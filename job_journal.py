@@ -0,0 +1,115 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+# ----------------------------------
+# JOB JOURNAL
+# ----------------------------------
+# Durable record of every planned artifact (PDF render, file copy or note)
+# in the output root. A rerun asks plan() before doing any work: artifacts
+# already marked done whose file is still on disk are skipped, everything
+# else (planned, failed or missing) is retried.
+#
+# Artifacts are keyed by their destination path relative to the output
+# root, so the journal keeps working if the whole folder is moved.
+
+JOURNAL_NAME = ".extraction-journal.sqlite"
+
+PLANNED = "planned"
+DONE = "done"
+FAILED = "failed"
+
+
+def part_path(path):
+    """Temp name a writer uses before atomically renaming onto path."""
+    return f"{path}.part"
+
+
+class JobJournal:
+    def __init__(self, output_root, name=JOURNAL_NAME):
+        self.output_root = os.path.abspath(output_root)
+        self.path = os.path.join(self.output_root, name)
+
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS artifacts (
+                dest TEXT PRIMARY KEY,
+                kind TEXT,
+                source TEXT,
+                refid TEXT,
+                status TEXT,
+                attempts INTEGER DEFAULT 0,
+                error TEXT,
+                updated_at REAL
+            )
+        """)
+        self._db.commit()
+        self.skipped = 0
+
+    def _key(self, dest):
+        dest = os.path.abspath(dest)
+        if dest.startswith(self.output_root):
+            return os.path.relpath(dest, self.output_root)
+        return dest
+
+    # ----------------------------------
+    # PLAN / COMPLETE
+    # ----------------------------------
+    def plan(self, dest, kind, source, refid, check_file=True):
+        """Records the artifact and returns True if it still has to be produced."""
+        key = self._key(dest)
+        with self._lock:
+            row = self._db.execute("SELECT status FROM artifacts WHERE dest = ?", (key,)).fetchone()
+            if row and row[0] == DONE and (not check_file or os.path.exists(dest)):
+                self.skipped += 1
+                return False
+
+            self._db.execute("""
+                INSERT INTO artifacts (dest, kind, source, refid, status, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(dest) DO UPDATE SET status = excluded.status, updated_at = excluded.updated_at
+            """, (key, kind, str(source), str(refid), PLANNED, time.time()))
+            self._db.commit()
+            return True
+
+    def mark(self, dest, ok, error=None):
+        key = self._key(dest)
+        with self._lock:
+            self._db.execute("""
+                UPDATE artifacts
+                SET status = ?, attempts = attempts + 1, error = ?, updated_at = ?
+                WHERE dest = ?
+            """, (DONE if ok else FAILED, None if ok else str(error), time.time(), key))
+            self._db.commit()
+
+    def mark_done(self, dest):
+        self.mark(dest, True)
+
+    def mark_failed(self, dest, error):
+        self.mark(dest, False, error)
+
+    # ----------------------------------
+    # REPORTING
+    # ----------------------------------
+    def counts(self):
+        with self._lock:
+            rows = self._db.execute("SELECT status, COUNT(*) FROM artifacts GROUP BY status").fetchall()
+        return dict(rows)
+
+    def report(self):
+        counts = self.counts()
+        return (
+            f"Journal: {counts.get(DONE, 0)} done, {counts.get(FAILED, 0)} failed, "
+            f"{counts.get(PLANNED, 0)} unfinished, {self.skipped} skipped as already complete"
+        )
+
+    def close(self):
+        with self._lock:
+            try:
+                self._db.close()
+            except Exception as e:
+                logging.warning(f"Failed to close journal {self.path}: {e}")
@@ -0,0 +1,137 @@
+import threading
+import time
+from contextlib import contextmanager
+
+# ----------------------------------
+# JOB PROGRESS
+# ----------------------------------
+# Counters for the live progress panel of the bulk tool. Workers report what
+# they plan and finish; the UI takes a snapshot() on its own cadence and
+# gets throughput (PDFs/min, MB copied) and an ETA derived from the rate at
+# which planned artifacts are finishing. Nothing here decides when a job is
+# complete; that is left to the queues' own task accounting.
+
+
+def format_duration(seconds):
+    if seconds is None:
+        return "--:--"
+    seconds = int(seconds)
+    hours, rest = divmod(seconds, 3600)
+    minutes, seconds = divmod(rest, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes:02d}:{seconds:02d}"
+
+
+class JobProgress:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.start()
+
+    def start(self):
+        """Resets every counter for a new job."""
+        with self._lock:
+            self.started = time.time()
+            self.finished_at = None
+            self.refids_total = 0
+            self.discovering = True
+            self.refids_expanded = 0
+            self.refids_done = 0
+            self.refids_failed = 0
+            self.planned = {"render": 0, "copy": 0}
+            self.done = {"render": 0, "copy": 0}
+            self.failed = {"render": 0, "copy": 0}
+            self.copied_bytes = 0
+            self.active = {}
+
+    def add_total(self, refids):
+        """Adds the RefIDs of one discovery page to the job total."""
+        with self._lock:
+            self.refids_total += refids
+
+    def finish_discovery(self):
+        with self._lock:
+            self.discovering = False
+
+    def plan(self, kind, count=1):
+        with self._lock:
+            self.planned[kind] += count
+
+    def finish(self, kind, ok=True, size=0):
+        """Counts one finished render or copy; size is the number of bytes copied."""
+        with self._lock:
+            self.done[kind] += 1
+            if not ok:
+                self.failed[kind] += 1
+            self.copied_bytes += size
+
+    def skip_refid(self):
+        """Takes a RefID that needs no work (e.g. archived by an earlier run) out of the job total."""
+        with self._lock:
+            self.refids_total -= 1
+
+    def expand_refid(self):
+        """Counts a RefID whose renders and copies have all been planned."""
+        with self._lock:
+            self.refids_expanded += 1
+
+    def finish_refid(self, ok=True):
+        with self._lock:
+            self.refids_done += 1
+            if not ok:
+                self.refids_failed += 1
+
+    def stop(self):
+        with self._lock:
+            self.finished_at = time.time()
+
+    # ----------------------------------
+    # ACTIVE WORKERS
+    # ----------------------------------
+    def enter(self, role):
+        with self._lock:
+            self.active[role] = self.active.get(role, 0) + 1
+
+    def leave(self, role):
+        with self._lock:
+            self.active[role] = max(self.active.get(role, 0) - 1, 0)
+
+    @contextmanager
+    def working(self, role):
+        self.enter(role)
+        try:
+            yield
+        finally:
+            self.leave(role)
+
+    # ----------------------------------
+    # SNAPSHOT
+    # ----------------------------------
+    def snapshot(self):
+        with self._lock:
+            elapsed = max((self.finished_at or time.time()) - self.started, 1e-6)
+            planned = sum(self.planned.values())
+            finished = sum(self.done.values())
+
+            # RefIDs not expanded yet are assumed to carry as many artifacts
+            # as the ones seen so far
+            if self.refids_expanded and self.refids_total > self.refids_expanded:
+                planned += planned / self.refids_expanded * (self.refids_total - self.refids_expanded)
+
+            remaining = max(planned - finished, 0)
+            eta = remaining / (finished / elapsed) if finished and not self.finished_at else None
+            if self.finished_at or (not self.discovering and self.refids_done == self.refids_total and not remaining):
+                eta = 0
+
+            return {
+                "elapsed": elapsed,
+                "refids_total": self.refids_total,
+                "discovering": self.discovering,
+                "refids_done": self.refids_done,
+                "pdfs": self.done["render"] - self.failed["render"],
+                "copies": self.done["copy"] - self.failed["copy"],
+                "failed": self.failed["render"] + self.failed["copy"] + self.refids_failed,
+                "pdfs_per_min": (self.done["render"] - self.failed["render"]) / elapsed * 60,
+                "mb_copied": self.copied_bytes / (1024 * 1024),
+                "fraction": finished / planned if planned else 0.0,
+                "eta": eta,
+                "active": dict(self.active),
+            }
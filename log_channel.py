@@ -0,0 +1,80 @@
+import collections
+import os
+import queue
+import threading
+import time
+
+# ----------------------------------
+# LOG CHANNEL
+# ----------------------------------
+# Worker threads put() messages; the UI drains them in batches on its own
+# cadence. The UI backlog is a bounded ring, so a flood drops the oldest
+# undisplayed lines (the widget shows how many) instead of growing memory.
+# Every message also goes to a log file, written by a background thread,
+# so nothing is lost on disk.
+
+_STOP = object()
+
+
+class LogChannel:
+    def __init__(self, log_path=None, max_pending=5000):
+        self.log_path = log_path
+        self._pending = collections.deque(maxlen=max_pending)
+        self._lock = threading.Lock()
+        self._dropped = 0
+
+        self._disk = queue.SimpleQueue()
+        self._writer = None
+        if log_path:
+            os.makedirs(os.path.dirname(log_path), exist_ok=True)
+            self._writer = threading.Thread(target=self._write_loop, name="log-writer", daemon=True)
+            self._writer.start()
+
+    def put(self, msg, ui=True):
+        """Queues msg for the log file and, unless ui is False, for the next UI drain."""
+        if self._writer:
+            self._disk.put((time.time(), msg))
+        if ui:
+            with self._lock:
+                if len(self._pending) == self._pending.maxlen:
+                    self._dropped += 1
+                self._pending.append(msg)
+
+    def drain(self, max_lines=500):
+        """Returns (lines, dropped): up to max_lines pending messages and how many were dropped since the last drain."""
+        with self._lock:
+            count = min(max_lines, len(self._pending))
+            lines = [self._pending.popleft() for _ in range(count)]
+            dropped, self._dropped = self._dropped, 0
+        return lines, dropped
+
+    # ----------------------------------
+    # DISK WRITER
+    # ----------------------------------
+    def _write_loop(self):
+        with open(self.log_path, "a", encoding="utf-8") as f:
+            while True:
+                item = self._disk.get()
+                batch = [item]
+                # Write whatever else is already queued before flushing once
+                while not self._disk.empty() and len(batch) < 1000:
+                    batch.append(self._disk.get())
+
+                stop = False
+                for entry in batch:
+                    if entry is _STOP:
+                        stop = True
+                        continue
+                    ts, msg = entry
+                    stamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(ts))
+                    f.write(f"{stamp} {msg}\n")
+                f.flush()
+                if stop:
+                    return
+
+    def close(self, timeout=5):
+        """Flushes the log file and stops the writer thread."""
+        if self._writer:
+            self._disk.put(_STOP)
+            self._writer.join(timeout=timeout)
+            self._writer = None
@@ -2,16 +2,39 @@ import tkinter as tk
 from tkinter import ttk, messagebox, scrolledtext
 import sv_ttk
 from playwright.sync_api import sync_playwright
+from render_engine import AsyncRenderEngine
+from batch_metadata import load_artifacts, chunked, discover_pages, year_range, SHARE_ROOTS
+from db_pool import ConnectionPool
+from copy_engine import CopyEngine, copy_dest
+from content_store import ContentStore
+from job_journal import JobJournal, part_path, DONE, FAILED, PLANNED, JOURNAL_NAME
+from render_cache import RenderCache
+from render_profiles import wait_profile, install_fast_routes
+from abstract_fetcher import AbstractFetcher, ABSTRACT_TYPES
+from session_guard import SessionGuard, SessionExpiredError, login_on_page
+from resilience import CircuitBreaker, RenderStopped, call_with_retry, is_transient
+from adaptive_limiter import AdaptiveLimiter, LimiterStopped
+from metrics import metrics
+from log_channel import LogChannel
+from job_progress import JobProgress, format_duration
+from job_batch import SHARED_DIR, load_job_spec, expand_jobs, resolve_batch, merchant_roots, link_refid
+from refid_finalizer import RefIDFinalizer
+from extraction_plan import SAVE_PDF, COPY, NOTE, plan_refid, stat_sources, summarize, record_throughput
+from archive_output import (
+    ArchiveWriter, FOLDERS, ZIP_JOB, OUTPUT_FORMATS, DEFAULT_LEVELS, staging_dir, job_archive_name, clear_interrupted_job
+)
+from work_queue import WorkQueue, default_worker_id, LEASE_SECONDS, DONE as QUEUE_DONE, FAILED as QUEUE_FAILED
 import os, shutil, pyodbc, logging, sys, threading, getpass
 import queue
 from queue import Empty
 import time
+import hashlib
 import traceback
 import re
+import json
+import argparse
 from tkinter import filedialog
 
-log_buffer = []
-last_log_time = time.time()
 
 completed_counter = 1
 counter_lock = threading.Lock()
@@ -19,6 +42,25 @@ folder_lock = threading.Lock()
 
 browser_context = None
 page = None
+journal = None
+render_cache = None
+abstract_fetcher = None
+# Re-logs in once when the portal session expires mid-run (see session_guard)
+session_guard = SessionGuard()
+
+render_stats = {}
+render_stats_lock = threading.Lock()
+# Live counters behind the progress panel (and the headless job_done line)
+job_progress = JobProgress()
+
+# Set by --headless: progress goes to stdout as JSON lines instead of the Tk log box
+HEADLESS = False
+emit_lock = threading.Lock()
+# Set once the portal session is logged in and the render workers are starting
+session_ready = threading.Event()
+# Set by --queue: RefIDs are claimed from a work queue shared with other workers
+shared_queue = None
+WORKER_ID = None
 
 # -------------------------------
 # APP CONFIG
@@ -40,6 +82,44 @@ GEPS_URL = {
     "bid_sup_item_url": "https://notices.philgeps.gov.ph/GEPSNONPILOT/Tender/ViewNonElectronicAssocCompUI.aspx"
 }
 
+# Number of Playwright pages rendering PDFs in parallel. Worker 0 is the
+# logged-in page; the others get their own browser context seeded with
+# the same session cookies.
+RENDER_WORKERS = 4
+
+# "pages" renders through the RENDER_WORKERS page pool above; "async" hands
+# every render to one asyncio engine (render_engine.py) with up to
+# RENDER_CONCURRENCY pipelines in flight on a single event loop.
+RENDER_MODE = "pages"
+RENDER_CONCURRENCY = 8
+
+# Opt-in: block images/fonts/analytics and use per-document-type waits
+# (render_profiles.WAIT_PROFILES) instead of a double networkidle.
+FAST_RENDER = False
+
+# Opt-in: fetch the printable bid/award notice abstracts over plain HTTP with
+# the logged-in cookies (ABSTRACT_FETCH_WORKERS at a time) and only let the
+# browser set_content() + pdf() them; incomplete HTML falls back to navigation.
+HTTP_ABSTRACTS = False
+ABSTRACT_FETCH_WORKERS = 8
+
+# Transient render failures (timeouts, dropped connections) are retried per
+# document type (resilience.RETRY_POLICIES). When more than BREAKER_ERROR_RATE
+# of the last BREAKER_WINDOW renders failed that way, all render workers pause
+# for BREAKER_COOLDOWN seconds and one probe render decides whether to resume.
+RENDER_RETRIES = True
+BREAKER_WINDOW = 20
+BREAKER_ERROR_RATE = 0.5
+BREAKER_COOLDOWN = 60
+
+# Adaptive limit on concurrent navigations to PhilGEPS: grows while loads stay
+# under PORTAL_TARGET_LATENCY seconds, halves when they fail or slow down.
+# PORTAL_MAX_CONCURRENCY is a hard ceiling; PORTAL_MAX_RPS caps new requests/s.
+ADAPTIVE_CONCURRENCY = True
+PORTAL_MAX_CONCURRENCY = 8
+PORTAL_MAX_RPS = 4
+PORTAL_TARGET_LATENCY = 10
+
 # -------------------------------
 # LOGGING
 # -------------------------------
@@ -62,6 +142,9 @@ else:
     BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
 OUTPUT_DIR = None
+# Where the artifacts of the current job are written: OUTPUT_DIR itself, or
+# its local staging folder when the job is archived (see OUTPUT_FORMAT)
+WORK_DIR = None
 selected_root_folder = None
 
 from tkinter import filedialog
@@ -109,6 +192,10 @@ def connect_db():
         logging.error(f"Database connection failed: {e}")
         return None
 
+# Shared by the GUI lookups and the extraction threads
+DB_POOL_SIZE = 4
+db_pool = ConnectionPool(connect_db, max_size=DB_POOL_SIZE)
+
 # ----------------------------------
 # FILE HELPERS
 # ----------------------------------
@@ -124,76 +211,207 @@ def sanitize_path(path):
     # Only sanitize destination parts, not drive letters
     return re.sub(r'[<>:"/\\|?*]', "_", path)
 
-def copy_files(src_files, dest_folder, refid_folder):
-    create_folder(dest_folder)
-    
-    for f in src_files:
-        if os.path.exists(f):
-            try:
-                # Keep the source as is (don't sanitize!)
-                abs_src = os.path.abspath(f)
-
-                # Only sanitize destination
-                safe_dest = os.path.abspath(dest_folder)
-
-                # Add \\?\ prefix for long path support (Windows only)
-                if os.name == "nt":
-                    abs_src = f"\\\\?\\{abs_src}"
-                    safe_dest = f"\\\\?\\{safe_dest}"
+# Source documents are copied off the shares by copy_engine so they overlap
+# with rendering; each share gets its own concurrency limit. At most
+# COPY_MAX_PENDING copies wait in the engine before process_refid blocks.
+COPY_WORKERS = 8
+COPY_MAX_PENDING = 256
+COPY_BUFFER_SIZE = 8 * 1024 * 1024
+COPY_SHARE_LIMITS = {
+    SHARE_ROOTS["tender"]: 4,
+    SHARE_ROOTS["bidsupp"]: 4,
+    SHARE_ROOTS["r3"]: 4
+}
+copy_engine = CopyEngine(
+    workers=COPY_WORKERS, buffer_size=COPY_BUFFER_SIZE, share_limits=COPY_SHARE_LIMITS, max_pending=COPY_MAX_PENDING
+)
+
+# Optional: reuse PDFs rendered in earlier jobs (keyed by target URL plus the
+# TenderStatus/AwardStatusID freshness marker), bounded by size and age.
+RENDER_CACHE = False
+RENDER_CACHE_DIR = os.path.join(os.path.expanduser("~"), "PhilGEPS_RenderCache")
+RENDER_CACHE_MAX_MB = 2048
+RENDER_CACHE_MAX_AGE_DAYS = 7
+
+# Optional: keep one copy of every source document under the output root
+# and turn repeats (across RefIDs and merchant jobs) into reflinks/hardlinks.
+DEDUPE_STORE = False
+
+# "folders" writes the usual <RefID>/... tree to the destination; "zip-refid"
+# writes one <RefID>.zip per RefID and "zip-job" one archive per job
+# (archive_output.py). Archived RefIDs are staged in ARCHIVE_STAGING_DIR only
+# until they finish. ARCHIVE_COMPRESSION sets the deflate level per file
+# extension (0 = stored, "*" = everything else).
+OUTPUT_FORMAT = FOLDERS
+ARCHIVE_STAGING_DIR = os.path.join(os.path.expanduser("~"), "PhilGEPS_Staging")
+ARCHIVE_COMPRESSION = dict(DEFAULT_LEVELS)
+archive_writer = None
+
+def prepare_output_root():
+    """Opens the job journal and (optionally) the render cache, dedupe store and archive for the selected OUTPUT_DIR."""
+    global journal, render_cache, archive_writer, WORK_DIR
+
+    # Stage timings of this run stream to <output>/extraction-metrics.jsonl; workers
+    # sharing one output folder (--queue) each keep their own metrics and journal
+    label = sanitize_path(WORKER_ID) if WORKER_ID else None
+    metrics.start_run(OUTPUT_DIR, label=label)
+
+    if archive_writer:
+        # The previous job did not finish; its archive keeps the *.part name
+        archive_writer.close(complete=False)
+        archive_writer = None
+    WORK_DIR = OUTPUT_DIR
+    if OUTPUT_FORMAT != FOLDERS:
+        WORK_DIR = staging_dir(ARCHIVE_STAGING_DIR, OUTPUT_DIR, label)
+        # zip-job: <output>/extraction-<date>-<time>.zip (a batch's next to its merchant folders)
+        archive_dir = os.path.dirname(OUTPUT_DIR) if os.path.basename(OUTPUT_DIR) == SHARED_DIR else OUTPUT_DIR
+        if OUTPUT_FORMAT == ZIP_JOB:
+            # zip-job does not resume; start from a clean staging folder and journal
+            if journal and journal.output_root == os.path.abspath(WORK_DIR):
+                journal.close()
+                journal = None
+            for path in clear_interrupted_job(WORK_DIR, archive_dir, label):
+                log_message(f"🗑️ Removed the unfinished archive of an interrupted run: {path}")
+        archive_writer = ArchiveWriter(
+            OUTPUT_FORMAT, WORK_DIR, OUTPUT_DIR, job_path=os.path.join(archive_dir, job_archive_name(label)),
+            levels=ARCHIVE_COMPRESSION
+        )
 
-                shutil.copy(abs_src, safe_dest)
+    if RENDER_CACHE and render_cache is None:
+        render_cache = RenderCache(
+            RENDER_CACHE_DIR,
+            max_bytes=RENDER_CACHE_MAX_MB * 1024 * 1024,
+            max_age=RENDER_CACHE_MAX_AGE_DAYS * 24 * 3600
+        )
 
-            except Exception as e:
-                logging.error(f"Failed to copy {f} → {dest_folder}: {e}")
-                with open(os.path.join(refid_folder, "IMPORTANT-NOTES.txt"), "a", encoding="utf-8") as file:
-                    file.write(f"Failed to copy {f}: {e}\n")
+    journal_name = JOURNAL_NAME.replace(".sqlite", f"-{label}.sqlite") if label else JOURNAL_NAME
+    if journal is None or journal.output_root != os.path.abspath(WORK_DIR) or os.path.basename(journal.path) != journal_name:
+        if journal:
+            journal.close()
+        journal = JobJournal(WORK_DIR, journal_name)
 
-        else:
-            with open(os.path.join(refid_folder, "IMPORTANT-NOTES.txt"), "a", encoding="utf-8") as file:
-                file.write(f"File not found: {f}. Unable to copy to destination folder: {dest_folder}\n")
+    # Archives cannot hold links, so the dedupe store only applies to folder output
+    if not DEDUPE_STORE or archive_writer:
+        copy_engine.store = None
+        return
+    store_root = os.path.join(OUTPUT_DIR, ".content-store")
+    if copy_engine.store is None or copy_engine.store.root != store_root:
+        if copy_engine.store:
+            copy_engine.store.close()
+        copy_engine.store = ContentStore(store_root)
+
+def finish_render(args, freshness, ok, error=None):
+    """Journals a finished render and, on success, stores it in the render cache."""
+    pdf_path, target_url = build_pdf_target(*args)
+    refid_finalizer.done(pdf_path, ok)
+    journal_mark(pdf_path, ok, error)
+    job_progress.finish("render", ok)
+    if ok and render_cache and freshness is not None:
+        render_cache.put(target_url, freshness, pdf_path)
+
+def journal_mark(dest, ok, error=None):
+    if journal:
+        journal.mark(dest, ok, error)
+
+def journal_plan(dest, kind, source, refid, check_file=True):
+    """True if the artifact still has to be produced (always True without a journal)."""
+    return journal.plan(dest, kind, source, refid, check_file) if journal else True
+
+def note_copy_failure(src, error, dest_folder, refid_folder):
+    if isinstance(error, FileNotFoundError) and not os.path.exists(src):
+        msg = f"File not found: {src}. Unable to copy to destination folder: {dest_folder}"
+    else:
+        logging.error(f"Failed to copy {src} → {dest_folder}: {error}")
+        msg = f"Failed to copy {src}: {error}"
+    with open(os.path.join(refid_folder, "IMPORTANT-NOTES.txt"), "a", encoding="utf-8") as file:
+        file.write(msg + "\n")
+    journal_mark(copy_dest(src, dest_folder), False, error)
+    job_progress.finish("copy", False)
+    refid_finalizer.done(copy_dest(src, dest_folder), False)
+
+def note_copy_done(dest):
+    journal_mark(dest, True)
+    job_progress.finish("copy", size=os.path.getsize(dest))
+    refid_finalizer.done(dest)
 
 # -------------------------------
 # LOG BOX HANDLER
 # -------------------------------
+# Worker threads only enqueue log lines; the Tk thread drains them every
+# LOG_FLUSH_MS in one insert and keeps at most LOG_MAX_LINES in the log box.
+# The full log is written to LOG_DIR in the background.
+LOG_FLUSH_MS = 250
+LOG_MAX_LINES = 2000
+LOG_BATCH_LINES = 500
+LOG_DIR = os.path.join(BASE_DIR, "logs")
+# Throughput of finished jobs; --dry-run estimates durations from it
+THROUGHPUT_HISTORY = os.path.join(LOG_DIR, "throughput-history.jsonl")
+log_channel = LogChannel(os.path.join(LOG_DIR, f"extraction-{time.strftime('%Y%m%d-%H%M%S')}.log"))
+
 def log_message(msg):
-    global last_log_time
-    log_buffer.append(msg)
-    
-    # schedule flush in main thread
-    if 'root' in globals():  # ensure root exists
-        root.after(0, flush_logs)
-    
-    # update last_log_time for throttling (optional)
-    last_log_time = time.time()
+    if HEADLESS:
+        log_channel.put(msg, ui=False)
+        emit("log", message=msg)
+        return
+    log_channel.put(msg)
 
 def flush_logs():
-    if not log_buffer:
-        return
-    
-    # If GUI isn't ready yet, skip
-    if 'log_box' not in globals():
-        log_buffer.clear()
-        return
+    """Moves pending log lines into the log box in one batch, then reschedules itself."""
+    lines, dropped = log_channel.drain(LOG_BATCH_LINES)
+
+    # If GUI isn't ready yet, keep the lines queued
+    if (lines or dropped) and 'log_box' in globals():
+        text = "".join(f"{msg}\n" for msg in lines)
+        if dropped:
+            text = f"… {dropped} line(s) not shown; see {log_channel.log_path}\n" + text
+
+        log_box.configure(state="normal")
+        log_box.insert(tk.END, text)
+        # Trim to the newest LOG_MAX_LINES lines
+        excess = int(log_box.index("end-1c").split(".")[0]) - LOG_MAX_LINES
+        if excess > 0:
+            log_box.delete("1.0", f"{excess + 1}.0")
+        log_box.configure(state="disabled")
+        log_box.see(tk.END)
 
-    log_box.configure(state="normal")
-    for msg in log_buffer:
-        log_box.insert(tk.END, f"{msg}\n")
-    log_box.configure(state="disabled")
-    log_box.see(tk.END)
-    log_buffer.clear()
+    root.after(LOG_FLUSH_MS, flush_logs)
 
 
 # -------------------------------
 # EXTRACTION LOGIC
 # -------------------------------
 
-task_queue = queue.Queue()
-pdf_task_queue = queue.Queue()
+# The job streams through bounded stages:
+#   discovery (keyset pages) → metadata (load_artifacts per page) → task_queue
+#   → RefID workers → pdf_task_queue / copy_engine → refid_finalizer
+# Every queue is bounded, so when rendering or copying falls behind the
+# stages before it block instead of holding the whole job in memory, and
+# each RefID is finalized as soon as its own renders and copies are done.
+REFID_WORKERS = 4
+REFID_QUEUE_SIZE = 32
+PDF_QUEUE_SIZE = 64
+
+# --queue (work_queue.py): a worker keeps up to WORK_QUEUE_PREFETCH claimed
+# RefIDs in flight and, once the queue runs dry but other workers still hold
+# leases, polls every WORK_POLL_SECONDS in case one of them dies.
+WORK_QUEUE_PREFETCH = REFID_WORKERS * 2
+WORK_POLL_SECONDS = 15
+WORK_LEASE_SECONDS = LEASE_SECONDS
+
+task_queue = queue.Queue(maxsize=REFID_QUEUE_SIZE)
+pdf_task_queue = queue.Queue(maxsize=PDF_QUEUE_SIZE)
+
+# Batch jobs: RefID -> merchant roots its finished folder is linked into
+refid_links = {}
+# zip-refid: RefIDs skipped because an earlier run already archived them
+skipped_refids = set()
 
 def run_extraction():
     
     merchant_org_id = merchant_org_var.get().strip()
     year = year_var.get()
+    if year_to_var.get() and year_to_var.get() != year:
+        year = f"{year}-{year_to_var.get()}"
     status = status_var.get()
     include_bid_notice=include_bid_notice_var.get()
     include_assoc = include_assoc_var.get()
@@ -209,34 +427,80 @@ def run_extraction():
         run_button.config(state="normal")
         return
 
-    # Show the progress bar
-    #progress.pack(pady=5)
-    #progress.start(10)  # speed; smaller = faster animation
-
-    # Disable the Run button while processing
-    run_button.config(state="disabled")
-
     if not merchant_org_id:
         messagebox.showwarning("Missing Input", "Please enter a Merchant Org ID.")
         return
-    
-    conn = connect_db()
-    cursor = conn.cursor()
 
-    cursor.execute("SELECT OrgName FROM M_Organization WHERE OrgID = ?", merchant_org_id)
-    merchant_name = cursor.fetchone()
+    try:
+        year_range(year)
+    except ValueError as e:
+        messagebox.showwarning("Invalid Year Range", str(e))
+        return
+
+    # Disable the Run buttons while processing
+    set_job_buttons("disabled")
+
+    # The DB lookups and the journal open on the job thread; the UI only
+    # refreshes the progress panel until finish_job() is called back
+    job_progress.start()
+    progress["value"] = 0
+    root.after(0, refresh_progress)
 
-    conn.close()
-    
-    log_message(f"🔍 Fetching data for Merchant {merchant_name.OrgName}, Year {year}, Status {status}")
     threading.Thread(
         target=fetch_refids_thread,
         args=(merchant_org_id, status, year, include_bid_notice, include_assoc, include_supp, include_award_notice, include_award),
         daemon=True
     ).start()
 
+def set_job_buttons(state):
+    for button in (run_button, spec_button):
+        button.config(state=state)
+
+def run_job_spec():
+    """Runs every merchant/year pair of a JSON job spec (see job_batch.py) as one deduplicated batch."""
+    path = filedialog.askopenfilename(title="Select Job Spec", filetypes=[("Job spec", "*.json")])
+    if not path:
+        return
+    try:
+        pairs, spec = load_job_spec(path)
+    except (OSError, ValueError, KeyError) as e:
+        messagebox.showwarning("Invalid Job Spec", f"{path}:\n{e}")
+        return
+
+    output_root = spec.get("output") or OUTPUT_DIR
+    if not output_root:
+        messagebox.showwarning(
+            "Destination Required",
+            "Please select a folder destination (or set \"output\" in the job spec) before running extraction."
+        )
+        return
+
+    # Document types: the spec's "types" if given, otherwise the checkboxes
+    types = spec.get("types")
+    checked = (include_bid_notice_var.get(), include_assoc_var.get(), include_supp_var.get(),
+               include_award_notice_var.get(), include_award_var.get())
+    includes = tuple(t in types for t in HEADLESS_TYPES) if types else checked
+
+    set_job_buttons("disabled")
+    job_progress.start()
+    progress["value"] = 0
+    root.after(0, refresh_progress)
+
+    log_message(f"📋 Job spec {os.path.basename(path)}: {len(pairs)} merchant/year job(s)")
+    threading.Thread(target=batch_thread, args=(pairs, includes, os.path.abspath(output_root)), daemon=True).start()
+
+render_breaker = CircuitBreaker(
+    window=BREAKER_WINDOW, error_rate=BREAKER_ERROR_RATE, cooldown=BREAKER_COOLDOWN,
+    notify=lambda msg: log_message(f"⚡ {msg}")
+)
+
+portal_limiter = AdaptiveLimiter(
+    max_limit=PORTAL_MAX_CONCURRENCY, max_rps=PORTAL_MAX_RPS, target_latency=PORTAL_TARGET_LATENCY,
+    notify=lambda msg: log_message(f"🚦 {msg}")
+) if ADAPTIVE_CONCURRENCY else None
+
 def login_philgeps(user_data_dir, stop_event):
-    global browser_context, page
+    global browser_context, page, abstract_fetcher
 
     from playwright.sync_api import sync_playwright
 
@@ -267,383 +531,699 @@ def login_philgeps(user_data_dir, stop_event):
             #page.wait_for_selector('span[id="ctl01_nameLBL"]', timeout=60000)
 
             log_message("✅ Login successful.")
-            root.after(0, lambda: run_button.config(state="normal"))
-
-        while not stop_event.is_set():
+            if not HEADLESS:
+                root.after(0, lambda: set_job_buttons("normal"))
+
+        session_ready.set()
+
+        if FAST_RENDER:
+            install_fast_routes(browser_context)
+
+        # Share the logged-in session with the extra render workers
+        storage_state = browser_context.storage_state()
+        if HTTP_ABSTRACTS:
+            abstract_fetcher = AbstractFetcher(storage_state, workers=ABSTRACT_FETCH_WORKERS)
+            session_guard.add_listener(abstract_fetcher.update_cookies)
+        if RENDER_MODE == "async":
+            async_render_dispatcher(page, storage_state, stop_event)
+            logout_portal(page)
             try:
-                task_type, args = pdf_task_queue.get(timeout=1)
-                if task_type == "save_pdf":
-                    save_page_as_pdf(page, *args)
-                elif task_type == "logout":
-                    #log_message("Logging out...")
-                    page.goto("https://notices.philgeps.gov.ph/GEPSNONPILOT/LogoutRedirect.aspx", wait_until="load")
-                    log_message("✅ Logged out successfully.")
-                    break
-                pdf_task_queue.task_done()
-            except Empty:
-                # no task right now → just continue quietly
-                continue
-            except Exception as e:
-                logging.error(f"Playwright worker task failed: {e}\n{traceback.format_exc()}")
-                time.sleep(1)
+                browser_context.close()
+            except:
+                pass
+            return
+
+        for worker_id in range(1, RENDER_WORKERS):
+            threading.Thread(
+                target=render_worker,
+                args=(worker_id, storage_state, stop_event),
+                daemon=True
+            ).start()
+
+        playwright_thread(0, page, stop_event)
 
-        # when stop_event is set
+        # when stop_event is set: every worker has left its loop, log out once on the primary page
+        logout_portal(page)
         try:
             browser_context.close()
         except:
             pass
 
-def playwright_thread(page, stop_worker):
+def logout_portal(page):
+    """Logs the logged-in page out of PhilGEPS; called once, after the render workers have stopped."""
+    try:
+        page.goto("https://notices.philgeps.gov.ph/GEPSNONPILOT/LogoutRedirect.aspx", wait_until="load", timeout=15000)
+        log_message("✅ Logged out successfully.")
+    except Exception as e:
+        logging.warning(f"Portal logout failed: {e}")
+
+def render_worker(worker_id, storage_state, stop_event):
+    """Runs one extra render page in its own Playwright instance (sync API objects are thread-bound)."""
+    with sync_playwright() as p:
+        browser = p.chromium.launch(headless=True, executable_path=BROWSER_PATH)
+        try:
+            context = browser.new_context(storage_state=storage_state)
+            if FAST_RENDER:
+                install_fast_routes(context)
+            worker_page = context.new_page()
+            playwright_thread(worker_id, worker_page, stop_event)
+        except Exception as e:
+            logging.error(f"Render worker {worker_id} failed to start: {e}\n{traceback.format_exc()}")
+        finally:
+            try:
+                browser.close()
+            except:
+                pass
+
+def playwright_thread(worker_id, page, stop_worker):
+    """Drains pdf_task_queue through one page until stop_worker is set."""
+    generation = 0
     while not stop_worker.is_set():
         try:
-            task_type, args = pdf_task_queue.get(timeout=1)
-            if task_type == "save_pdf":
-                save_page_as_pdf(page, *args)
-            pdf_task_queue.task_done()
+            task_type, args, freshness = pdf_task_queue.get(timeout=1)
         except Empty:
+            # no task right now → just continue quietly
             continue
+
+        try:
+            if task_type == "save_pdf":
+                # Waits here while another worker is logging in again
+                generation = session_guard.sync(generation, lambda state: page.context.add_cookies(state["cookies"]))
+                started = time.perf_counter()
+                with metrics.tags(refid=args[0], type=args[-1], worker=worker_id), job_progress.working("render"):
+                    ok = save_with_relogin(page, args, generation)
+                record_render(worker_id, time.perf_counter() - started, ok)
+                finish_render(args, freshness, ok)
         except Exception as e:
-            logging.error(f"Worker task failed: {e}")
-        
+            logging.error(f"Render worker {worker_id} task failed: {e}\n{traceback.format_exc()}")
+            if task_type == "save_pdf":
+                finish_render(args, freshness, False, e)
+            time.sleep(1)
+        finally:
+            pdf_task_queue.task_done()
 
-def fetch_refids_thread(merchant_org_id, status, year, include_bid_notice, include_assoc, include_supp, include_award_notice, include_award):
-    conn = connect_db()
-    cursor = conn.cursor()
-  
-    cursor.execute("""
-        SELECT DISTINCT t.RefID, t.TenderStatus FROM M_Tender t
-        LEFT JOIN M_Award a ON t.RefID = a.RefID
-        LEFT JOIN D_AwardAwardee aa ON a.AwardID=aa.AwardID
-        LEFT JOIN M_Organization o ON aa.AwardeeID = o.OrgID
-        WHERE o.OrgID = ? AND aa.AwardDate LIKE ?
-        AND (t.TenderStatus LIKE '%awarded%' OR t.TenderStatus LIKE '%closed%')
-        AND a.AwardStatusid IN ('2','3','6')
-    """, (merchant_org_id, f"%{year}%"))
-
-    bids = cursor.fetchall()
-
-    log_message(f"✅ Found {len(bids)} record(s). Extracting files...")
-
-    #if not include_bid_notice:
-        #log_message("Skipping bid notice abstract (option not selected).")
-    
-    #if not include_assoc:
-        #log_message("Skipping associated docs (option not selected).")
-    
-    #if not include_supp:
-        #log_message("Skipping bid supplements (option not selected).")
-    
-    #if not include_award_notice:
-        #log_message("Skipping award notice abstract (option not selected).")
-    
-    #if not include_award:
-        #log_message("Skipping award documents (option not selected).")
-
-    for idx, row in enumerate(bids, start=1):
-        refid = row.RefID
-        tender_status = row.TenderStatus
-        #log_message(f"[{idx}/{len(bids)}] Queuing Bid Ref. No. {refid}...")
-        task_queue.put((refid, tender_status, include_bid_notice, include_assoc, include_supp, include_award_notice, include_award, idx, len(bids)))
-
-    conn.close()
-
-    # wait for all tasks to finish
-    def monitor_queue():
-        global completed_counter
-        if task_queue.unfinished_tasks == 0 and pdf_task_queue.unfinished_tasks == 0:
-            log_message(f"Extraction Complete!")
-            completed_counter = 1
-            root.after(0, lambda: [
-                #progress.stop(),
-                #progress.pack_forget(),
-                run_button.config(state="normal"),
-                messagebox.showinfo("Extraction Complete", "✅ Data extraction is finished successfully!")
-            ])
-        else:
-            root.after(500, monitor_queue)  # check again after 0.5s
+def async_render_dispatcher(page, storage_state, stop_event):
+    """Feeds pdf_task_queue into the async render engine; the logged-in page only handles re-logins and logout."""
+    engine = AsyncRenderEngine(
+        BROWSER_PATH, concurrency=RENDER_CONCURRENCY, fast=FAST_RENDER,
+        retry=RENDER_RETRIES, breaker=render_breaker if RENDER_RETRIES else None, limiter=portal_limiter
+    ).start(storage_state)
+    # Keep pdf_task_queue as the backpressure point instead of buffering
+    # the whole job as futures inside the engine.
+    in_flight = threading.BoundedSemaphore(RENDER_CONCURRENCY * 2)
+    # Renders that bounced to the login page; replayed here once the session is renewed
+    expired = queue.Queue()
+    # Finished renders are journaled and cached on this thread, not in the
+    # future's done-callback, which runs on the engine's event loop
+    completions = queue.Queue()
+    generation = 0
+
+    def on_done(future, args, freshness, seen_generation, replayed, started):
+        refid = args[0]
+        job_progress.leave("render")
+        try:
+            future.result()
+            ok = True
+            finish_render(args, freshness, True)
+        except SessionExpiredError as e:
+            ok = False
+            if not replayed:
+                # Keep the pdf_task_queue task open until the replay finishes
+                expired.put((args, freshness, seen_generation, e))
+                in_flight.release()
+                return
+            finish_render(args, freshness, False, e)
+            write_render_failure(refid, e)
+        except Exception as e:
+            ok = False
+            finish_render(args, freshness, False, e)
+            write_render_failure(refid, f"Failed to save PDF for RefID {refid}: {e}")
+        record_render("async", time.perf_counter() - started, ok)
+        in_flight.release()
+        pdf_task_queue.task_done()
+
+    def submit(args, freshness, replayed=False):
+        in_flight.acquire()
+        job_progress.enter("render")
+        pdf_path, target_url = build_pdf_target(*args)
+        refid, type = args[0], args[-1]
+        html_future = abstract_fetcher.take(target_url) if abstract_fetcher and type in ABSTRACT_TYPES else None
+        future = engine.submit(target_url, pdf_path, type, refid, html_future)
+        future.add_done_callback(
+            lambda f, a=args, fr=freshness, g=generation, r=replayed, t=time.perf_counter(): completions.put((f, a, fr, g, r, t))
+        )
+
+    def complete_renders():
+        while True:
+            item = completions.get()
+            if item is None:
+                break
+            try:
+                on_done(*item)
+            except Exception as e:
+                logging.error(f"Finishing an async render failed: {e}\n{traceback.format_exc()}")
+
+    completer = threading.Thread(target=complete_renders, name="render-completions", daemon=True)
+    completer.start()
 
-    monitor_queue()
-    
-def process_queue():
     try:
-        refid, tender_status, include_bid_notice, include_assoc, include_supp, include_award_notice, include_award, idx, len_bids = task_queue.get_nowait()
+        while not stop_event.is_set():
+            while not expired.empty():
+                args, freshness, seen_generation, error = expired.get()
+                if session_guard.renew(seen_generation, lambda: relogin(page)):
+                    generation = session_guard.sync(generation, engine.update_cookies)
+                    submit(args, freshness, replayed=True)
+                else:
+                    finish_render(args, freshness, False, error)
+                    write_render_failure(args[0], error)
+                    pdf_task_queue.task_done()
 
-        def worker():
             try:
-                process_refid(refid, tender_status, include_bid_notice, include_assoc, include_supp, include_award_notice, include_award, idx, len_bids)
-            finally:
-                task_queue.task_done()  # mark task complete even if error occurs
+                task_type, args, freshness = pdf_task_queue.get(timeout=1)
+            except Empty:
+                continue
+
+            if task_type == "save_pdf":
+                submit(args, freshness)
+            else:
+                pdf_task_queue.task_done()
+    finally:
+        engine.close()
+        completions.put(None)
+        completer.join(timeout=10)
+
+# -------------------------------
+# RENDER THROUGHPUT
+# -------------------------------
+def record_render(worker_id, elapsed, ok):
+    with render_stats_lock:
+        stats = render_stats.setdefault(worker_id, {"pdfs": 0, "failed": 0, "busy": 0.0, "started": time.time() - elapsed})
+        stats["pdfs" if ok else "failed"] += 1
+        stats["busy"] += elapsed
+
+def log_render_stats():
+    """Logs per-worker PDF throughput for the job that just finished, then resets the counters."""
+    with render_stats_lock:
+        snapshot = dict(render_stats)
+        render_stats.clear()
+
+    for worker_id, stats in sorted(snapshot.items(), key=lambda item: str(item[0])):
+        wall = max(time.time() - stats["started"], 1e-6)
+        per_min = stats["pdfs"] / wall * 60
+        avg = stats["busy"] / max(stats["pdfs"] + stats["failed"], 1)
+        log_message(
+            f"🖨️ Worker {worker_id}: {stats['pdfs']} PDF(s), {stats['failed']} failed, "
+            f"{per_min:.1f}/min, avg {avg:.1f}s per page"
+        )
 
-        threading.Thread(target=worker, daemon=True).start()
+def discover_refids(conn, merchant_org_id, year):
+    """Yields the (RefID, TenderStatus) pairs awarded to the merchant in the year or year range ("2022-2024")."""
+    for page in discover_pages(conn, merchant_org_id, year):
+        yield from page
+
+def queue_job(conn, merchant_org_id, year, include_bid_notice, include_assoc, include_supp, include_award_notice, include_award):
+    """Queues the merchant's RefIDs one discovery page at a time, so work starts before discovery ends."""
+    found = 0
+    for page in discover_pages(conn, merchant_org_id, year):
+        found += len(page)
+        log_message(f"✅ Found {found} record(s) so far. Extracting files...")
+        queue_refids(conn, page, include_bid_notice, include_assoc, include_supp, include_award_notice, include_award)
+    job_progress.finish_discovery()
+    log_message(f"🔎 Discovery finished: {found} record(s).")
+
+def queue_refids(conn, bids, include_bid_notice, include_assoc, include_supp, include_award_notice, include_award):
+    """Resolves the artifacts of the (RefID, TenderStatus) pairs and queues one task per RefID."""
+    job_progress.add_total(len(bids))
+
+    # Resolve every artifact of the job in a few set-based queries, chunk by
+    # chunk, so workers only execute precomputed artifact lists.
+    for chunk in chunked(bids):
+        with metrics.time("db_metadata"):
+            plan = load_artifacts(
+                conn, chunk, include_bid_notice, include_assoc, include_supp, include_award_notice, include_award
+            )
+        for refid, _ in chunk:
+            task_queue.put(plan_refid(refid, plan[refid], WORK_DIR, build_pdf_target))
 
-    except Empty:
-        pass
+def fetch_refids_thread(merchant_org_id, status, year, include_bid_notice, include_assoc, include_supp, include_award_notice, include_award):
+    """Runs one GUI job off the Tk thread and calls finish_job() back on it once everything has drained."""
+    ok = False
+    try:
+        with db_pool.connection() as conn:
+            if not conn:
+                log_message("❌ Database connection failed.")
+                return
+            merchant = conn.cursor().execute("SELECT OrgName FROM M_Organization WHERE OrgID = ?", merchant_org_id).fetchone()
+            if not merchant:
+                log_message(f"❌ Merchant {merchant_org_id} not found.")
+                return
 
-    root.after(500, process_queue)
+            prepare_output_root()
+            log_message(f"🔍 Fetching data for Merchant {merchant.OrgName}, Year {year}, Status {status}")
+            queue_job(conn, merchant_org_id, year, include_bid_notice, include_assoc, include_supp, include_award_notice, include_award)
 
-# ----------------------------------
-# PROCESS REFID
-# ----------------------------------
-def process_refid(refid, tender_status, include_bid_notice, include_assoc, include_supp, include_award_notice, include_award, idx, len_bids):
-    # create a local DB connection for thread-safety
-    conn = connect_db()
+        # Woken by the queues and the copy engine as their last task finishes
+        if not wait_until_drained(render_thread):
+            log_message("❌ Render workers stopped before the job finished.")
+            return
+        ok = True
+        log_message(f"Extraction Complete!")
+        log_job_summary()
+    except Exception as e:
+        logging.exception(f"Extraction job failed: {e}")
+        log_message(f"❌ Extraction failed: {e}")
+    finally:
+        job_progress.stop()
+        root.after(0, lambda: finish_job(ok))
 
-    if not conn:
-        log_message(f"DB connection failed for RefID {refid}. Skipping.")
-        return
+def run_batch_job(pairs, includes, output_root, render_thread):
+    """Extracts the RefIDs of every (OrgID, year) pair once into <output_root>/_refids, then links them per merchant."""
+    global OUTPUT_DIR, completed_counter
+
+    global refid_links
 
+    # The GUI's selected folder is put back afterwards so the next merchant
+    # run does not land in this batch's _refids folder
+    selected = OUTPUT_DIR
+    OUTPUT_DIR = os.path.join(output_root, SHARED_DIR)
+    try:
+        os.makedirs(OUTPUT_DIR, exist_ok=True)
+        prepare_output_root()
+        completed_counter = 1
+
+        with db_pool.connection() as conn:
+            if not conn:
+                raise RuntimeError("Database connection failed.")
+            batch = resolve_batch(conn, pairs, discover_refids)
+            log_message(
+                f"🧺 {len(pairs)} merchant/year job(s): {len(batch.tenders)} unique RefID(s), "
+                f"{batch.duplicates} shared between jobs"
+            )
+            # finalize_refid links each RefID into its merchants' folders as soon as it is done
+            refid_links = merchant_roots(output_root, batch.members)
+            queue_refids(conn, list(batch.tenders.items()), *includes)
+            job_progress.finish_discovery()
+
+        if not wait_until_drained(render_thread):
+            raise RuntimeError("Render workers stopped before the job finished.")
+    finally:
+        refid_links = {}
+        OUTPUT_DIR = selected
+
+    log_message(f"🔗 Linked the RefID folders into {len(batch.members)} merchant folder(s) under {output_root}")
+    return batch
+
+def batch_thread(pairs, includes, output_root):
+    """GUI counterpart of fetch_refids_thread for a job spec."""
+    ok = False
+    try:
+        run_batch_job(pairs, includes, output_root, render_thread)
+        ok = True
+        log_message(f"Extraction Complete!")
+        log_job_summary()
+    except Exception as e:
+        logging.exception(f"Batch job failed: {e}")
+        log_message(f"❌ Batch extraction failed: {e}")
+    finally:
+        job_progress.stop()
+        root.after(0, lambda: finish_job(ok))
+
+def finish_job(ok):
     global completed_counter
+    completed_counter = 1
+    refresh_progress()
+    set_job_buttons("normal")
+    if ok:
+        messagebox.showinfo("Extraction Complete", "✅ Data extraction is finished successfully!")
+
+def log_job_summary():
+    """Logs the end-of-job reports of every pipeline stage and closes the stage metrics of the run."""
+    log_render_stats()
+    log_message(f"📄 {copy_engine.report(reset=True)}")
+    if copy_engine.store:
+        log_message(f"♻️ {copy_engine.store.report()}")
+    if render_cache:
+        log_message(f"🗂️ {render_cache.report()}")
+    if abstract_fetcher:
+        log_message(f"🌐 {abstract_fetcher.report()}")
+    if portal_limiter:
+        log_message(f"🚦 {portal_limiter.report()}")
+    if render_breaker.trips:
+        log_message(f"⚡ {render_breaker.report()}")
+    if session_guard.relogins or session_guard.gave_up:
+        log_message(f"🔑 {session_guard.report()}")
+    if journal:
+        log_message(f"🗒️ {journal.report()}")
+    if shared_queue:
+        log_message(f"🤝 {shared_queue.report()}")
+    if archive_writer:
+        close_archive()
+    log_message(db_pool.report())
+    snap = job_progress.snapshot()
+    record_throughput(THROUGHPUT_HISTORY, snap["pdfs"], snap["mb_copied"] * 1024 * 1024, snap["elapsed"])
+    log_message("⏱️ Stage timings (also in extraction-metrics.jsonl/.prom):")
+    for line in metrics.finish_run():
+        log_message(f"   {line}")
+
+def close_session_resources():
+    """Closes what lives for the whole session (fetcher pool and HTTP session, cache/store/journal SQLite handles) on exit."""
+    global abstract_fetcher, render_cache, journal
+    closers = [abstract_fetcher, render_cache, copy_engine.store, journal]
+    abstract_fetcher = render_cache = journal = None
+    copy_engine.store = None
+    for resource in closers:
+        if resource is None:
+            continue
+        try:
+            resource.close()
+        except Exception as e:
+            logging.warning(f"Failed to close {resource.__class__.__name__}: {e}")
 
-    #log_message(f"Processing Bid Ref. No. {refid}.")
+def close_archive():
+    """Finishes the job's archive (log_job_summary only runs once every RefID is finalized)."""
+    global archive_writer
+    writer, archive_writer = archive_writer, None
+    path = writer.close()
+    log_message(f"🗜️ {writer.report()}")
+    if writer.mode == ZIP_JOB:
+        log_message(f"🗜️ Job archive: {path}")
+
+# ----------------------------------
+# SCHEDULER
+# ----------------------------------
+def refid_worker(stop_event):
+    while not stop_event.is_set():
+        try:
+            task = task_queue.get(timeout=1)
+        except Empty:
+            continue
+
+        try:
+            if task is None:  # shutdown sentinel
+                break
+            with job_progress.working("refid"):
+                process_refid(task)
+        except Exception as e:
+            logging.error(f"RefID worker failed: {e}\n{traceback.format_exc()}")
+        finally:
+            task_queue.task_done()  # mark task complete even if error occurs
+
+def start_scheduler(stop_event, workers=REFID_WORKERS):
+    """Starts a fixed pool of RefID workers that block on task_queue."""
+    threads = []
+    for n in range(workers):
+        thread = threading.Thread(target=refid_worker, args=(stop_event,), name=f"refid-worker-{n}", daemon=True)
+        thread.start()
+        threads.append(thread)
+    return threads
+
+def stop_scheduler(threads, timeout=5):
+    for _ in threads:
+        try:
+            task_queue.put(None, timeout=1)
+        except queue.Full:
+            break  # workers also leave on stop_event
+    for thread in threads:
+        thread.join(timeout=timeout)
+
+# ----------------------------------
+# PROCESS REFID
+# ----------------------------------
+def process_refid(plan):
+    """Hands the RefIDPlan of one RefID (see extraction_plan.py) to the render and copy stages."""
+    refid = plan.refid
+    refid_folder = plan.folder
+    refid_finalizer.open(refid)
 
     try:
-        cursor = conn.cursor()
-        cursor.execute("SELECT COUNT(1) FROM M_Tender WHERE refid = ?", refid)
-        exists = cursor.fetchone()[0]
-
-        refid_folder = create_folder(os.path.join(OUTPUT_DIR, str(refid)))
-
-        if include_bid_notice:
-            # enqueue PDF tasks on the GLOBAL pdf_task_queue (do NOT shadow it)
-            pdf_task_queue.put(("save_pdf", (refid, '0', '0', '0', refid_folder, 'bid_notice')))
-            #log_message(f"Enqueued bid_notice PDF task for RefID {refid}.")
-
-        if include_assoc:
-            # Associated Components
-            cursor.execute("""
-                SELECT DocID, DocName, RefID, IsElectronic, DocPhyName
-                FROM M_Document
-                WHERE RefID = ?
-                AND bidsuppid IS NULL
-                AND (DocPhyName LIKE '%TenderDoc%')
-            """, refid)
-
-            bid_docs = cursor.fetchall()
-            #log_message(f"Found {len(bid_docs)} Associated Component(s).")
-
-            if bid_docs:
-                assoc_folder = os.path.join(refid_folder, "Associated Components")
-                for row in bid_docs:
-                    if row.IsElectronic == 1:
-                        file_path = rf"Z:\GEPS_Files\Tender\{row.DocPhyName}"
-                        copy_files([file_path], assoc_folder, refid_folder)
-            else:
-                cursor.execute("""
-                    SELECT DocID, DocName, RefID, IsElectronic, DocPhyName
-                    FROM M_Document
-                    WHERE RefID = ?
-                    AND bidsuppid IS NULL
-                    AND IsElectronic = 0
-                """, refid)
-
-                ne_bid_docs = cursor.fetchall()
-
-                if ne_bid_docs:
-                    assoc_folder = os.path.join(refid_folder, "Associated Components")
-                    for row in ne_bid_docs:
-                        #log_message(f"Non-electronic doc {row.DocID}: saving as PDF...")
-                        pdf_task_queue.put(("save_pdf", (refid, row.DocID, '0', row.DocName, assoc_folder, 'assoc_comp')))
-                        #log_message(f"Enqueued assoc_comp PDF for DocID {row.DocID}.")
-
-        # Bid supplements
-        if include_supp:
-            cursor.execute("""
-                SELECT d.DocID, bs.BidSuppID, bs.BidSuppTitle, bs.Description, bs.Remarks, bs.CollectionContactID,
-                        bs.CollectionContact, bs.CollectionPoint, bs.SpecialInstruction,
-                        d.DocName, d.DocPhyName, d.IsElectronic 
-                FROM M_BidSupplement bs 
-                LEFT JOIN M_Document d 
-                    ON bs.BidSuppID = d.BidSuppID 
-                WHERE bs.RefID = ?
-            """, refid)
-
-            bid_supplements = cursor.fetchall()
-            #log_message(f"Found {len(bid_supplements)} item(s) under Bid Supplement. Downloading file(s)...")
-
-            if bid_supplements:
-                sup_folder = os.path.join(refid_folder, "Bid Supplements")
-                for row in bid_supplements:
-                    if row.DocPhyName:  # checks if not NULL/empty
-                        file_path = os.path.join(r"Z:\GEPS_Files\BidSupp", row.DocPhyName)
-                        copy_files([file_path], sup_folder, refid_folder)
-                    else:
-                        #log_message(f"Non-electronic doc {row.BidSuppID}: saving as PDF...")
-                        pdf_task_queue.put(("save_pdf", (refid, row.DocID, row.BidSuppID, row.DocName, sup_folder, 'bid_sup')))
-                        #log_message(f"Enqueued bid_sup PDF for BidSuppID {row.BidSuppID}.")
-
-                        if all([row.CollectionContact, row.CollectionContactID, row.CollectionPoint, row.SpecialInstruction]):
-                            #log_message(f"Non-electronic. Saving attachment of doc {row.BidSuppID} as PDF...")
-                            pdf_task_queue.put(("save_pdf", (refid, row.DocID, row.BidSuppID, row.DocName, sup_folder, 'bid_sup_item')))
-                            #log_message(f"Enqueued bid_sup_item PDF for BidSuppID {row.BidSuppID}.")
-
-                            # Check if any field contains a Google Drive link
-                            if ("https://drive.google.com/" in str(row.Description)) or ("https://drive.google.com/" in str(row.Remarks)):
-                                link = row.Description if "https://drive.google.com/" in str(row.Description) else row.Remarks
-                                msg = (
-                                    f"Bid Supplement No. {row.BidSuppID} contains files stored in Google Drive.\n"
-                                    f"Please manually follow this link to download all available files:\n{link}\n"
-                                )
-                                with open(os.path.join(refid_folder, "IMPORTANT-NOTES.txt"), "a", encoding="utf-8") as file:
-                                    file.write(f"{msg}\n")
-                                #log_message(f"Google Drive link found for Bid Supplement {row.BidSuppID}. Added to IMPORTANT-NOTES.txt.")
-                #log_message("Finished processing bid supplements.")
-            #else:
-                #log_message("No bid supplements uploaded. Skipping...")
-
-        # Awards (same pattern)
-        if include_award:
-            if tender_status in ("Closed", "Awarded"):
-                cursor.execute("SELECT AwardID FROM M_Award WHERE RefID = ?", refid)
-                awards = cursor.fetchall()
-                if awards:
-                    award_folder = os.path.join(refid_folder, "Award")
-                    create_folder(award_folder)
-                    for award in awards:
-                        award_id = award[0]
-                        sub_folder = os.path.join(award_folder, str(award_id))
-                        create_folder(sub_folder)
-
-                        cursor.execute("""
-                            SELECT rf.ServerFileName, rf.ServerPath
-                            FROM R4_AwardNotice_AwardDoc ad
-                            JOIN R3_File rf ON ad.FileID = rf.FileID
-                            WHERE AwardID = ?
-                        """, award_id)
-
-                        award_item_files = cursor.fetchall()
-                        
-                        #log_message(f"Found {len(award_item_files)} file(s) under AwardID {award_id}. Downloading file(s)...")
-
-                        for file_row in award_item_files:
-                            server_file, server_path = file_row
-                            file_path = os.path.join(r"Z:\Fileserver\R3FileServer", server_path, server_file)
-                            copy_files([file_path], sub_folder, refid_folder)  # copy into award subfolder
-                        
-                        #log_message("Finished processing award documents.")
-            #else:
-                #if row:
-                    #log_message(f'Bid status is "{row[0]}". Skipping award processing...')
-                #else:
-                    #log_message("No tender row found; skipping award processing.")
-
-        # Awards (same pattern)
-        if include_award_notice:
-            if tender_status in ("Closed", "Awarded"):
-                cursor.execute("SELECT AwardID FROM M_Award WHERE RefID = ?", refid)
-                awards = cursor.fetchall()
-                if awards:
-                    award_folder = os.path.join(refid_folder, "Award")
-                    create_folder(award_folder)
-                    for award in awards:
-                        award_id = award[0]
-                        sub_folder = os.path.join(award_folder, str(award_id))
-                        create_folder(sub_folder)
-                        
-                        pdf_task_queue.put(("save_pdf", (award_id, '0', '0', '0', sub_folder, 'award_notice')))
-                            #log_message(f"Enqu eued award_notice PDF for AwardID {award_id}.")
-                        
-                        #log_message("Finished processing award documents.")
-            #else:
-                #if row:
-                    #log_message(f'Bid status is "{row[0]}". Skipping award processing...')
-                #else:
-                    #log_message("No tender row found; skipping award processing.")
-
-        with counter_lock:
-            sequence = completed_counter
-            completed_counter += 1
-
-        log_message(f"[{sequence}/{len_bids}] Completed processing RefID {refid}.")
-        if sequence == len_bids:
-            log_message("All RefIDs processed successfully. Finalizing tasks...")
-        root.after(100, flush_logs)
-    
+        if archive_writer and archive_writer.archived(refid):
+            # zip-refid: archived by an earlier run; drop anything it left staged
+            archive_writer.discard(refid)
+            skipped_refids.add(refid)
+            job_progress.skip_refid()
+            return
+
+        create_folder(refid_folder)
+
+        for artifact in plan.artifacts:
+            if artifact.kind == SAVE_PDF:
+                if not journal_plan(artifact.dest, artifact.type, artifact.source, refid):
+                    continue
+                create_folder(os.path.dirname(artifact.dest))
+                if render_cache and render_cache.get(artifact.source, artifact.freshness, artifact.dest):
+                    journal_mark(artifact.dest, True)
+                    continue
+                if abstract_fetcher and artifact.type in ABSTRACT_TYPES:
+                    abstract_fetcher.prefetch(artifact.source)
+                # enqueue PDF tasks on the GLOBAL pdf_task_queue (do NOT shadow it)
+                job_progress.plan("render")
+                refid_finalizer.add(refid, artifact.dest)
+                pdf_task_queue.put(("save_pdf", artifact.args, artifact.freshness))
+            elif artifact.kind == COPY:
+                if not journal_plan(artifact.dest, artifact.kind, artifact.source, refid):
+                    continue
+                dest_folder = os.path.dirname(artifact.dest)
+                job_progress.plan("copy")
+                refid_finalizer.add(refid, artifact.dest)
+                copy_engine.submit(
+                    artifact.source, dest_folder,
+                    on_error=lambda src, e, d=dest_folder, r=refid_folder: note_copy_failure(src, e, d, r),
+                    on_done=lambda src, dest: note_copy_done(dest),
+                    tags={"refid": refid}
+                )
+            elif artifact.kind == NOTE:
+                # Notes are journaled too so a rerun does not append them twice
+                note_key = f"{artifact.dest}#{hashlib.sha1(artifact.source.encode('utf-8')).hexdigest()[:12]}"
+                if not journal_plan(note_key, artifact.kind, "", refid, check_file=False):
+                    continue
+                with open(artifact.dest, "a", encoding="utf-8") as file:
+                    file.write(f"{artifact.source}\n")
+                journal_mark(note_key, True)
+
+        job_progress.expand_refid()
+
     except Exception as e:
         logging.exception(f"Error processing RefID {refid}: {e}")
         log_message(f"❌ Error processing RefID {refid}: {e}")
+        refid_finalizer.fail(refid)
+        if HEADLESS:
+            emit("refid_failed", refid=refid, error=str(e))
         with open(os.path.join(refid_folder, "IMPORTANT-NOTES.txt"), "a", encoding="utf-8") as file:
             traceback.print_exc(file=file)
     finally:
+        # finalize_refid runs once the renders and copies queued above are done
+        refid_finalizer.seal(refid)
+
+def finalize_refid(refid, failed):
+    """Last pipeline stage: runs on the finalizer thread once every render and copy of the RefID has finished."""
+    global completed_counter
+
+    roots = refid_links.get(refid)
+    if refid in skipped_refids:
+        # Not counted as completed: only (re)linked into its merchants' folders
+        skipped_refids.discard(refid)
+        archive_writer.add_refid(refid, roots)
+        if shared_queue:
+            shared_queue.complete(refid)
+        if HEADLESS:
+            emit("refid_skipped", refid=refid, reason="already archived")
+        else:
+            log_message(f"♻️ RefID {refid} was archived by an earlier run. Skipped.")
+        return
+    if archive_writer:
         try:
-            conn.close()
-        except:
-            pass
+            with metrics.time("archive", refid=refid):
+                archive_writer.add_refid(refid, roots)
+        except OSError as e:
+            # The staged folder is kept, so the files are not lost
+            logging.exception(f"Failed to archive RefID {refid}: {e}")
+            log_message(f"❌ Failed to archive RefID {refid}: {e}")
+            failed += 1
+    elif roots:
+        link_refid(WORK_DIR, refid, roots)
+    if shared_queue:
+        shared_queue.complete(refid, ok=not failed, error=f"{failed} document(s) failed" if failed else None)
+
+    with counter_lock:
+        sequence = completed_counter
+        completed_counter += 1
+    job_progress.finish_refid(ok=not failed)
+    # The total keeps growing while discovery pages are still arriving
+    total, discovering = job_progress.refids_total, job_progress.discovering
+
+    if HEADLESS:
+        emit("refid_done", refid=refid, done=sequence, total=total, discovering=discovering, failed=failed)
+    else:
+        note = f" ({failed} document(s) failed, see IMPORTANT-NOTES.txt)" if failed else ""
+        log_message(f"[{sequence}/{total}{'+' if discovering else ''}] Completed RefID {refid}{note}.")
+    if sequence == total and not discovering:
+        log_message("All RefIDs processed. Finalizing tasks...")
+
+refid_finalizer = RefIDFinalizer(finalize_refid)
+
 # ----------------------------------
 # SAVE PAGE AS PDF (Reuses Same Page)
 # ----------------------------------
-def save_page_as_pdf(page, refid, docid, bidsupid, docname, output_dir, type):
-    pdf_path = ""
+def build_pdf_target(refid, docid, bidsupid, docname, output_dir, type):
+    """Returns (pdf_path, target_url) for one render task."""
+    if type == 'bid_notice':
+        pdf_path = os.path.join(output_dir, f"{type}_abstract.pdf")
+        target_url = f"{GEPS_URL['bid_notice_url']}?refid={refid}"
+    elif type == 'award_notice':
+        pdf_path = os.path.join(output_dir, f"{type}_abstract.pdf")
+        target_url = f"{GEPS_URL['award_notice_url']}?awardID={refid}"
+    elif type == 'assoc_comp':
+        pdf_path = os.path.join(output_dir, f"{docid}.pdf")
+        target_url = (
+            f"{GEPS_URL['assoc_comp_url']}"
+            f"?directFrom=&refId={refid}&DocId={docid}"
+            f"&PageFrom=&OrgName=&OrgID=0"
+            f"&linkFrom=&PreviousPageFrom=ViewBidNoticeAssocCompUI"
+        )
+    elif type == 'bid_sup':
+        pdf_path = os.path.join(output_dir, f"{bidsupid}.pdf")
+        target_url = (
+            f"{GEPS_URL['bid_sup_url']}"
+            f"?refId={refid}&bidSuppID={bidsupid}"
+            f"&directFrom=BidAbstract"
+        )
+    else:
+        pdf_path = os.path.join(output_dir, f"{bidsupid}_{docid}.pdf")
 
-    try:
-        if type == 'bid_notice':
-            pdf_path = os.path.join(output_dir, f"{type}_abstract.pdf")
-            target_url = f"{GEPS_URL['bid_notice_url']}?refid={refid}"
-        elif type == 'award_notice':
-            pdf_path = os.path.join(output_dir, f"{type}_abstract.pdf")
-            target_url = f"{GEPS_URL['award_notice_url']}?awardID={refid}"
-        elif type == 'assoc_comp':
-            pdf_path = os.path.join(output_dir, f"{docid}.pdf")
-            target_url = (
-                f"{GEPS_URL['assoc_comp_url']}"
-                f"?directFrom=&refId={refid}&DocId={docid}"
-                f"&PageFrom=&OrgName=&OrgID=0"
-                f"&linkFrom=&PreviousPageFrom=ViewBidNoticeAssocCompUI"
-            )
-        elif type == 'bid_sup':
-            pdf_path = os.path.join(output_dir, f"{bidsupid}.pdf")
-            target_url = (
-                f"{GEPS_URL['bid_sup_url']}"
-                f"?refId={refid}&bidSuppID={bidsupid}"
-                f"&directFrom=BidAbstract"
-            )
-        else:
-            pdf_path = os.path.join(output_dir, f"{bidsupid}_{docid}.pdf")
+        target_url = (
+            f"{GEPS_URL['bid_sup_item_url']}"
+            f"?refId={refid}&DocId={docid}&directFrom=BidAbstract&BidSupplID={bidsupid}"
+        )
 
-            target_url = (
-                f"{GEPS_URL['bid_sup_item_url']}"
-                f"?refId={refid}&DocId={docid}&directFrom=BidAbstract&BidSupplID={bidsupid}"
-            )
+    return pdf_path, target_url
 
-        #log_message(f"Navigating to {target_url}")
-        page.goto(target_url, timeout=32000)
-        page.wait_for_load_state("networkidle")
+def fetch_abstract_html(target_url, type):
+    """Prefetched abstract HTML, or None when the page has to be navigated."""
+    if abstract_fetcher is None or type not in ABSTRACT_TYPES:
+        return None
+    return abstract_fetcher.take(target_url).result()
+
+def load_target_page(page, refid, target_url, type):
+    """Navigates to target_url and removes the admin name. Raises SessionExpiredError on the login page."""
+    profile = wait_profile(type) if FAST_RENDER else None
+
+    #log_message(f"Navigating to {target_url}")
+    if profile:
+        with metrics.time("goto"):
+            page.goto(target_url, timeout=32000, wait_until=profile["goto_wait"])
+        if profile["ready"]:
+            with metrics.time("load_state"):
+                page.wait_for_load_state(profile["ready"], timeout=32000)
+    else:
+        with metrics.time("goto"):
+            page.goto(target_url, timeout=32000)
+        with metrics.time("load_state"):
+            page.wait_for_load_state("networkidle")
 
-        # If still redirected to login, report error
-        if "log-in" in page.url.lower():
-            msg = (f"Session Expired: Saving PDF failed for {target_url}. Page was redirected to the login page.")
-            logging.error(msg)
+    # If still redirected to login, let the worker log in again and replay
+    if "log-in" in page.url.lower():
+        raise SessionExpiredError(f"Session Expired: Saving PDF failed for {target_url}. Page was redirected to the login page.")
 
-            refid_dir = os.path.join(OUTPUT_DIR, str(refid))
-            os.makedirs(refid_dir, exist_ok=True)
+    if (profile["selector"] if profile else type not in ('bid_notice', 'award_notice')):
+        try:
+            with metrics.time("selector"):
+                page.wait_for_selector('span[id="ctl01_nameLBL"]', timeout=profile["selector_timeout"] if profile else 32000)
+            # Then safely remove it
+            page.evaluate("""
+                () => {
+                    const element = document.querySelector('span[id="ctl01_nameLBL"]');
+                    if (element) element.remove();
+                }
+            """)
+            #logging.info("Removed admin name from page before saving PDF.")
+        except:
+            logging.info("Admin name element not found, skipping removal.")
 
-            with open(os.path.join(refid_dir, "IMPORTANT-NOTES.txt"), "a", encoding="utf-8") as file:
-                file.write(msg + "\n")
+    if profile:
+        if profile["settle"]:
+            with metrics.time("load_state"):
+                page.wait_for_load_state(profile["settle"], timeout=32000)
+    else:
+        with metrics.time("load_state"):
+            page.wait_for_load_state("networkidle", timeout=32000)
 
-        if type not in ('bid_notice', 'award_notice'):
-            try:
-                page.wait_for_selector('span[id="ctl01_nameLBL"]', timeout=32000)
-                # Then safely remove it
-                page.evaluate("""
-                    () => {
-                        const element = document.querySelector('span[id="ctl01_nameLBL"]');
-                        if (element) element.remove();
-                    }
-                """)
-                #logging.info("Removed admin name from page before saving PDF.")
-            except:
-                logging.info("Admin name element not found, skipping removal.")
+def save_page_as_pdf(page, refid, docid, bidsupid, docname, output_dir, type):
+    pdf_path = ""
 
-        # Save the PDF
-        page.wait_for_load_state("networkidle", timeout=32000)
-        page.pdf(path=pdf_path, format="A4", print_background=True)
-        #log_message(f"Saved PDF: {pdf_path}")
+    try:
+        pdf_path, target_url = build_pdf_target(refid, docid, bidsupid, docname, output_dir, type)
+
+        html = fetch_abstract_html(target_url, type)
+
+        def render():
+            if html:
+                with metrics.time("set_content"):
+                    page.set_content(html, wait_until="load", timeout=32000)
+            elif portal_limiter:
+                # Session expiry says nothing about portal load; don't back off on it
+                with portal_limiter.slot(stop_worker, is_ok=lambda e: not is_transient(e)):
+                    load_target_page(page, refid, target_url, type)
+            else:
+                load_target_page(page, refid, target_url, type)
 
+            # Save the PDF
+            # Write to a .part file first so partial PDFs are never mistaken for complete ones
+            with metrics.time("pdf"):
+                page.pdf(path=part_path(pdf_path), format="A4", print_background=True)
+            os.replace(part_path(pdf_path), pdf_path)
+
+        if RENDER_RETRIES:
+            call_with_retry(render, type, render_breaker, stop_worker)
+        else:
+            render()
+        #log_message(f"Saved PDF: {pdf_path}")
+        return True
+
+    except SessionExpiredError:
+        # Don't print the login page under the document's name
+        raise
+    except (RenderStopped, LimiterStopped) as e:
+        # Shutting down, not a portal failure: no note, and a rerun retries it
+        logging.info(f"Skipped PDF for RefID {refid}: {e}")
+        return False
     except Exception as e:
-        refid_dir = os.path.join(OUTPUT_DIR, str(refid))
-        logging.error(f"Failed to save PDF for RefID {refid}: {e}")
-        os.makedirs(refid_dir, exist_ok=True) 
-        with open(os.path.join(refid_dir, "IMPORTANT-NOTES.txt"), "a", encoding="utf-8") as file:
-            file.write(f"Failed to save PDF for RefID {refid}: {e}\n")
+        write_render_failure(refid, f"Failed to save PDF for RefID {refid}: {e}")
+        return False
+
+def write_render_failure(refid, error):
+    msg = str(error)
+    logging.error(msg)
+    refid_dir = os.path.join(WORK_DIR, str(refid))
+    os.makedirs(refid_dir, exist_ok=True)
+    with open(os.path.join(refid_dir, "IMPORTANT-NOTES.txt"), "a", encoding="utf-8") as file:
+        file.write(msg + "\n")
+
+# -------------------------------
+# SESSION RECOVERY
+# -------------------------------
+def relogin(page):
+    """Logs in again on page with the credentials entered at startup; returns the new storage_state or None."""
+    log_message("🔑 Session expired. Logging in again...")
+    state = login_on_page(page, GEPS_URL["login_url"], user_credentials)
+    log_message("✅ Logged in again. Resuming." if state else "❌ Re-login failed! Remaining PDFs will be skipped.")
+    return state
+
+def save_with_relogin(page, args, generation):
+    """save_page_as_pdf that logs in again (once per expiry, shared by all workers) and replays the task."""
+    try:
+        return save_page_as_pdf(page, *args)
+    except SessionExpiredError as e:
+        error = e
+
+    if session_guard.renew(generation, lambda: relogin(page)):
+        session_guard.sync(generation, lambda state: page.context.add_cookies(state["cookies"]))
+        try:
+            return save_page_as_pdf(page, *args)
+        except SessionExpiredError as e:
+            error = e
+
+    write_render_failure(args[0], error)
+    return False
 
 # -------------------------------
 # LOGIN POPUP (Tkinter)
@@ -699,16 +1279,14 @@ def logout_and_exit(root):
 
     log_message("🚪 Logging out... please wait.")
     try:
-        # 1️⃣ Signal the worker to log out through Playwright
-        pdf_task_queue.put(("logout", []))
-
-        # 2️⃣ Give it a moment to complete
-        time.sleep(2)
-
-        # 3️⃣ Stop the worker thread
+        # 1️⃣ Stop every render worker; the primary one then logs out of the portal
         stop_worker.set()
 
-        # 4️⃣ Optional: remove local session data
+        # 2️⃣ Give the logout a moment to complete
+        render_thread.join(timeout=15)
+        close_session_resources()
+
+        # 3️⃣ Optional: remove local session data
         user_data_dir = os.path.join(os.path.expanduser("~"), "PhilGEPS_Session")
         if os.path.exists(user_data_dir):
             shutil.rmtree(user_data_dir, ignore_errors=True)
@@ -726,11 +1304,33 @@ def on_close():
     if messagebox.askokcancel("Exit", "Are you sure you want to close the app?"):
         threading.Thread(target=logout_and_exit, args=(root,), daemon=True).start()
 
+# -------------------------------
+# PROGRESS PANEL
+# -------------------------------
+PROGRESS_REFRESH_MS = 1000
+
+def refresh_progress():
+    """Redraws the progress panel from job_progress; reschedules itself until the job stops."""
+    snap = job_progress.snapshot()
+    active = snap["active"]
+    progress["value"] = snap["fraction"] * 100
+    progress_var.set(
+        f"RefIDs {snap['refids_done']}/{snap['refids_total']}{'+' if snap['discovering'] else ''}   "
+        f"PDFs {snap['pdfs']} ({snap['pdfs_per_min']:.1f}/min)   "
+        f"Copied {snap['copies']} file(s), {snap['mb_copied']:.1f} MB   "
+        f"Failed {snap['failed']}\n"
+        f"Queued: {task_queue.qsize()} RefID(s), {pdf_task_queue.qsize()} render(s), {copy_engine.pending} copy(ies)   "
+        f"Active: {active.get('refid', 0)} RefID / {active.get('render', 0)} render worker(s)\n"
+        f"Elapsed {format_duration(snap['elapsed'])}   ETA {format_duration(snap['eta'])}"
+    )
+    if job_progress.finished_at is None:
+        root.after(PROGRESS_REFRESH_MS, refresh_progress)
+
 # -------------------------------
 # GUI
 # -------------------------------
 def open_main_window(conn, page):
-    global merchant_org_var, year_var, status_var, log_box, include_assoc_var, include_supp_var, include_award_var, include_award_notice_var, include_bid_notice_var, run_button, progress
+    global merchant_org_var, year_var, year_to_var, status_var, log_box, include_assoc_var, include_supp_var, include_award_var, include_award_notice_var, include_bid_notice_var, run_button, spec_button, progress, progress_var
 
     title_label = ttk.Label(root, text="PhilGEPS BID Document Extraction Tool", font=("Segoe UI", 14, "bold"))
     title_label.pack(pady=10)
@@ -750,6 +1350,10 @@ def open_main_window(conn, page):
     ttk.Combobox(filter_frame, values="Awarded", textvariable=status_var, state="readonly", width=15).grid(row=0, column=1, padx=10, pady=5)
     ttk.Label(filter_frame, text="Year:").grid(row=0, column=2, padx=10, pady=5)
     ttk.Combobox(filter_frame, textvariable=year_var, values=[str(y) for y in range(2015, 2026)], state="readonly", width=10).grid(row=0, column=3, padx=10, pady=5)
+    # Optional end of a year range; blank means the single year above
+    year_to_var = tk.StringVar(value="")
+    ttk.Label(filter_frame, text="To:").grid(row=0, column=4, padx=10, pady=5)
+    ttk.Combobox(filter_frame, textvariable=year_to_var, values=[""] + [str(y) for y in range(2015, 2026)], state="readonly", width=10).grid(row=0, column=5, padx=10, pady=5)
 
     doc_frame = ttk.LabelFrame(root, text="Document Types")
     doc_frame.pack(fill="x", padx=20, pady=5)
@@ -766,12 +1370,19 @@ def open_main_window(conn, page):
     ttk.Checkbutton(doc_frame, text="Award Notice", variable=include_award_notice_var).grid(row=0, column=3, sticky="w", padx=10, pady=3)
     ttk.Checkbutton(doc_frame, text="Award Docs", variable=include_award_var).grid(row=0, column=4, sticky="w", padx=10, pady=3)
 
-    run_button = ttk.Button(root, text="🚀 Run Extraction", command=run_extraction, state="disabled")
-    run_button.pack(pady=10)
- 
-    #progress = ttk.Progressbar(root, orient="horizontal", mode="indeterminate", length=250)
-    #progress.pack(pady=5)
-    #progress.pack_forget()  # hide it initially
+    button_frame = ttk.Frame(root)
+    button_frame.pack(pady=10)
+    run_button = ttk.Button(button_frame, text="🚀 Run Extraction", command=run_extraction, state="disabled")
+    run_button.pack(side="left", padx=5)
+    spec_button = ttk.Button(button_frame, text="📋 Run Job Spec", command=run_job_spec, state="disabled")
+    spec_button.pack(side="left", padx=5)
+
+    progress_frame = ttk.LabelFrame(root, text="Progress")
+    progress_frame.pack(fill="x", padx=20, pady=5)
+    progress = ttk.Progressbar(progress_frame, orient="horizontal", mode="determinate", maximum=100)
+    progress.pack(fill="x", padx=10, pady=(8, 4))
+    progress_var = tk.StringVar(value="Idle.")
+    ttk.Label(progress_frame, textvariable=progress_var, font=("Consolas", 9), justify="left").pack(anchor="w", padx=10, pady=(0, 8))
 
     log_frame = ttk.LabelFrame(root, text="Logs")
     log_frame.pack(fill="both", expand=True, padx=20, pady=10)
@@ -781,10 +1392,323 @@ def open_main_window(conn, page):
     ttk.Label(root, text="PhilGEPS EGPOD", font=("Segoe UI", 8, "italic")).pack(pady=5)
     root.title("PhilGEPSBidDocsExtractor_v1")
 
+# -------------------------------
+# HEADLESS MODE
+# -------------------------------
+HEADLESS_TYPES = ("bid_notice", "assoc", "supp", "award_notice", "award")
+
+def emit(event, **fields):
+    """Writes one JSON progress line to stdout."""
+    line = json.dumps({"ts": round(time.time(), 3), "event": event, **fields}, default=str, ensure_ascii=False)
+    with emit_lock:
+        sys.stdout.write(line + "\n")
+        sys.stdout.flush()
+
+def parse_headless_args(argv):
+    parser = argparse.ArgumentParser(
+        description="Unattended merchant bulk extraction. Credentials come from PHILGEPS_USERNAME/"
+                    "PHILGEPS_PASSWORD or a prompt; progress is printed as JSON lines.",
+    )
+    parser.add_argument("--headless", action="store_true", required=True)
+    parser.add_argument("--config", help="JSON file with any of: org_ids, year, jobs, types, output")
+    parser.add_argument("--org-id", dest="org_ids", action="append", help="merchant OrgID (repeatable)")
+    parser.add_argument("--year", help="award year(s): 2024, a range 2022-2024, or separate jobs 2023,2024")
+    parser.add_argument("--types", help=f"comma-separated document types (default: all of {','.join(HEADLESS_TYPES)})")
+    parser.add_argument("--output", help="output root; each merchant is extracted into <output>/<OrgID>")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="plan the job and report counts, source bytes, estimated duration and free space; no login")
+    parser.add_argument("--output-format", choices=OUTPUT_FORMATS,
+                        help="folders (default), zip-refid (one <RefID>.zip each) or zip-job (one archive per job)")
+    parser.add_argument("--queue", help="shared work queue file (SQLite); workers pointed at the same file split the job")
+    parser.add_argument("--worker-id", help="name of this worker in the work queue (default: <host>-<pid>)")
+    parser.add_argument("--job-id", help="work queue job name (default: derived from the jobs and types)")
+    args = parser.parse_args(argv)
+
+    config = {}
+    if args.config:
+        with open(args.config, encoding="utf-8") as f:
+            config = json.load(f)
+
+    org_ids = args.org_ids or config.get("org_ids") or []
+    years = args.year.split(",") if args.year else config.get("years") or [config.get("year")]
+    types = args.types.split(",") if args.types else config.get("types", list(HEADLESS_TYPES))
+    output = args.output or config.get("output")
+    queue_path = args.queue or config.get("queue")
+    output_format = args.output_format or config.get("output_format") or OUTPUT_FORMAT
+    if output_format not in OUTPUT_FORMATS:
+        parser.error(f"unknown output format {output_format!r}")
+
+    # Every --org-id/--year combination plus the spec's "jobs" entries (see job_batch.py)
+    try:
+        pairs = expand_jobs(config.get("jobs", []) + [{"org_id": org_id, "years": years} for org_id in org_ids])
+    except ValueError as e:
+        parser.error(str(e))
+
+    if not pairs or not output:
+        parser.error("--org-id, --year and --output (or \"jobs\" in --config) are required")
+    for _, year in pairs:
+        try:
+            year_range(year)
+        except ValueError as e:
+            parser.error(f"invalid year {year!r}: {e}")
+    unknown = set(types) - set(HEADLESS_TYPES)
+    if unknown:
+        parser.error(f"unknown document type(s): {', '.join(sorted(unknown))}")
+
+    distributed = None
+    if queue_path:
+        job_id = args.job_id or config.get("job_id") or default_job_id(pairs, types)
+        distributed = (os.path.abspath(queue_path), job_id, args.worker_id or default_worker_id())
+
+    return pairs, set(types), os.path.abspath(output), args.dry_run, distributed, output_format
+
+def default_job_id(pairs, types):
+    """Same jobs and types give the same id, so workers started with the same arguments join one job."""
+    key = json.dumps([sorted(pairs), sorted(types)])
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()[:12]
+
+def headless_credentials():
+    # Prompts go to stderr like getpass does; stdout carries only the JSON progress lines
+    username = os.environ.get("PHILGEPS_USERNAME")
+    if not username:
+        sys.stderr.write("PhilGEPS username: ")
+        sys.stderr.flush()
+        username = sys.stdin.readline().strip()
+    password = os.environ.get("PHILGEPS_PASSWORD") or getpass.getpass("PhilGEPS password: ", stream=sys.stderr)
+    return {"username": username, "password": password}
+
+def wait_until_drained(render_thread):
+    """Blocks until every queued RefID, render and copy has finished.
+
+    Returns False if the render workers stopped while work was still queued.
+    """
+    for q in (task_queue, pdf_task_queue):
+        with q.all_tasks_done:
+            while q.unfinished_tasks:
+                if not render_thread.is_alive():
+                    return False
+                q.all_tasks_done.wait(timeout=5)
+    copy_engine.wait()
+    # Renders and copies are done; wait for the last RefIDs to be finalized
+    refid_finalizer.wait()
+    return True
+
+def run_headless_job(org_id, year, types, output_root, render_thread):
+    """Extracts one merchant into <output_root>/<org_id>; returns the number of failed or unfinished artifacts."""
+    global OUTPUT_DIR, completed_counter
+
+    OUTPUT_DIR = os.path.join(output_root, org_id)
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    prepare_output_root()
+    completed_counter = 1
+    job_progress.start()
+
+    started = time.time()
+    with db_pool.connection() as conn:
+        if not conn:
+            raise RuntimeError("Database connection failed.")
+        org = conn.cursor().execute("SELECT OrgName FROM M_Organization WHERE OrgID = ?", org_id).fetchone()
+        emit("job_start", org_id=org_id, org_name=org.OrgName if org else None, year=year, output=OUTPUT_DIR)
+        queue_job(
+            conn, org_id, year,
+            "bid_notice" in types, "assoc" in types, "supp" in types, "award_notice" in types, "award" in types
+        )
+
+    if not wait_until_drained(render_thread):
+        raise RuntimeError("Render workers stopped before the job finished.")
+
+    job_progress.stop()
+    snap = job_progress.snapshot()
+    counts = journal.counts()
+    log_job_summary()
+    emit("job_done", org_id=org_id, year=year, seconds=round(time.time() - started, 1),
+         done=counts.get(DONE, 0), failed=counts.get(FAILED, 0), unfinished=counts.get(PLANNED, 0),
+         pdfs_per_min=round(snap["pdfs_per_min"], 1), mb_copied=round(snap["mb_copied"], 1))
+    return counts.get(FAILED, 0) + counts.get(PLANNED, 0)
+
+def run_headless_batch(pairs, types, output_root, render_thread):
+    """Runs several merchant/year pairs as one deduplicated batch; returns the number of failed or unfinished artifacts."""
+    job_progress.start()
+    started = time.time()
+    emit("job_start", jobs=[{"org_id": org_id, "year": year} for org_id, year in pairs], output=output_root)
+
+    batch = run_batch_job(pairs, tuple(t in types for t in HEADLESS_TYPES), output_root, render_thread)
+
+    job_progress.stop()
+    snap = job_progress.snapshot()
+    counts = journal.counts()
+    log_job_summary()
+    emit("job_done", jobs=len(pairs), refids=len(batch.tenders), shared_refids=batch.duplicates,
+         seconds=round(time.time() - started, 1),
+         done=counts.get(DONE, 0), failed=counts.get(FAILED, 0), unfinished=counts.get(PLANNED, 0),
+         pdfs_per_min=round(snap["pdfs_per_min"], 1), mb_copied=round(snap["mb_copied"], 1))
+    return counts.get(FAILED, 0) + counts.get(PLANNED, 0)
+
+def run_distributed_job(pairs, types, output_root, render_thread, queue_path, job_id):
+    """--queue: seeds the job's RefIDs into the shared queue and extracts the ones this worker claims.
+
+    Returns the number of failed or unfinished artifacts of this worker.
+    """
+    global OUTPUT_DIR, completed_counter, shared_queue, refid_links
+
+    includes = tuple(t in types for t in HEADLESS_TYPES)
+    # Same layout as a single-worker run: one merchant directly, a batch through <output>/_refids
+    OUTPUT_DIR = os.path.join(output_root, pairs[0][0] if len(pairs) == 1 else SHARED_DIR)
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    prepare_output_root()
+    completed_counter = 1
+    job_progress.start()
+
+    started = time.time()
+    shared_queue = WorkQueue(queue_path, job_id, WORKER_ID, lease_seconds=WORK_LEASE_SECONDS).start_heartbeat()
+    try:
+        with db_pool.connection() as conn:
+            if not conn:
+                raise RuntimeError("Database connection failed.")
+            # Every worker resolves the job; only the first one's rows are new
+            batch = resolve_batch(conn, pairs, discover_refids)
+            added = shared_queue.add(batch.tenders.items())
+            if len(pairs) > 1:
+                refid_links = merchant_roots(output_root, batch.members)
+            emit("job_start", jobs=[{"org_id": org_id, "year": year} for org_id, year in pairs], output=OUTPUT_DIR,
+                 queue=queue_path, job_id=job_id, worker_id=WORKER_ID, refids=len(batch.tenders), seeded=added)
+
+            while render_thread.is_alive():
+                in_flight = task_queue.qsize() + refid_finalizer.pending
+                claimed = shared_queue.claim(WORK_QUEUE_PREFETCH - in_flight)
+                if claimed:
+                    queue_refids(conn, claimed, *includes)
+                    continue
+                if not shared_queue.open_count():
+                    break
+                # Our own RefIDs are still finishing or other workers hold leases
+                time.sleep(WORK_POLL_SECONDS if not in_flight else 1)
+            job_progress.finish_discovery()
+
+        if not wait_until_drained(render_thread):
+            raise RuntimeError("Render workers stopped before the job finished.")
+
+        job_progress.stop()
+        snap = job_progress.snapshot()
+        counts = journal.counts()
+        job_counts = shared_queue.counts()
+        log_job_summary()
+        emit("job_done", job_id=job_id, worker_id=WORKER_ID, claimed=shared_queue.claimed,
+             reclaimed=shared_queue.reclaimed, seconds=round(time.time() - started, 1),
+             done=counts.get(DONE, 0), failed=counts.get(FAILED, 0), unfinished=counts.get(PLANNED, 0),
+             job_refids_done=job_counts.get(QUEUE_DONE, 0), job_refids_failed=job_counts.get(QUEUE_FAILED, 0),
+             pdfs_per_min=round(snap["pdfs_per_min"], 1), mb_copied=round(snap["mb_copied"], 1))
+        return counts.get(FAILED, 0) + counts.get(PLANNED, 0)
+    finally:
+        # Anything still leased (the job was cut short) goes back to the other workers
+        shared_queue.close()
+        shared_queue = None
+        refid_links = {}
+
+def run_dry_run(pairs, types, output_root):
+    """--dry-run: builds the plan without logging in or writing anything. Exit code 1 if the destination is too small."""
+    includes = tuple(t in types for t in HEADLESS_TYPES)
+    # Same destinations as the real run: one merchant directly, a batch through <output>/_refids
+    output_dir = os.path.join(output_root, pairs[0][0] if len(pairs) == 1 else SHARED_DIR)
+
+    plans = []
+    with db_pool.connection() as conn:
+        if not conn:
+            raise RuntimeError("Database connection failed.")
+        batch = resolve_batch(conn, pairs, discover_refids)
+        for chunk in chunked(list(batch.tenders.items())):
+            with metrics.time("db_metadata"):
+                artifacts = load_artifacts(conn, chunk, *includes)
+            plans.extend(plan_refid(refid, artifacts[refid], output_dir, build_pdf_target) for refid, _ in chunk)
+
+    missing = stat_sources(plans)
+    summary = summarize(plans, output_root, THROUGHPUT_HISTORY)
+    emit("dry_run", jobs=[{"org_id": org_id, "year": year} for org_id, year in pairs],
+         shared_refids=batch.duplicates, missing_sources=len(missing), **summary)
+    for artifact in missing:
+        emit("missing_source", source=artifact.source, dest=artifact.dest)
+
+    if not summary["enough_space"]:
+        emit("error", message=f"{output_root} has {summary['free_bytes'] / 1024 ** 3:.1f} GB free; "
+                              f"the job needs about {summary['needed_bytes'] / 1024 ** 3:.1f} GB.")
+        return 1
+    return 0
+
+def run_headless(argv):
+    """Entry point for --headless. Exit code: 0 all done, 1 some artifacts failed, 2 fatal error."""
+    global HEADLESS, WORKER_ID, OUTPUT_FORMAT, user_credentials, stop_worker
+
+    pairs, types, output_root, dry_run, distributed, OUTPUT_FORMAT = parse_headless_args(argv)
+    HEADLESS = True
+    if distributed and not dry_run:
+        WORKER_ID = distributed[2]
+
+    if dry_run:
+        exit_code = 2
+        try:
+            exit_code = run_dry_run(pairs, types, output_root)
+        except Exception as e:
+            logging.exception(f"Dry run failed: {e}")
+            emit("error", message=str(e))
+        finally:
+            db_pool.close_all()
+            log_channel.close()
+            emit("done", exit_code=exit_code)
+        return exit_code
+    user_credentials = headless_credentials()
+
+    # Chromium locks its profile, so workers on the same machine (--queue) need one each
+    session_name = f"PhilGEPS_Session-{sanitize_path(WORKER_ID)}" if WORKER_ID else "PhilGEPS_Session"
+    user_data_dir = os.path.join(os.path.expanduser("~"), session_name)
+    os.makedirs(user_data_dir, exist_ok=True)
+
+    stop_worker = threading.Event()
+    render_thread = threading.Thread(target=login_philgeps, args=(user_data_dir, stop_worker), daemon=True)
+    render_thread.start()
+    scheduler = start_scheduler(stop_worker)
+
+    exit_code = 0
+    try:
+        while not session_ready.wait(timeout=1):
+            if not render_thread.is_alive():
+                emit("error", message="Login failed.")
+                exit_code = 2
+                return exit_code
+
+        try:
+            if distributed:
+                failed = run_distributed_job(pairs, types, output_root, render_thread, *distributed[:2])
+            elif len(pairs) == 1:
+                failed = run_headless_job(*pairs[0], types, output_root, render_thread)
+            else:
+                failed = run_headless_batch(pairs, types, output_root, render_thread)
+            if failed:
+                exit_code = 1
+        except Exception as e:
+            logging.exception(f"Headless job failed: {e}")
+            emit("error", message=str(e))
+            exit_code = 2
+            return exit_code
+    finally:
+        # Every render worker leaves its loop; the primary page then logs out once
+        stop_worker.set()
+        render_thread.join(timeout=15)
+        stop_scheduler(scheduler)
+        copy_engine.shutdown()
+        close_session_resources()
+        db_pool.close_all()
+        log_channel.close()
+        emit("done", exit_code=exit_code)
+
+    return exit_code
+
 # -------------------------------
 # MAIN
 # -------------------------------
 if __name__ == "__main__":
+    if "--headless" in sys.argv[1:]:
+        sys.exit(run_headless(sys.argv[1:]))
+
     # don't create a single conn to be shared — threads will open their own when needed
     # conn = connect_db()  # remove sharing across threads
 
@@ -795,8 +1719,8 @@ if __name__ == "__main__":
     os.makedirs(USER_DATA_DIR, exist_ok=True)
 
     stop_worker = threading.Event()
-    worker = threading.Thread(target=login_philgeps, args=(USER_DATA_DIR, stop_worker), daemon=True)
-    worker.start()
+    render_thread = threading.Thread(target=login_philgeps, args=(USER_DATA_DIR, stop_worker), daemon=True)
+    render_thread.start()
 
     # start GUI (root) in main thread
     root = tk.Tk()
@@ -804,13 +1728,14 @@ if __name__ == "__main__":
     open_main_window(None, None)  # adjust your open_main_window signature if needed
 
     root.protocol("WM_DELETE_WINDOW", on_close)
+    root.after(LOG_FLUSH_MS, flush_logs)
 
-    # process_queue should create new threads that call process_refid(refid, ...)
-    # make sure process_queue uses the new process_refid signature (no conn argument)
-    process_queue()
+    scheduler = start_scheduler(stop_worker)
 
     root.mainloop()
 
     # when exiting:
     stop_worker.set()
-    worker.join(timeout=5)
+    stop_scheduler(scheduler)
+    render_thread.join(timeout=5)
+    log_channel.close()
@@ -0,0 +1,224 @@
+import json
+import logging
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+# ----------------------------------
+# STAGE TIMINGS
+# ----------------------------------
+# Times each stage of an extraction (db_discovery, db_metadata, goto,
+# load_state, selector, set_content, pdf, copy) tagged with RefID, document
+# type and worker. Samples stream to extraction-metrics.jsonl in the output
+# root while the job runs; finish_run() writes extraction-metrics.prom
+# (Prometheus text format) and returns p50/p95/p99 per stage. TimedCursor
+# splits DB time into db_query (execute) and db_fetch.
+#
+# Render workers bind their tags once per task with `with metrics.tags(...)`
+# so deeper helpers only have to wrap the stage: `with metrics.time("goto")`.
+#
+# Memory stays flat for any job size: count and total are exact, while the
+# quantiles come from a fixed-size uniform sample (reservoir) per series.
+
+JSONL_NAME = "extraction-metrics.jsonl"
+PROM_NAME = "extraction-metrics.prom"
+QUANTILES = (0.5, 0.95, 0.99)
+RESERVOIR_SIZE = 2048
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, round(q * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", " ")
+
+
+class _Series:
+    __slots__ = ("count", "total", "sample")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.sample = []
+
+    def add(self, seconds, rng):
+        self.count += 1
+        self.total += seconds
+        if len(self.sample) < RESERVOIR_SIZE:
+            self.sample.append(seconds)
+        else:
+            # Algorithm R: every sample so far stays in with equal probability
+            index = rng.randrange(self.count)
+            if index < RESERVOIR_SIZE:
+                self.sample[index] = seconds
+
+
+class StageMetrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._samples = {}  # (stage, type) -> _Series
+        self._stages = {}  # stage -> _Series over every type
+        self._rng = random.Random()
+        self._failures = {}  # (stage, type) -> count
+        self._jsonl = None
+        self._root = None
+        self._started = None
+        self._jsonl_name, self._prom_name = JSONL_NAME, PROM_NAME
+
+    # ----------------------------------
+    # RUN LIFECYCLE
+    # ----------------------------------
+    def start_run(self, output_root, label=None):
+        """Resets the samples and starts streaming them to output_root (None keeps them in memory only).
+
+        label (e.g. a worker id) is added to the file names when several processes share output_root.
+        """
+        with self._lock:
+            self._close_jsonl()
+            self._samples.clear()
+            self._stages.clear()
+            self._failures.clear()
+            self._root = output_root
+            self._started = time.time()
+            self._jsonl_name, self._prom_name = JSONL_NAME, PROM_NAME
+            if label:
+                self._jsonl_name = JSONL_NAME.replace(".jsonl", f"-{label}.jsonl")
+                self._prom_name = PROM_NAME.replace(".prom", f"-{label}.prom")
+            if output_root:
+                os.makedirs(output_root, exist_ok=True)
+                self._jsonl = open(os.path.join(output_root, self._jsonl_name), "a", encoding="utf-8", buffering=1)
+
+    def finish_run(self):
+        """Writes the Prometheus file and returns one summary line per stage."""
+        with self._lock:
+            self._close_jsonl()
+            if self._root:
+                try:
+                    self._write_prometheus(os.path.join(self._root, self._prom_name))
+                except OSError as e:
+                    logging.warning(f"Failed to write {self._prom_name}: {e}")
+            return self._summary_lines()
+
+    def _close_jsonl(self):
+        if self._jsonl:
+            self._jsonl.close()
+            self._jsonl = None
+
+    # ----------------------------------
+    # RECORDING
+    # ----------------------------------
+    @contextmanager
+    def tags(self, **tags):
+        """Binds refid/type/worker tags to every stage timed on this thread inside the block."""
+        previous = getattr(self._local, "tags", {})
+        self._local.tags = {**previous, **tags}
+        try:
+            yield
+        finally:
+            self._local.tags = previous
+
+    @contextmanager
+    def time(self, stage, **tags):
+        started = time.perf_counter()
+        ok = True
+        try:
+            yield
+        except BaseException:
+            ok = False
+            raise
+        finally:
+            self.record(stage, time.perf_counter() - started, ok=ok, **tags)
+
+    def record(self, stage, seconds, ok=True, **tags):
+        tags = {**getattr(self._local, "tags", {}), **tags}
+        tags.setdefault("worker", threading.current_thread().name)
+        key = (stage, tags.get("type"))
+
+        with self._lock:
+            self._samples.setdefault(key, _Series()).add(seconds, self._rng)
+            self._stages.setdefault(stage, _Series()).add(seconds, self._rng)
+            if not ok:
+                self._failures[key] = self._failures.get(key, 0) + 1
+            if self._jsonl:
+                sample = {"ts": round(time.time(), 3), "stage": stage, "seconds": round(seconds, 4), "ok": ok}
+                sample.update({k: v for k, v in tags.items() if v is not None})
+                self._jsonl.write(json.dumps(sample, default=str) + "\n")
+
+    # ----------------------------------
+    # SUMMARIES
+    # ----------------------------------
+    def _summary_lines(self):
+        lines = []
+        for stage, series in sorted(self._stages.items(), key=lambda item: -item[1].total):
+            p50, p95, p99 = (percentile(series.sample, q) for q in QUANTILES)
+            lines.append(
+                f"{stage:<12} n={series.count:<6} total={series.total:.1f}s "
+                f"p50={p50:.2f}s p95={p95:.2f}s p99={p99:.2f}s"
+            )
+        return lines
+
+    def _write_prometheus(self, path):
+        lines = [
+            "# HELP philgeps_stage_seconds Time spent per extraction stage and document type.",
+            "# TYPE philgeps_stage_seconds summary",
+        ]
+        for (stage, type), series in sorted(self._samples.items(), key=lambda item: (item[0][0], str(item[0][1]))):
+            labels = f'stage="{_label(stage)}",type="{_label(type or "")}"'
+            for q in QUANTILES:
+                lines.append(f'philgeps_stage_seconds{{{labels},quantile="{q}"}} {percentile(series.sample, q):.6f}')
+            lines.append(f"philgeps_stage_seconds_sum{{{labels}}} {series.total:.6f}")
+            lines.append(f"philgeps_stage_seconds_count{{{labels}}} {series.count}")
+
+        lines.append("# HELP philgeps_stage_failures_total Stage executions that raised.")
+        lines.append("# TYPE philgeps_stage_failures_total counter")
+        for (stage, type), count in sorted(self._failures.items(), key=lambda item: (item[0][0], str(item[0][1]))):
+            lines.append(f'philgeps_stage_failures_total{{stage="{_label(stage)}",type="{_label(type or "")}"}} {count}')
+
+        lines.append("# HELP philgeps_run_started_seconds Unix time the run started.")
+        lines.append("# TYPE philgeps_run_started_seconds gauge")
+        lines.append(f"philgeps_run_started_seconds {self._started or 0:.0f}")
+
+        tmp = path + ".part"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(tmp, path)
+
+
+class TimedCursor:
+    """DB cursor proxy that times execute() as db_query and fetch*() as db_fetch."""
+
+    def __init__(self, cursor, stage_metrics):
+        self._cursor = cursor
+        self._metrics = stage_metrics
+
+    def execute(self, *args):
+        with self._metrics.time("db_query"):
+            self._cursor.execute(*args)
+        return self
+
+    def fetchone(self):
+        with self._metrics.time("db_fetch"):
+            return self._cursor.fetchone()
+
+    def fetchall(self):
+        with self._metrics.time("db_fetch"):
+            return self._cursor.fetchall()
+
+    def fetchmany(self, size=None):
+        with self._metrics.time("db_fetch"):
+            return self._cursor.fetchmany(size) if size else self._cursor.fetchmany()
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+# Shared by the render workers, the copy engine and the DB stages of a process
+metrics = StageMetrics()
@@ -0,0 +1,114 @@
+import logging
+import os
+import queue
+import threading
+
+# ----------------------------------
+# REFID FINALIZER
+# ----------------------------------
+# Last stage of the extraction pipeline. process_refid registers every
+# render and copy it hands off (keyed by destination path) and seals the
+# RefID once its artifact list is exhausted; the render workers and copy
+# threads report each destination as it finishes. When a sealed RefID has
+# nothing outstanding, on_complete(refid, failed) runs on the finalizer's
+# own thread, so slow finishing work (logging, linking into merchant
+# folders) never holds up a render or copy worker.
+#
+# Only RefIDs with work in flight are tracked, so memory follows the
+# bounded queues in front of this stage, not the size of the job.
+
+
+class RefIDFinalizer:
+    def __init__(self, on_complete):
+        self.on_complete = on_complete
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._refids = {}  # refid -> {"outstanding": n, "failed": n, "sealed": bool}
+        self._dests = {}  # normalized dest -> [refid, count]
+        self._ready = queue.Queue()
+        self._finalizing = 0
+        threading.Thread(target=self._run, name="refid-finalizer", daemon=True).start()
+
+    @staticmethod
+    def _key(dest):
+        return os.path.normcase(os.path.abspath(dest))
+
+    def open(self, refid):
+        with self._lock:
+            self._refids.setdefault(refid, {"outstanding": 0, "failed": 0, "sealed": False})
+
+    def add(self, refid, dest):
+        """Registers one render or copy of refid that will finish at dest."""
+        with self._lock:
+            state = self._refids.setdefault(refid, {"outstanding": 0, "failed": 0, "sealed": False})
+            state["outstanding"] += 1
+            entry = self._dests.setdefault(self._key(dest), [refid, 0])
+            entry[1] += 1
+
+    def seal(self, refid):
+        """No more artifacts will be added for refid; it completes once the registered ones finish."""
+        with self._lock:
+            state = self._refids.get(refid)
+            if state is None:
+                return
+            state["sealed"] = True
+            self._maybe_complete(refid, state)
+
+    def fail(self, refid):
+        """Counts a failure of refid that is not tied to one artifact (e.g. its expansion raised)."""
+        with self._lock:
+            state = self._refids.get(refid)
+            if state:
+                state["failed"] += 1
+
+    def done(self, dest, ok=True):
+        """Reports the render or copy at dest as finished. Unregistered destinations are ignored."""
+        with self._lock:
+            key = self._key(dest)
+            entry = self._dests.get(key)
+            if entry is None:
+                return
+            refid = entry[0]
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._dests[key]
+
+            state = self._refids[refid]
+            state["outstanding"] -= 1
+            if not ok:
+                state["failed"] += 1
+            self._maybe_complete(refid, state)
+
+    def _maybe_complete(self, refid, state):
+        # Called with the lock held
+        if state["sealed"] and state["outstanding"] == 0:
+            del self._refids[refid]
+            self._finalizing += 1
+            self._ready.put((refid, state["failed"]))
+
+    def _run(self):
+        while True:
+            refid, failed = self._ready.get()
+            try:
+                self.on_complete(refid, failed)
+            except Exception:
+                logging.exception(f"Finalizing RefID {refid} failed")
+            finally:
+                with self._lock:
+                    self._finalizing -= 1
+                    if not self._refids and not self._finalizing:
+                        self._idle.notify_all()
+
+    # ----------------------------------
+    # STATUS
+    # ----------------------------------
+    @property
+    def pending(self):
+        """RefIDs still waiting on artifacts or being finalized."""
+        with self._lock:
+            return len(self._refids) + self._finalizing
+
+    def wait(self, timeout=None):
+        """Blocks until every opened RefID has been finalized."""
+        with self._lock:
+            return self._idle.wait_for(lambda: not self._refids and not self._finalizing, timeout)
@@ -0,0 +1,144 @@
+import hashlib
+import logging
+import os
+import shutil
+import sqlite3
+import threading
+import time
+
+from content_store import materialize
+from job_journal import part_path
+
+# ----------------------------------
+# RENDERED-PDF CACHE
+# ----------------------------------
+# Bid notice abstracts, award notice abstracts and non-electronic components
+# are re-rendered for every merchant that shares the RefID/AwardID (joint
+# awards especially). The cache keys each rendered PDF by its target_url
+# plus a freshness marker from the DB (see batch_metadata: TenderStatus, and
+# AwardStatusID for award notices), so a status change invalidates it.
+# Hits are linked or copied into place; the cache is bounded by total size
+# (least recently used first) and by entry age.
+
+
+def cache_key(target_url, freshness):
+    return hashlib.sha256(f"{target_url}|{freshness}".encode("utf-8")).hexdigest()
+
+
+class RenderCache:
+    def __init__(self, root, max_bytes=2 * 1024 ** 3, max_age=7 * 24 * 3600):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        os.makedirs(os.path.join(root, "pdf"), exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(os.path.join(root, "index.sqlite"), check_same_thread=False)
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY, url TEXT, size INTEGER, created_at REAL, last_used REAL
+            )
+        """)
+        self._db.commit()
+
+        self.hits = 0
+        self.misses = 0
+        self.bytes_served = 0
+
+    def entry_path(self, key):
+        return os.path.join(self.root, "pdf", key[:2], f"{key}.pdf")
+
+    # ----------------------------------
+    # LOOKUP / STORE
+    # ----------------------------------
+    def get(self, target_url, freshness, dest):
+        """Places a cached render at dest and returns True, or returns False on a miss."""
+        key = cache_key(target_url, freshness)
+        path = self.entry_path(key)
+        now = time.time()
+
+        with self._lock:
+            row = self._db.execute("SELECT size, created_at FROM entries WHERE key = ?", (key,)).fetchone()
+            fresh = row and now - row[1] <= self.max_age and os.path.exists(path)
+            if not fresh:
+                self.misses += 1
+                return False
+            self._db.execute("UPDATE entries SET last_used = ? WHERE key = ?", (now, key))
+            self._db.commit()
+            self.hits += 1
+            self.bytes_served += row[0]
+
+        try:
+            os.makedirs(os.path.dirname(dest), exist_ok=True)
+            # Reflink/hardlink when the output is on the same volume, else a copy
+            materialize(path, dest, use_reflink=True)
+            return True
+        except OSError as e:
+            logging.warning(f"Render cache hit for {target_url} could not be placed: {e}")
+            return False
+
+    def put(self, target_url, freshness, pdf_path):
+        key = cache_key(target_url, freshness)
+        path = self.entry_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        try:
+            tmp = part_path(path)
+            try:
+                os.link(pdf_path, tmp)
+            except OSError:
+                shutil.copyfile(pdf_path, tmp)
+            os.replace(tmp, path)
+        except OSError as e:
+            logging.warning(f"Failed to cache render of {target_url}: {e}")
+            return
+
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?)",
+                (key, target_url, os.path.getsize(path), now, now)
+            )
+            self._db.commit()
+        self.evict()
+
+    # ----------------------------------
+    # EVICTION
+    # ----------------------------------
+    def evict(self):
+        """Drops expired entries, then least recently used ones until under max_bytes."""
+        with self._lock:
+            cutoff = time.time() - self.max_age
+            expired = self._db.execute("SELECT key FROM entries WHERE created_at < ?", (cutoff,)).fetchall()
+            victims = [key for (key,) in expired]
+
+            total = self._db.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM entries WHERE created_at >= ?", (cutoff,)
+            ).fetchone()[0]
+            if total > self.max_bytes:
+                for key, size in self._db.execute("SELECT key, size FROM entries ORDER BY last_used").fetchall():
+                    if total <= self.max_bytes:
+                        break
+                    if key not in victims:
+                        victims.append(key)
+                        total -= size
+
+            for key in victims:
+                self._db.execute("DELETE FROM entries WHERE key = ?", (key,))
+                try:
+                    os.remove(self.entry_path(key))
+                except OSError:
+                    pass
+            self._db.commit()
+
+    def report(self):
+        with self._lock:
+            lookups = max(self.hits + self.misses, 1)
+            return (
+                f"Render cache: {self.hits} hit(s), {self.misses} miss(es) "
+                f"({self.hits / lookups:.0%} hit rate), {self.bytes_served / (1024 * 1024):.1f} MB served"
+            )
+
+    def close(self):
+        with self._lock:
+            self._db.close()
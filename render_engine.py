@@ -0,0 +1,225 @@
+import asyncio
+import logging
+import os
+import threading
+
+from playwright.async_api import async_playwright
+
+from job_journal import part_path
+from render_profiles import ADMIN_NAME_SELECTOR, wait_profile, install_fast_routes_async
+from session_guard import SessionExpiredError
+from resilience import call_with_retry_async, is_transient
+from metrics import metrics
+
+# ----------------------------------
+# ASYNC RENDERING ENGINE
+# ----------------------------------
+# Runs many goto -> sanitize -> pdf pipelines on one asyncio event loop
+# hosted in a background thread. Callers stay synchronous: submit() hands
+# back a concurrent.futures.Future, so both extract_bid_docs.py and the
+# merchant bulk tool can drive it from their existing threads.
+
+REMOVE_ADMIN_NAME_JS = """
+    () => {
+        const element = document.querySelector('span[id="ctl01_nameLBL"]');
+        if (element) element.remove();
+    }
+"""
+
+# Abstract pages do not carry the admin name label
+NO_SANITIZE_TYPES = ("bid_notice", "award_notice")
+
+
+class AsyncRenderEngine:
+    def __init__(self, browser_path, concurrency=8, headless=True, timeout=32000, fast=False, retry=True, breaker=None, limiter=None):
+        self.browser_path = browser_path
+        self.concurrency = concurrency
+        self.headless = headless
+        self.timeout = timeout
+        self.fast = fast  # render_profiles routing + per-type waits
+        self.retry = retry  # resilience.RETRY_POLICIES per document type
+        self.breaker = breaker  # resilience.CircuitBreaker shared with other renderers
+        self.limiter = limiter  # adaptive_limiter.AdaptiveLimiter gating navigations
+
+        self._loop = None
+        self._thread = None
+        self._ready = threading.Event()
+        self._startup_error = None
+        self._playwright = None
+        self._browser = None
+        self._context = None
+        self._semaphore = None
+
+    # ----------------------------------
+    # LIFECYCLE
+    # ----------------------------------
+    def start(self, storage_state=None):
+        """Starts the event loop thread and a browser context seeded with the logged-in session."""
+        self._thread = threading.Thread(target=self._run_loop, args=(storage_state,), daemon=True)
+        self._thread.start()
+        self._ready.wait()
+
+        if self._startup_error:
+            raise self._startup_error
+        logging.info(f"Async render engine started (concurrency={self.concurrency}).")
+        return self
+
+    def _run_loop(self, storage_state):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+
+        try:
+            self._loop.run_until_complete(self._launch(storage_state))
+        except Exception as e:
+            self._startup_error = e
+            self._ready.set()
+            return
+
+        self._ready.set()
+        self._loop.run_forever()
+
+    async def _launch(self, storage_state):
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        self._playwright = await async_playwright().start()
+        self._browser = await self._playwright.chromium.launch(
+            headless=self.headless,
+            executable_path=self.browser_path
+        )
+        self._context = await self._browser.new_context(storage_state=storage_state)
+        if self.fast:
+            await install_fast_routes_async(self._context)
+
+    def close(self):
+        if not self._loop or not self._loop.is_running():
+            return
+
+        try:
+            asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop).result(timeout=30)
+        except Exception as e:
+            logging.warning(f"Async render engine did not shut down cleanly: {e}")
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
+
+    def update_cookies(self, storage_state):
+        """Loads the cookies of a fresh login (session_guard) into the engine's context."""
+        asyncio.run_coroutine_threadsafe(
+            self._context.add_cookies(storage_state["cookies"]), self._loop
+        ).result(timeout=30)
+
+    async def _shutdown(self):
+        for closer in (self._context, self._browser):
+            try:
+                if closer:
+                    await closer.close()
+            except Exception:
+                pass
+        if self._playwright:
+            await self._playwright.stop()
+
+    # ----------------------------------
+    # SUBMISSION
+    # ----------------------------------
+    def submit(self, target_url, pdf_path, type, refid, html_future=None):
+        """Queues one render; the returned future resolves to pdf_path or raises.
+
+        html_future (see abstract_fetcher) may resolve to prefetched HTML that is
+        rendered with set_content() instead of navigating; None means navigate.
+        """
+        return asyncio.run_coroutine_threadsafe(
+            self._render(target_url, pdf_path, type, refid, html_future), self._loop
+        )
+
+    def render_many(self, jobs):
+        """Renders (target_url, pdf_path, type, refid) tuples and returns [(job, error_or_None)]."""
+        futures = [(job, self.submit(*job)) for job in jobs]
+        results = []
+        for job, future in futures:
+            try:
+                future.result()
+                results.append((job, None))
+            except Exception as e:
+                results.append((job, e))
+        return results
+
+    # ----------------------------------
+    # PIPELINE
+    # ----------------------------------
+    async def _render(self, target_url, pdf_path, type, refid, html_future=None):
+        html = await asyncio.wrap_future(html_future) if html_future else None
+        if not self.retry:
+            return await self._attempt(target_url, pdf_path, type, refid, html)
+        # Backoff happens outside the semaphore so waiting retries don't hold a slot
+        return await call_with_retry_async(
+            lambda: self._attempt(target_url, pdf_path, type, refid, html), type, self.breaker
+        )
+
+    async def _attempt(self, target_url, pdf_path, type, refid, html):
+        async with self._semaphore:
+            page = await self._context.new_page()
+            tags = {"refid": refid, "type": type, "worker": "async"}
+            try:
+                if html:
+                    with metrics.time("set_content", **tags):
+                        await page.set_content(html, wait_until="load", timeout=self.timeout)
+                else:
+                    await self._navigate(page, target_url, type, tags)
+
+                # Write to a .part file so a crash never leaves a half PDF under the real name
+                with metrics.time("pdf", **tags):
+                    await page.pdf(path=part_path(pdf_path), format="A4", print_background=True)
+                os.replace(part_path(pdf_path), pdf_path)
+                return pdf_path
+            finally:
+                await page.close()
+
+    async def _navigate(self, page, target_url, type, tags):
+        load = self._load_fast if self.fast else self._load
+        if self.limiter is None:
+            return await load(page, target_url, type, tags)
+        # Session expiry says nothing about portal load; don't back off on it
+        async with self.limiter.slot_async(is_ok=lambda e: not is_transient(e)):
+            await load(page, target_url, type, tags)
+
+    def _check_session(self, page, target_url):
+        if "log-in" in page.url.lower():
+            raise SessionExpiredError(
+                f"Session Expired: Saving PDF failed for {target_url}. "
+                f"Page was redirected to the login page."
+            )
+
+    async def _remove_admin_name(self, page, timeout, tags):
+        try:
+            with metrics.time("selector", **tags):
+                await page.wait_for_selector(ADMIN_NAME_SELECTOR, timeout=timeout)
+            await page.evaluate(REMOVE_ADMIN_NAME_JS)
+        except Exception:
+            logging.info("Admin name element not found, skipping removal.")
+
+    async def _load(self, page, target_url, type, tags):
+        with metrics.time("goto", **tags):
+            await page.goto(target_url, timeout=self.timeout)
+        with metrics.time("load_state", **tags):
+            await page.wait_for_load_state("networkidle")
+        self._check_session(page, target_url)
+
+        if type not in NO_SANITIZE_TYPES:
+            await self._remove_admin_name(page, self.timeout, tags)
+
+        with metrics.time("load_state", **tags):
+            await page.wait_for_load_state("networkidle", timeout=self.timeout)
+
+    async def _load_fast(self, page, target_url, type, tags):
+        profile = wait_profile(type)
+        with metrics.time("goto", **tags):
+            await page.goto(target_url, timeout=self.timeout, wait_until=profile["goto_wait"])
+        if profile["ready"]:
+            with metrics.time("load_state", **tags):
+                await page.wait_for_load_state(profile["ready"], timeout=self.timeout)
+        self._check_session(page, target_url)
+
+        if profile["selector"]:
+            await self._remove_admin_name(page, profile["selector_timeout"], tags)
+
+        if profile["settle"]:
+            with metrics.time("load_state", **tags):
+                await page.wait_for_load_state(profile["settle"], timeout=self.timeout)
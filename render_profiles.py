@@ -0,0 +1,101 @@
+import re
+
+# ----------------------------------
+# FAST RENDER MODE
+# ----------------------------------
+# Opt-in: block or stub resources that never show up in the printed
+# abstract (images, fonts, analytics) and replace the blanket networkidle
+# waits with a wait condition per document type.
+
+ADMIN_NAME_SELECTOR = 'span[id="ctl01_nameLBL"]'
+
+# Playwright resource types that are aborted outright
+BLOCKED_RESOURCE_TYPES = {"image", "media", "font"}
+
+# URLs that are aborted whatever their resource type
+BLOCKED_URL_PATTERNS = [
+    r"google-analytics\.com",
+    r"googletagmanager\.com",
+    r"doubleclick\.net",
+    r"facebook\.(net|com)/",
+]
+
+# Scripts/stylesheets answered with an empty 200 instead of being fetched,
+# for pages that break when the resource fails but do not need it to print
+# (e.g. r"/Scripts/chat-widget\.js")
+STUBBED_URL_PATTERNS = []
+
+# goto_wait: wait_until for page.goto
+# ready:     load state awaited after goto (None = none)
+# selector:  element awaited before sanitizing (None = no sanitizing)
+# selector_timeout: ms for the selector wait
+# settle:    load state awaited right before page.pdf (None = none)
+WAIT_PROFILES = {
+    # Printable abstracts are plain server-rendered pages
+    "bid_notice":   {"goto_wait": "domcontentloaded", "ready": "load", "selector": None, "selector_timeout": 0, "settle": None},
+    "award_notice": {"goto_wait": "domcontentloaded", "ready": "load", "selector": None, "selector_timeout": 0, "settle": None},
+    # Non-electronic views carry the admin name label that must be removed
+    "assoc_comp":   {"goto_wait": "domcontentloaded", "ready": None, "selector": ADMIN_NAME_SELECTOR, "selector_timeout": 10000, "settle": "load"},
+    "bid_sup":      {"goto_wait": "domcontentloaded", "ready": None, "selector": ADMIN_NAME_SELECTOR, "selector_timeout": 10000, "settle": "load"},
+    "bid_sup_item": {"goto_wait": "domcontentloaded", "ready": None, "selector": ADMIN_NAME_SELECTOR, "selector_timeout": 10000, "settle": "load"},
+}
+
+STUB_BODIES = {
+    "script": ("application/javascript", ""),
+    "stylesheet": ("text/css", ""),
+}
+
+_blocked = [re.compile(p, re.IGNORECASE) for p in BLOCKED_URL_PATTERNS]
+_stubbed = [re.compile(p, re.IGNORECASE) for p in STUBBED_URL_PATTERNS]
+
+
+def wait_profile(type):
+    return WAIT_PROFILES.get(type, WAIT_PROFILES["assoc_comp"])
+
+
+def route_decision(resource_type, url):
+    """Returns "abort", "stub" or None (let the request through)."""
+    if any(p.search(url) for p in _stubbed):
+        return "stub"
+    if resource_type in BLOCKED_RESOURCE_TYPES or any(p.search(url) for p in _blocked):
+        return "abort"
+    return None
+
+
+def _stub_args(resource_type):
+    content_type, body = STUB_BODIES.get(resource_type, ("text/plain", ""))
+    return {"status": 200, "content_type": content_type, "body": body}
+
+
+# ----------------------------------
+# ROUTE HANDLERS
+# ----------------------------------
+def handle_route(route):
+    request = route.request
+    decision = route_decision(request.resource_type, request.url)
+    if decision == "abort":
+        route.abort()
+    elif decision == "stub":
+        route.fulfill(**_stub_args(request.resource_type))
+    else:
+        route.continue_()
+
+
+async def handle_route_async(route):
+    request = route.request
+    decision = route_decision(request.resource_type, request.url)
+    if decision == "abort":
+        await route.abort()
+    elif decision == "stub":
+        await route.fulfill(**_stub_args(request.resource_type))
+    else:
+        await route.continue_()
+
+
+def install_fast_routes(context):
+    """Routes every request of a sync BrowserContext (or Page) through handle_route."""
+    context.route("**/*", handle_route)
+
+
+async def install_fast_routes_async(context):
+    await context.route("**/*", handle_route_async)
@@ -0,0 +1,203 @@
+import asyncio
+import collections
+import logging
+import random
+import threading
+import time
+
+from playwright.sync_api import Error as PlaywrightError, TimeoutError as PlaywrightTimeoutError
+
+from adaptive_limiter import LimiterStopped
+
+# ----------------------------------
+# RETRIES AND CIRCUIT BREAKER
+# ----------------------------------
+# Transient failures (navigation timeouts, dropped connections) are retried
+# per document type with jittered exponential backoff. A circuit breaker
+# shared by every render worker watches the recent transient-error rate:
+# when it spikes, rendering pauses for a cooldown, then a single probe
+# render decides whether to resume or to pause again (for twice as long).
+# An expired session is not transient; session_guard handles it.
+
+# attempts: total tries per render
+# base:     backoff before the 2nd try in seconds, doubled per try
+# cap:      longest single backoff in seconds
+RETRY_POLICIES = {
+    "bid_notice":   {"attempts": 3, "base": 2.0, "cap": 30.0},
+    "award_notice": {"attempts": 3, "base": 2.0, "cap": 30.0},
+    "assoc_comp":   {"attempts": 3, "base": 5.0, "cap": 60.0},
+    "bid_sup":      {"attempts": 3, "base": 5.0, "cap": 60.0},
+    "bid_sup_item": {"attempts": 3, "base": 5.0, "cap": 60.0},
+}
+DEFAULT_POLICY = {"attempts": 2, "base": 5.0, "cap": 60.0}
+
+# Network errors worth another try; anything else fails straight away
+TRANSIENT_MARKERS = ("net::ERR_", "Timeout", "Target page, context or browser has been closed")
+
+
+def retry_policy(type):
+    return RETRY_POLICIES.get(type, DEFAULT_POLICY)
+
+
+def backoff_delay(policy, attempt):
+    """Full-jitter backoff before try number attempt + 2."""
+    return random.uniform(0, min(policy["cap"], policy["base"] * 2 ** attempt))
+
+
+def is_transient(error):
+    if isinstance(error, PlaywrightTimeoutError):
+        return True
+    return isinstance(error, PlaywrightError) and any(marker in str(error) for marker in TRANSIENT_MARKERS)
+
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half-open"
+
+
+class RenderStopped(Exception):
+    """A render gave up waiting on the circuit breaker because the job is stopping."""
+
+
+class CircuitBreaker:
+    def __init__(self, window=20, error_rate=0.5, min_calls=10, cooldown=60, max_cooldown=600, notify=None):
+        self.error_rate = error_rate
+        self.min_calls = min_calls
+        self.base_cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.notify = notify or logging.warning
+
+        self.state = CLOSED
+        self.trips = 0
+        self.paused = 0.0  # seconds spent open, for the end-of-job report
+
+        self._results = collections.deque(maxlen=window)
+        self._cooldown = cooldown
+        self._opened_at = 0.0
+        self._probing = False
+        self._cond = threading.Condition()
+
+    def _poll(self):
+        """Called with the lock held: (True, 0) if a call may go ahead now, else (False, seconds to wait)."""
+        if self.state == CLOSED:
+            return True, 0.0
+
+        now = time.monotonic()
+        if self.state == OPEN and now >= self._opened_at + self._cooldown:
+            self.state = HALF_OPEN
+            self._probing = False
+        if self.state == HALF_OPEN and not self._probing:
+            self._probing = True
+            return True, 0.0
+
+        remaining = self._opened_at + self._cooldown - now if self.state == OPEN else 1.0
+        return False, min(max(remaining, 0.1), 1.0)
+
+    def acquire(self, stop_event=None):
+        """Blocks while the circuit is open; when half-open lets one probe through at a time.
+
+        Returns False if stop_event was set while waiting.
+        """
+        with self._cond:
+            while True:
+                if stop_event is not None and stop_event.is_set():
+                    return False
+                allowed, wait = self._poll()
+                if allowed:
+                    return True
+                self._cond.wait(timeout=wait)
+
+    async def acquire_async(self, stop_event=None):
+        """acquire() for the event loop: sleeps between polls instead of holding a thread."""
+        while True:
+            if stop_event is not None and stop_event.is_set():
+                return False
+            with self._cond:
+                allowed, wait = self._poll()
+            if allowed:
+                return True
+            await asyncio.sleep(wait)
+
+    def record(self, ok):
+        with self._cond:
+            if self.state == HALF_OPEN and self._probing:
+                self._probing = False
+                self.paused += time.monotonic() - self._opened_at
+                if ok:
+                    self.state = CLOSED
+                    self._results.clear()
+                    self._cooldown = self.base_cooldown
+                    self.notify("PhilGEPS is responding again. Resuming renders.")
+                else:
+                    self._cooldown = min(self._cooldown * 2, self.max_cooldown)
+                    self._open()
+                self._cond.notify_all()
+                return
+
+            if self.state != CLOSED:
+                # Stragglers that started before the circuit opened
+                return
+
+            self._results.append(ok)
+            failures = self._results.count(False)
+            if len(self._results) >= self.min_calls and failures / len(self._results) >= self.error_rate:
+                self.trips += 1
+                self._open()
+
+    def _open(self):
+        self.state = OPEN
+        self._opened_at = time.monotonic()
+        self.notify(f"PhilGEPS error rate is high. Pausing renders for {self._cooldown:.0f}s before probing.")
+
+    def report(self):
+        return f"Circuit breaker: tripped {self.trips} time(s), paused {self.paused / 60:.1f} min"
+
+
+# ----------------------------------
+# RETRY WRAPPERS
+# ----------------------------------
+def call_with_retry(fn, type, breaker=None, stop_event=None):
+    """Runs fn() under the retry policy of type, gated and fed by breaker."""
+    policy = retry_policy(type)
+    for attempt in range(policy["attempts"]):
+        if breaker and not breaker.acquire(stop_event):
+            raise RenderStopped(f"{type} render cancelled: the job is stopping")
+        try:
+            result = fn()
+        except LimiterStopped:
+            # Never started; says nothing about the portal
+            raise
+        except Exception as e:
+            transient = is_transient(e)
+            if breaker:
+                breaker.record(not transient)
+            if not transient or attempt == policy["attempts"] - 1:
+                raise
+            delay = backoff_delay(policy, attempt)
+            logging.warning(f"{type} render failed ({e.__class__.__name__}); retry {attempt + 1} in {delay:.1f}s")
+            time.sleep(delay)
+        else:
+            if breaker:
+                breaker.record(True)
+            return result
+
+
+async def call_with_retry_async(make_coro, type, breaker=None, stop_event=None):
+    """Async call_with_retry; make_coro() returns a fresh coroutine per try."""
+    policy = retry_policy(type)
+    for attempt in range(policy["attempts"]):
+        if breaker and not await breaker.acquire_async(stop_event):
+            raise RenderStopped(f"{type} render cancelled: the job is stopping")
+        try:
+            result = await make_coro()
+        except Exception as e:
+            transient = is_transient(e)
+            if breaker:
+                breaker.record(not transient)
+            if not transient or attempt == policy["attempts"] - 1:
+                raise
+            delay = backoff_delay(policy, attempt)
+            logging.warning(f"{type} render failed ({e.__class__.__name__}); retry {attempt + 1} in {delay:.1f}s")
+            await asyncio.sleep(delay)
+        else:
+            if breaker:
+                breaker.record(True)
+            return result
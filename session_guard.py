@@ -0,0 +1,92 @@
+import logging
+import threading
+
+# ----------------------------------
+# SESSION RECOVERY
+# ----------------------------------
+# PhilGEPS sessions expire on long runs. The first render that lands on the
+# login page logs in again on its own page with the credentials the user
+# already entered; other workers block in sync()/renew() while that happens,
+# then load the fresh cookies into their own context and replay the task
+# that bounced. Each task is replayed at most once.
+
+
+class SessionExpiredError(Exception):
+    """The portal redirected a render to the login page."""
+
+
+def login_on_page(page, login_url, credentials, timeout=32000):
+    """Logs in on page and returns the context's storage_state, or None if the login was rejected."""
+    page.goto(login_url, timeout=timeout)
+    page.wait_for_load_state("networkidle")
+
+    if "log-in" in page.url.lower():
+        page.fill('input[name="userName"]', credentials["username"])
+        page.fill('input[id="password"]', credentials["password"])
+        page.click('input[id="btnLogin"]', timeout=timeout)
+        page.wait_for_load_state("networkidle")
+
+    if "log-in" in page.url.lower():
+        return None
+    return page.context.storage_state()
+
+
+class SessionGuard:
+    def __init__(self):
+        self.generation = 0  # bumped after every successful re-login
+        self.storage_state = None
+        self.relogins = 0
+        self.gave_up = False  # a re-login was rejected; stop retrying with the same credentials
+
+        self._lock = threading.Lock()
+        self._listeners = []
+
+    def add_listener(self, callback):
+        """callback(storage_state) runs after each successful re-login (e.g. AbstractFetcher.update_cookies)."""
+        self._listeners.append(callback)
+
+    def renew(self, seen_generation, relogin):
+        """Re-authenticates with relogin() unless another worker already did since seen_generation.
+
+        relogin() returns a storage_state or None. Returns True when a session
+        newer than seen_generation is available.
+        """
+        with self._lock:
+            if self.generation != seen_generation:
+                return True
+            if self.gave_up:
+                return False
+
+            try:
+                state = relogin()
+            except Exception as e:
+                logging.error(f"Re-login failed: {e}")
+                state = None
+
+            if state is None:
+                self.gave_up = True
+                return False
+
+            self.storage_state = state
+            self.generation += 1
+            self.relogins += 1
+
+            for callback in self._listeners:
+                try:
+                    callback(state)
+                except Exception as e:
+                    logging.warning(f"Failed to share refreshed session: {e}")
+            return True
+
+    def sync(self, seen_generation, apply):
+        """Blocks while a re-login is running, then calls apply(storage_state) if the
+        session changed since seen_generation. Returns the current generation."""
+        with self._lock:
+            generation, state = self.generation, self.storage_state
+
+        if generation != seen_generation and state:
+            apply(state)
+        return generation
+
+    def report(self):
+        return f"Session: {self.relogins} re-login(s){' (last one rejected)' if self.gave_up else ''}"
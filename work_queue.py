@@ -0,0 +1,209 @@
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+
+# ----------------------------------
+# SHARED WORK QUEUE
+# ----------------------------------
+# Lets several headless workers (each with its own browser session, on one
+# or more machines) split one job. The RefIDs of the job are seeded into a
+# SQLite file on a shared path; workers claim a few at a time under a
+# lease, a heartbeat thread keeps the leases of live workers fresh, and a
+# lease that runs out (the worker died or lost the share) is claimed again
+# by someone else, up to MAX_ATTEMPTS times.
+#
+# The file uses the rollback journal rather than WAL, which does not work
+# on network shares, and every claim runs in a BEGIN IMMEDIATE transaction
+# so two workers never get the same RefID.
+
+PENDING = "pending"
+LEASED = "leased"
+DONE = "done"
+FAILED = "failed"
+
+LEASE_SECONDS = 300
+MAX_ATTEMPTS = 3
+
+
+def default_worker_id():
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+class WorkQueue:
+    def __init__(self, path, job_id, worker_id=None, lease_seconds=LEASE_SECONDS, max_attempts=MAX_ATTEMPTS):
+        self.path = path
+        self.job_id = job_id
+        self.worker_id = worker_id or default_worker_id()
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.claimed = 0
+        self.reclaimed = 0
+
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._heartbeat = None
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._db = sqlite3.connect(path, timeout=60, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=DELETE")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS work (
+                job_id TEXT,
+                refid TEXT,
+                tender_status TEXT,
+                status TEXT,
+                worker TEXT,
+                lease_expires REAL,
+                attempts INTEGER DEFAULT 0,
+                error TEXT,
+                updated_at REAL,
+                PRIMARY KEY (job_id, refid)
+            )
+        """)
+        self._db.execute("CREATE INDEX IF NOT EXISTS ix_work_claim ON work (job_id, status, lease_expires)")
+
+    def _write(self, sql, params=()):
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                cursor = self._db.execute(sql, params)
+                self._db.execute("COMMIT")
+                return cursor.rowcount
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+
+    # ----------------------------------
+    # SEED / CLAIM / COMPLETE
+    # ----------------------------------
+    def add(self, tenders):
+        """Seeds (refid, tender_status) pairs; RefIDs already in the job are left alone. Returns how many were new."""
+        rows = [(self.job_id, str(refid), status, PENDING, time.time()) for refid, status in tenders]
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                before = self._db.total_changes
+                self._db.executemany("""
+                    INSERT OR IGNORE INTO work (job_id, refid, tender_status, status, updated_at)
+                    VALUES (?, ?, ?, ?, ?)
+                """, rows)
+                added = self._db.total_changes - before
+                self._db.execute("COMMIT")
+                return added
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+
+    def claim(self, limit):
+        """Leases up to limit RefIDs that are pending or whose lease ran out. Returns (refid, tender_status) pairs."""
+        if limit <= 0:
+            return []
+        now = time.time()
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                # Expired leases that used up their attempts are given up on first
+                self._db.execute("""
+                    UPDATE work SET status = ?, error = 'lease expired too often', updated_at = ?
+                    WHERE job_id = ? AND status = ? AND lease_expires < ? AND attempts >= ?
+                """, (FAILED, now, self.job_id, LEASED, now, self.max_attempts))
+                rows = self._db.execute("""
+                    SELECT refid, tender_status, status FROM work
+                    WHERE job_id = ? AND (status = ? OR (status = ? AND lease_expires < ?))
+                    ORDER BY attempts, rowid
+                    LIMIT ?
+                """, (self.job_id, PENDING, LEASED, now, limit)).fetchall()
+                self._db.executemany("""
+                    UPDATE work SET status = ?, worker = ?, lease_expires = ?, attempts = attempts + 1, updated_at = ?
+                    WHERE job_id = ? AND refid = ?
+                """, [(LEASED, self.worker_id, now + self.lease_seconds, now, self.job_id, refid) for refid, _, _ in rows])
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+
+        self.claimed += len(rows)
+        self.reclaimed += sum(1 for _, _, status in rows if status == LEASED)
+        return [(_refid_value(refid), tender_status) for refid, tender_status, _ in rows]
+
+    def complete(self, refid, ok=True, error=None):
+        """Marks a RefID this worker holds as done or failed."""
+        self._write("""
+            UPDATE work SET status = ?, error = ?, lease_expires = NULL, updated_at = ?
+            WHERE job_id = ? AND refid = ? AND worker = ?
+        """, (DONE if ok else FAILED, None if ok else str(error), time.time(), self.job_id, str(refid), self.worker_id))
+
+    def release(self):
+        """Hands every RefID this worker still holds back to the queue (clean shutdown)."""
+        return self._write("""
+            UPDATE work SET status = ?, worker = NULL, lease_expires = NULL, attempts = attempts - 1, updated_at = ?
+            WHERE job_id = ? AND worker = ? AND status = ?
+        """, (PENDING, time.time(), self.job_id, self.worker_id, LEASED))
+
+    # ----------------------------------
+    # HEARTBEAT
+    # ----------------------------------
+    def renew(self):
+        """Extends the leases this worker holds. Returns how many were renewed."""
+        now = time.time()
+        return self._write("""
+            UPDATE work SET lease_expires = ?, updated_at = ?
+            WHERE job_id = ? AND worker = ? AND status = ?
+        """, (now + self.lease_seconds, now, self.job_id, self.worker_id, LEASED))
+
+    def start_heartbeat(self, interval=None):
+        interval = interval or self.lease_seconds / 3
+        self._heartbeat = threading.Thread(target=self._beat, args=(interval,), name="work-queue-heartbeat", daemon=True)
+        self._heartbeat.start()
+        return self
+
+    def _beat(self, interval):
+        while not self._stop.wait(interval):
+            try:
+                self.renew()
+            except sqlite3.Error as e:
+                # Keep trying; the leases only lapse after lease_seconds
+                logging.warning(f"Work queue heartbeat failed: {e}")
+
+    # ----------------------------------
+    # STATUS
+    # ----------------------------------
+    def counts(self):
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT status, COUNT(*) FROM work WHERE job_id = ? GROUP BY status", (self.job_id,)
+            ).fetchall()
+        return dict(rows)
+
+    def open_count(self):
+        """RefIDs of the job that are still pending or leased by any worker."""
+        counts = self.counts()
+        return counts.get(PENDING, 0) + counts.get(LEASED, 0)
+
+    def report(self):
+        counts = self.counts()
+        return (
+            f"Work queue {self.job_id}: this worker claimed {self.claimed} RefID(s) ({self.reclaimed} from expired leases); "
+            f"job: {counts.get(DONE, 0)} done, {counts.get(FAILED, 0)} failed, "
+            f"{counts.get(PENDING, 0)} pending, {counts.get(LEASED, 0)} leased"
+        )
+
+    def close(self, release=True):
+        self._stop.set()
+        if self._heartbeat:
+            self._heartbeat.join(timeout=5)
+        if release:
+            try:
+                self.release()
+            except sqlite3.Error as e:
+                logging.warning(f"Failed to release work queue leases: {e}")
+        with self._lock:
+            self._db.close()
+
+
+def _refid_value(refid):
+    # RefIDs are stored as text; hand numeric ones back as ints like the DB rows
+    return int(refid) if refid.isdigit() else refid